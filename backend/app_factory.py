@@ -0,0 +1,255 @@
+"""
+App Factory - Builds the FastAPI app for a deployment profile
+"""
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+
+from config import settings
+from services.log_pipeline import log_pipeline
+
+# Before the routes and services are imported, so their startup lines go through it too
+log_pipeline.setup()
+
+from routes import pokemon, battle, ai, auth, blockchain, quest, trainer_dialogue, leaderboard, matchmaking, metrics, admin
+from services.redis_service import redis_service
+from services.pokemon_service import pokemon_service
+from services.sui_rpc import sui_rpc
+from services.metrics import MetricsMiddleware, metrics as metrics_registry
+from services.tracing import TracingMiddleware, tracer
+from services.profiler import ProfilerMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class AppProfile:
+    """
+    What a deployment runs besides the routes
+
+    cache: "redis" (shared, survives restarts) or "snapshot" (in-process,
+    seeded from POKEMON_SNAPSHOT_PATH). warm_up pre-fetches Generation 1 at
+    startup. background_workers runs the stream consumers, schedulers and
+    settlement loops, chain_indexer follows the chain, and pooled_clients
+    opens bounded, keep-alive Redis and PokéAPI pools at startup instead of
+    creating clients per use.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cache: str,
+        warm_up: bool,
+        background_workers: bool,
+        chain_indexer: bool,
+        pooled_clients: bool,
+        cors_origins: Optional[List[str]] = None
+    ):
+        self.name = name
+        self.cache = cache
+        self.warm_up = warm_up
+        self.background_workers = background_workers
+        self.chain_indexer = chain_indexer
+        self.pooled_clients = pooled_clients
+        self.cors_origins = cors_origins
+
+
+PROFILES: Dict[str, AppProfile] = {
+    # Long-running process (uvicorn on Render/Railway)
+    "server": AppProfile(
+        name="server",
+        cache="redis",
+        warm_up=True,
+        background_workers=True,
+        chain_indexer=settings.CHAIN_INDEXER_ENABLED,
+        pooled_clients=True,
+    ),
+    # Vercel function: no lifespan guarantees, no long-lived connections
+    "serverless": AppProfile(
+        name="serverless",
+        cache="snapshot",
+        warm_up=False,
+        background_workers=False,
+        chain_indexer=False,
+        pooled_clients=False,
+        cors_origins=["*"],  # Allow all origins for Vercel deployment
+    ),
+}
+
+
+def _background_workers():
+    """Every start()/stop() background loop, in start order"""
+    from services.quest_inventory_service import quest_inventory_service
+    from services.quest_store import quest_store
+    from services.quest_progress_worker import quest_progress_worker
+    from services.daily_challenge_scheduler import daily_challenge_scheduler
+    from services.leaderboard_service import leaderboard_service, leaderboard_worker
+    from services.matchmaking_service import matchmaking_service
+    from services.xp_ledger import xp_ledger
+    from services.egg_incubation import egg_incubation_service
+
+    return [
+        quest_inventory_service,
+        quest_store,
+        quest_progress_worker,
+        daily_challenge_scheduler,
+        leaderboard_worker,
+        leaderboard_service,
+        matchmaking_service,
+        xp_ledger,
+        egg_incubation_service,
+    ]
+
+
+def _lifespan(profile: AppProfile):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Offline mode: route chain RPC to the local stand-in mounted at /local-chain
+        if settings.ONECHAIN_LOCAL_CHAIN:
+            import httpx
+            
+            sui_rpc.use_transport(httpx.ASGITransport(app=app.state.local_chain.app), url="http://local-chain/")
+            logger.info("⛓️ Using local OneChain stand-in")
+        
+        # Multiprocess metrics: each worker publishes its samples for the others' /metrics
+        if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR:
+            metrics_registry.enable_multiprocess(settings.METRICS_MULTIPROC_DIR)
+            metrics_registry.start()
+        
+        if profile.pooled_clients:
+            await pokemon_service.open_client(settings.POKEAPI_MAX_CONNECTIONS)
+        
+        workers = []
+        if profile.cache == "redis":
+            # Startup: Initialize Redis connection (optional)
+            try:
+                await redis_service.connect(
+                    max_connections=settings.REDIS_MAX_CONNECTIONS if profile.pooled_clients else None
+                )
+                logger.info("✅ Redis connected")
+                
+                if profile.warm_up:
+                    # Pre-fetch Generation 1 Pokémon in background
+                    logger.info("🔄 Starting Pokémon cache pre-fetch...")
+                    asyncio.create_task(pokemon_service.prefetch_generation_1())
+                
+                if profile.background_workers:
+                    workers = _background_workers()
+                    for worker in workers:
+                        worker.start()
+            except Exception as e:
+                logger.warning("⚠️ Redis connection failed, running without Redis cache", extra={"error": str(e)})
+        
+        # Follow the game package on chain into the local NFT index (no Redis needed)
+        chain_indexer = None
+        if profile.chain_indexer:
+            from services.chain_indexer import chain_indexer
+            from services.marketplace_index import marketplace_index
+            
+            try:
+                await marketplace_index.ensure_built()
+            except Exception as e:
+                logger.warning("⚠️ Marketplace index backfill failed", extra={"error": str(e)})
+            chain_indexer.start()
+        
+        yield
+        
+        # Shutdown: Stop background workers and close connections
+        for worker in workers:
+            await worker.stop()
+        if chain_indexer is not None:
+            await chain_indexer.stop()
+        await sui_rpc.close()
+        await pokemon_service.close_client()
+        await metrics_registry.stop()
+        tracer.close()
+        if redis_service.client:
+            try:
+                await redis_service.close()
+                logger.info("❌ Redis disconnected")
+            except Exception as e:
+                logger.warning("⚠️ Redis disconnect error", extra={"error": str(e)})
+
+    return lifespan
+
+
+def create_app(profile: str = "server") -> FastAPI:
+    """The API configured for a deployment profile ("server" or "serverless")"""
+    app_profile = PROFILES[profile]
+    
+    if app_profile.cache == "snapshot":
+        pokemon_service.use_local_cache(settings.POKEMON_SNAPSHOT_PATH)
+    
+    app = FastAPI(
+        title="PokéChain Battles API",
+        description="Backend API for PokéChain Battles GameFi application",
+        version="1.0.0",
+        lifespan=_lifespan(app_profile),
+        default_response_class=ORJSONResponse,
+    )
+    app.state.profile = app_profile
+    
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=app_profile.cors_origins or settings.cors_origins_list,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Include routers
+    app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+    app.include_router(pokemon.router, prefix="/api/pokemon", tags=["Pokémon"])
+    app.include_router(battle.router, prefix="/api/battle", tags=["Battle"])
+    app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
+    app.include_router(blockchain.router, prefix="/api/blockchain", tags=["Blockchain"])
+    app.include_router(quest.router, prefix="/api/quests", tags=["Quests"])
+    app.include_router(trainer_dialogue.router, prefix="/api/trainer", tags=["Trainer Dialogue"])
+    app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["Leaderboard"])
+    app.include_router(matchmaking.router, prefix="/api/matchmaking", tags=["Matchmaking"])
+    
+    if settings.METRICS_ENABLED:
+        # Wraps CORS, so the recorded latency includes it
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics.router, tags=["Metrics"])
+    if settings.TRACING_ENABLED:
+        # Route-level parent span for the Redis, PokéAPI and LLM spans below it
+        app.add_middleware(TracingMiddleware)
+    
+    # Admin endpoints (on-demand profiling) need ADMIN_API_TOKEN
+    app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+    if settings.ADMIN_API_TOKEN:
+        app.add_middleware(ProfilerMiddleware)
+    
+    if settings.ONECHAIN_LOCAL_CHAIN:
+        from fakes.sui_chain import LocalSuiChain
+        
+        app.state.local_chain = LocalSuiChain(latency_ms=settings.ONECHAIN_LOCAL_LATENCY_MS)
+        app.mount("/local-chain", app.state.local_chain.app)
+    
+    @app.get("/")
+    @app.get("/api")
+    async def root():
+        return {
+            "message": "PokéChain Battles API",
+            "version": "1.0.0",
+            "status": "running",
+            "deployment": app_profile.name,
+        }
+    
+    @app.get("/health")
+    @app.get("/api/health")
+    async def health_check():
+        redis_status = await redis_service.ping()
+        return {
+            "status": "healthy",
+            "deployment": app_profile.name,
+            "redis": "connected" if redis_status else "disconnected",
+        }
+    
+    return app
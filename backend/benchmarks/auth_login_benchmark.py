@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Wallet login benchmark - /api/auth/wallet throughput under concurrency
+
+Replaces firebase_admin's auth calls with in-process fakes that block for
+--firebase-ms (as the real HTTP calls do) and compares:
+
+  inline    the previous handler: blocking calls on the event loop
+  executor  wallet_auth_service without Redis (thread pool only)
+  cached    wallet_auth_service with the configured Redis (UID + token cache)
+
+Logins are spread over --wallets distinct wallets, so most are repeats.
+Also reports event loop lag, which blocking calls inflate for every other
+request on the worker. Run from backend/:
+
+    python -m benchmarks.auth_login_benchmark --logins 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+import redis.asyncio as redis
+from firebase_admin import auth as firebase_auth
+
+from config import settings
+from services.redis_service import redis_service
+from services.auth_service import wallet_auth_service
+
+
+class FakeFirebaseAuth:
+    """Blocking stand-ins for get_user / create_user / create_custom_token"""
+
+    UserNotFoundError = firebase_auth.UserNotFoundError
+    UidAlreadyExistsError = firebase_auth.UidAlreadyExistsError
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.users = {}
+        self.calls = 0
+
+    def _user(self, uid):
+        return SimpleNamespace(uid=uid, user_metadata=SimpleNamespace(creation_timestamp=self.users[uid]))
+
+    def get_user(self, uid):
+        self.calls += 1
+        time.sleep(self.latency)
+        if uid not in self.users:
+            raise firebase_auth.UserNotFoundError(f"No user record found for the provided user ID: {uid}")
+        return self._user(uid)
+
+    def create_user(self, uid):
+        self.calls += 1
+        time.sleep(self.latency)
+        if uid in self.users:
+            raise firebase_auth.UidAlreadyExistsError("The user with the provided uid already exists", None, None)
+        self.users[uid] = int(time.time() * 1000)
+        return self._user(uid)
+
+    def create_custom_token(self, uid):
+        self.calls += 1
+        time.sleep(self.latency / 4)  # Signing is local unless the key lives in IAM
+        return f"token-{uid}-{random.random()}".encode()
+
+
+def inline_login(fake: FakeFirebaseAuth, wallet_address: str) -> str:
+    """The handler body before the auth service: every call blocks the event loop"""
+    try:
+        fake.get_user(wallet_address)
+    except fake.UserNotFoundError:
+        fake.create_user(uid=wallet_address)
+    return fake.create_custom_token(wallet_address).decode("utf-8")
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+async def run(label: str, login, logins: int, wallets: int, concurrency: int, fake: FakeFirebaseAuth):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, lags = [], []
+    fake.calls = 0
+    done = False
+
+    async def monitor():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await login(f"0x{random.randrange(wallets):040x}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    monitor_task = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done = True
+    await monitor_task
+
+    print(
+        f"{label:<9} {logins / elapsed:8.0f} logins/s  p50={statistics.median(latencies):8.2f}ms  "
+        f"p99={pct(latencies, 0.99):8.2f}ms  loop lag p99={pct(lags, 0.99):7.2f}ms  "
+        f"firebase calls={fake.calls}"
+    )
+
+
+async def main(logins: int, wallets: int, concurrency: int, firebase_ms: float):
+    fake = FakeFirebaseAuth(firebase_ms)
+    wallet_auth_service._firebase_auth = fake
+
+    async def inline(wallet):
+        return inline_login(fake, wallet)
+
+    print(f"{logins} logins over {wallets} wallets, concurrency {concurrency}, "
+          f"Firebase round trip {firebase_ms}ms, {settings.FIREBASE_AUTH_MAX_WORKERS} auth threads\n")
+    await run("inline", inline, logins, wallets, concurrency, fake)
+    fake.users.clear()
+
+    redis_service.client = None
+    await run("executor", wallet_auth_service.login, logins, wallets, concurrency, fake)
+    fake.users.clear()
+
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True
+    )
+    try:
+        await client.ping()
+    except Exception as e:
+        print(f"cached    skipped (Redis unavailable: {e})")
+        return
+    redis_service.client = client
+    try:
+        await run("cached", wallet_auth_service.login, logins, wallets, concurrency, fake)
+        await run("cached 2", wallet_auth_service.login, logins, wallets, concurrency, fake)
+    finally:
+        keys = [f"auth:{kind}:0x{i:040x}" for i in range(wallets) for kind in ("uid", "token")]
+        for start in range(0, len(keys), 1000):
+            await client.delete(*keys[start:start + 1000])
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--wallets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--firebase-ms", type=float, default=40, help="Simulated Firebase Auth round trip")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.wallets, args.concurrency, args.firebase_ms))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Chain benchmark - indexer sync, NFT reads and settlement round trips offline
+
+Seeds the local OneChain stand-in (fakes.sui_chain) with minted, bred,
+listed and traded NFTs, then times the chain paths against it with a
+simulated RPC latency. Uses a scratch SQLite index. Run from backend/:
+
+    python -m benchmarks.chain_benchmark --players 200 --latency-ms 80
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from config import settings
+from fakes.sui_chain import LocalSuiChain
+from services.chain_indexer import ChainIndexStore, ChainIndexer
+from services.marketplace_index import MarketplaceIndex
+from services.sui_rpc import SuiRpcClient
+
+STARTERS = [(1, "Bulbasaur", ["grass", "poison"]), (4, "Charmander", ["fire"]), (7, "Squirtle", ["water"])]
+
+
+def seed(chain: LocalSuiChain, players: int) -> dict:
+    """Give every player a starter, a captured Pokémon and an egg; list and trade some of them"""
+    package = chain.package_id
+    owners = {}
+    for i in range(players):
+        player = f"0x{i:064x}"
+        species, name, types = random.choice(STARTERS)
+        chain.execute({"sender": player, "calls": [
+            {"target": f"{package}::pokemon::mint_starter", "arguments": [species, name, types, "0x6"]},
+            {"target": f"{package}::pokemon::mint_captured", "arguments": [random.randint(10, 151), "Wild", random.randint(2, 30), ["normal"], "0x6"]},
+            {"target": f"{package}::egg::breed_pokemon", "arguments": [species, 25, [1, 2, 3], "0x6"]},
+        ]})
+        owners[player] = [oid for oid, obj in chain.objects.items() if obj["owner"] == player]
+
+    pokemon_type = f"{package}::pokemon::Pokemon"
+    for player, object_ids in owners.items():
+        if random.random() < 0.3:
+            nft = next(oid for oid in object_ids if chain.objects[oid]["type"] == pokemon_type)
+            chain.execute({"sender": player, "calls": [
+                {"target": f"{package}::marketplace::list_pokemon", "arguments": [chain.marketplace_id, nft, random.randint(1, 100) * 10**8]},
+            ]})
+    for nft, listing in list(chain.listings.items())[::3]:
+        buyer = random.choice(list(owners))
+        if buyer != listing["seller"]:
+            coin = chain.mint_coin(buyer, listing["price"] * 2)
+            chain.execute({"sender": buyer, "calls": [
+                {"target": f"{package}::marketplace::buy_pokemon", "arguments": [chain.marketplace_id, nft, coin]},
+            ]})
+    return owners
+
+
+def transfer_some(chain: LocalSuiChain, owners: dict, share: float = 0.1) -> int:
+    """Wallet-to-wallet transfers, which never call the package"""
+    players = list(owners)
+    moved = 0
+    for player in players:
+        held = [oid for oid, obj in chain.objects.items() if obj["owner"] == player and oid in owners[player]]
+        if held and random.random() < share:
+            recipient = random.choice([p for p in players if p != player])
+            chain.transfer_objects(player, held[:1], recipient)
+            owners[player].remove(held[0])
+            owners[recipient].append(held[0])
+            moved += 1
+    return moved
+
+
+async def timed(label: str, runs: int, op):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await op()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} p50={p50:8.3f}ms  p99={p99:8.3f}ms  ({runs} runs)")
+
+
+async def main(players: int, runs: int, latency_ms: float, jitter_ms: float, page_size: int):
+    for name in ("httpx", "services.chain_indexer"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    chain = LocalSuiChain(latency_ms=latency_ms, jitter_ms=jitter_ms)
+    owners = seed(chain, players)
+    print(f"Seeded {len(chain.transactions):,} transactions, {len(chain.objects):,} objects, "
+          f"{len(chain.listings):,} open listings\n")
+
+    rpc = SuiRpcClient("http://local-chain/", transport=httpx.ASGITransport(app=chain.app))
+    tmp = tempfile.mkdtemp()
+    store = ChainIndexStore(os.path.join(tmp, "chain_index.db"))
+    marketplace = MarketplaceIndex(store)
+    indexer = ChainIndexer(store, rpc, chain.package_id)
+    indexer.page_size = page_size
+
+    try:
+        started = time.perf_counter()
+        applied = await indexer.sync_once()
+        elapsed = time.perf_counter() - started
+        print(f"{'initial sync':<28} {applied:,} txs in {elapsed:.2f}s "
+              f"({applied / elapsed:,.0f} tx/s, {chain.request_count} RPC calls)")
+
+        moved = transfer_some(chain, owners)
+        indexed = len(await store.query("SELECT 1 FROM nfts WHERE listed = 0"))
+        indexer.owner_refresh_size = indexed
+        started = time.perf_counter()
+        refreshed = await indexer.refresh_owners()
+        elapsed = time.perf_counter() - started
+        print(f"{'owner refresh':<28} {indexed:,} NFTs in {elapsed:.2f}s ({moved} wallet transfers, {refreshed} owners updated)")
+        assert refreshed == moved, f"owner refresh missed transfers: {refreshed} != {moved}"
+
+        player = lambda: random.choice(list(owners))
+        package = chain.package_id
+
+        async def new_tx_then_sync():
+            chain.execute({"sender": player(), "calls": [
+                {"target": f"{package}::egg::breed_pokemon", "arguments": [1, 4, [], "0x6"]},
+            ]})
+            await indexer.sync_once()
+
+        await timed("incremental sync (1 tx)", min(runs, 200), new_tx_then_sync)
+        await timed("owner NFTs (index)", runs, lambda: store.get_owner_nfts(player()))
+        await timed("owner NFTs (RPC)", min(runs, 200), lambda: rpc.call("suix_getOwnedObjects", [
+            player(), {"filter": {"StructType": f"{package}::pokemon::Pokemon"}}, None, 50
+        ]))
+        await timed("listings page (price_asc)", runs, lambda: marketplace.search(limit=20))
+
+        async def settlement_round_trip():
+            owner = player()
+            pokemon = [oid for oid in owners[owner] if oid in chain.objects and chain.objects[oid]["owner"] == owner
+                       and chain.objects[oid]["type"].endswith("::pokemon::Pokemon")]
+            calls = [
+                {"target": f"{package}::pokemon::update_stats", "arguments": [oid, 1000, 10, 60, 60, 60, 60]}
+                for oid in pokemon
+            ] or [{"target": f"{package}::egg::breed_pokemon", "arguments": [1, 4, [], "0x6"]}]
+            tx = await rpc.call("local_executeTransaction", [{"sender": owner, "calls": calls}])
+            confirmed = await rpc.call("sui_getTransactionBlock", [tx["digest"], {"showEffects": True}])
+            assert confirmed["effects"]["status"]["status"] == "success"
+
+        await timed("settlement execute+confirm", min(runs, 200), settlement_round_trip)
+    finally:
+        await rpc.close()
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=80, help="Simulated RPC round trip")
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--page-size", type=int, default=settings.CHAIN_INDEXER_PAGE_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.players, args.runs, args.latency_ms, args.jitter_ms, args.page_size))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark - the Vercel entry point (api/index.py) from a fresh process
+
+Each run starts a new interpreter, imports api.index and serves a first
+request through the ASGI app in-process, as a new serverless instance
+would. Reports process start to import, import time and first-request
+latency. Run from backend/:
+
+    python -m benchmarks.cold_start --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import api.index
+imported = time.perf_counter()
+import httpx
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=api.index.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+        timings = {}
+        for label, method, path, body in REQUESTS:
+            t = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            timings[label] = ((time.perf_counter() - t) * 1000, response.status_code)
+        return timings
+
+REQUESTS = [
+    ("health", "GET", "/api/health", None),
+    ("calculate-damage", "POST", "/api/battle/calculate-damage", {
+        "attacker": {"level": 10, "stats": {"attack": 60}, "types": ["fire"]},
+        "defender": {"stats": {"defense": 50}, "types": ["grass"]},
+        "move": {"name": "Ember", "type": "fire", "power": 40},
+    }),
+]
+print(json.dumps({"import_ms": (imported - started) * 1000, "requests": asyncio.run(first_requests())}))
+"""
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main(runs: int):
+    results = []
+    for _ in range(runs):
+        spawned = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            capture_output=True,
+            text=True,
+            cwd=os.getcwd(),
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+        )
+        total_ms = (time.perf_counter() - spawned) * 1000
+        if output.returncode != 0:
+            raise RuntimeError(output.stderr[-2000:])
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        result["total_ms"] = total_ms
+        results.append(result)
+
+    def report(label, samples):
+        print(f"{label:<28} p50={statistics.median(samples):8.1f}ms  p90={pct(samples, 0.9):8.1f}ms")
+
+    print(f"Cold starts of api.index ({runs} runs)\n")
+    report("import api.index", [r["import_ms"] for r in results])
+    for label in results[0]["requests"]:
+        status = results[0]["requests"][label][1]
+        report(f"first {label} ({status})", [r["requests"][label][0] for r in results])
+    report("process total", [r["total_ms"] for r in results])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    main(args.runs)
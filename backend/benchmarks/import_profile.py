@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Import profiler - per-module import cost of an entry point
+
+Imports the target in fresh interpreters with `python -X importtime`,
+keeps the fastest of --runs samples per module (to drop disk cache noise)
+and reports the most expensive modules by cumulative and self time, plus
+self time summed per top-level package. Run from backend/:
+
+    python -m benchmarks.import_profile api.index
+    python -m benchmarks.import_profile main --top 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+def sample(target: str) -> Dict[str, Tuple[int, int]]:
+    """One cold import: {module: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        timings[module.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main(target: str, runs: int, top: int):
+    best: Dict[str, Tuple[int, int]] = {}
+    for _ in range(runs):
+        for module, (self_us, cumulative_us) in sample(target).items():
+            previous = best.get(module)
+            if previous is None or cumulative_us < previous[1]:
+                best[module] = (self_us, cumulative_us)
+
+    total = best.get(target, (0, 0))[1]
+    print(f"import {target}: {total / 1000:.1f}ms (best of {runs}), {len(best)} modules\n")
+
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for module, (self_us, cumulative_us) in sorted(best.items(), key=lambda kv: -kv[1][1])[:top]:
+        print(f"{cumulative_us / 1000:9.1f}ms {self_us / 1000:7.1f}ms  {module}")
+
+    packages = defaultdict(int)
+    for module, (self_us, _) in best.items():
+        packages[module.split(".")[0]] += self_us
+    print(f"\n{'self':>9}  package")
+    for package, self_us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{self_us / 1000:7.1f}ms  {package}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", nargs="?", default="api.index", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    main(args.target, args.runs, args.top)
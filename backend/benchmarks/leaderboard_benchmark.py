@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Leaderboard benchmark - score updates and rank queries on a large ZSET
+
+Loads N synthetic players into a scratch board on the configured Redis,
+then times the operations the leaderboard endpoints use. Run from backend/:
+
+    python -m benchmarks.leaderboard_benchmark --players 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import redis.asyncio as redis
+
+from config import settings
+from services.redis_service import redis_service
+from services.leaderboard_service import leaderboard_service
+
+BENCH_KEY = "leaderboard:bench:xp"
+
+
+async def load_players(client, players: int, chunk: int = 10000):
+    for start in range(0, players, chunk):
+        mapping = {f"player-{i}": random.randint(0, 5_000_000) for i in range(start, min(start + chunk, players))}
+        await client.zadd(BENCH_KEY, mapping)
+
+
+async def timed(label: str, runs: int, op):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await op()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} p50={p50:7.3f}ms  p99={p99:7.3f}ms  ({runs} runs)")
+
+
+async def main(players: int, runs: int, keep: bool):
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True
+    )
+    await client.ping()
+    redis_service.client = client
+
+    print(f"Loading {players:,} players into {BENCH_KEY}...")
+    started = time.perf_counter()
+    await client.delete(BENCH_KEY)
+    await load_players(client, players)
+    print(f"Loaded in {time.perf_counter() - started:.1f}s\n")
+
+    def player():
+        return f"player-{random.randrange(players)}"
+
+    try:
+        await timed("incremental update", runs, lambda: leaderboard_service.add_scores(
+            {(BENCH_KEY, player()): random.randint(1, 500)}
+        ))
+        await timed("player rank", runs, lambda: leaderboard_service.get_player(BENCH_KEY, player()))
+        await timed("around-me (radius 5)", runs, lambda: leaderboard_service.get_player(BENCH_KEY, player(), 5))
+        await timed("top page (50)", runs, lambda: leaderboard_service.get_page(BENCH_KEY, 0, 50))
+        await timed("deep page (50)", runs, lambda: leaderboard_service.get_page(
+            BENCH_KEY, random.randrange(max(1, players - 50)), 50
+        ))
+    finally:
+        if not keep:
+            await client.delete(BENCH_KEY)
+            await client.srem(leaderboard_service.boards_key, BENCH_KEY)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true", help="Leave the scratch board in Redis")
+    args = parser.parse_args()
+    asyncio.run(main(args.players, args.runs, args.keep))
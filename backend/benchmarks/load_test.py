@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Load test - Scripted player journeys against uvicorn workers backed by local stand-ins
+
+Starts the stand-in stack (fakes.stack: PokéAPI, Gemini, DeepSeek, Firebase
+Auth, OneChain RPC and a Redis fault proxy), then for each --workers
+configuration starts `uvicorn main:app --workers N` pointed at it and steps
+through --users concurrent virtual players. Each player logs in, is given a
+quest, and then loops over journeys:
+
+  adventure     random encounter + AI encounter text -> 3 battle turns
+                (damage + AI move) -> capture -> XP award (quest progress)
+                -> active quests
+  trainer_chat  a Professor Oak chat message (DeepSeek)
+  collection    owned NFTs (OneChain RPC) and the global leaderboard
+
+Per step it reports requests/s, journeys/s, p50/p99 latency and error
+rate. A step is saturated when throughput grows by less than --min-gain
+over the previous step, p99 exceeds --p99-slo-ms or errors exceed
+--max-error-rate; the last step before that is the configuration's
+saturation point. Stepping stops at the first saturated step.
+
+The Gemini quota (GEMINI_RATE_LIMIT_PER_MINUTE, per worker) is kept, so
+AI routes queue once it is used up; export a higher value to size workers
+without it. The Redis proxy forwards to a real Redis: --redis-db must be
+an empty scratch database on the configured REDIS_HOST, and is flushed
+after each worker configuration. Run from backend/:
+
+    python -m benchmarks.load_test --workers 1 2 4 --users 10 25 50 100 200 --step-seconds 30
+    python -m benchmarks.load_test --workers 2 --error-rate 0.01 --set gemini.rate_limit_rate=0.05
+
+The load generator is a single event loop; "loop lag" in the report is
+how late its own timers fire. Past ~20ms the generator, not the server,
+is the bottleneck: use fewer users per run or more --think-ms.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import redis.asyncio as redis
+
+from config import settings
+from fakes.stack import FakeStack, stack_config, add_stack_arguments
+
+MOVES = [
+    {"name": "Tackle", "type": "normal", "power": 40, "accuracy": 1.0},
+    {"name": "Ember", "type": "fire", "power": 40, "accuracy": 1.0},
+    {"name": "Water Gun", "type": "water", "power": 40, "accuracy": 1.0},
+    {"name": "Vine Whip", "type": "grass", "power": 45, "accuracy": 1.0},
+]
+JOURNEY_WEIGHTS = {"adventure": 0.8, "trainer_chat": 0.1, "collection": 0.1}
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+class Recorder:
+    """Latencies and failures of one load step, per request label and per journey"""
+
+    def __init__(self):
+        self.requests: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.journeys: Dict[str, List[float]] = defaultdict(list)
+        self.loop_lag: List[float] = []
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.requests[label].append((time.perf_counter() - started) * 1000)
+        if response is None or response.status_code >= 500 or response.status_code == 429:
+            self.errors[label] += 1
+            return None
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = [latency for samples in self.requests.values() for latency in samples]
+        errors = sum(self.errors.values())
+        return {
+            "requests": len(latencies),
+            "requests_per_s": round(len(latencies) / elapsed, 1),
+            "journeys_per_s": round(sum(len(samples) for samples in self.journeys.values()) / elapsed, 2),
+            "p50_ms": round(pct(latencies, 0.5), 1),
+            "p99_ms": round(pct(latencies, 0.99), 1),
+            "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+            "loop_lag_p99_ms": round(pct(self.loop_lag, 0.99), 1),
+            "routes": {
+                label: {
+                    "count": len(samples),
+                    "p50_ms": round(pct(samples, 0.5), 1),
+                    "p99_ms": round(pct(samples, 0.99), 1),
+                    "errors": self.errors.get(label, 0),
+                }
+                for label, samples in sorted(self.requests.items())
+            },
+            "journeys": {
+                name: {"count": len(samples), "p99_ms": round(pct(samples, 0.99), 1)}
+                for name, samples in sorted(self.journeys.items())
+            },
+        }
+
+
+class Player:
+    """One virtual player running journeys until the step ends"""
+
+    def __init__(self, index: int, run_id: str, client: httpx.AsyncClient, recorder: Recorder, think: float):
+        self.player_id = f"load-{run_id}-{index}"
+        self.wallet = f"0x{run_id}{index:08x}"
+        self.level = random.randint(5, 40)
+        self.client = client
+        self.recorder = recorder
+        self.think = think
+
+    async def _call(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        response = await self.recorder.request(self.client, label, method, url, **kwargs)
+        if self.think:
+            await asyncio.sleep(random.expovariate(1 / self.think))
+        return response
+
+    async def start(self):
+        await self._call("POST /api/auth/wallet", "POST", "/api/auth/wallet", json={"walletAddress": self.wallet})
+        await self._call("POST /api/quests/generate", "POST", "/api/quests/generate", json={
+            "player_team": [{"name": "Charmander", "types": ["fire"], "level": self.level}],
+            "player_level": self.level,
+            "player_id": self.player_id,
+        })
+
+    async def adventure(self):
+        response = await self._call("GET /api/pokemon/random", "GET", "/api/pokemon/random")
+        if response is None:
+            return
+        wild = response.json()
+        wild_level = max(1, self.level + random.randint(-5, 5))
+        await self._call("POST /api/ai/encounter", "POST", "/api/ai/encounter", json={
+            "pokemon_name": wild["name"], "pokemon_types": wild["types"], "pokemon_level": wild_level,
+        })
+        mine = {"name": "Charmander", "level": self.level, "types": ["fire"], "stats": {"hp": 80, "attack": 60, "defense": 50}}
+        theirs = {"name": wild["name"], "level": wild_level, "types": wild["types"], "stats": wild["stats"]}
+        for _ in range(3):
+            move = random.choice(MOVES)
+            await self._call("POST /api/battle/calculate-damage", "POST", "/api/battle/calculate-damage", json={
+                "attacker": mine, "defender": theirs, "move": move,
+            })
+            await self._call("POST /api/ai/move", "POST", "/api/ai/move", json={
+                "ai_pokemon": theirs, "player_pokemon": mine, "available_moves": MOVES,
+            })
+        await self._call("POST /api/battle/capture-rate", "POST", "/api/battle/capture-rate", json={
+            "pokemon_id": wild["id"],
+            "health_percent": round(random.uniform(0.1, 0.5), 2),
+            "rarity": wild["rarity"],
+            "player_id": self.player_id,
+        })
+        await self._call("POST /api/battle/award-xp", "POST", "/api/battle/award-xp", params={
+            "winner_level": self.level, "loser_level": wild_level, "player_id": self.player_id, "pokemon_types": ["fire"],
+        })
+        await self._call("GET /api/quests/active/{player_id}", "GET", f"/api/quests/active/{self.player_id}")
+
+    async def trainer_chat(self):
+        await self._call("POST /api/trainer/chat", "POST", "/api/trainer/chat", json={
+            "message": "Which type should I use against a Grass Pokémon?",
+        })
+
+    async def collection(self):
+        await self._call("GET /api/blockchain/nfts/{address}", "GET", f"/api/blockchain/nfts/{self.wallet}")
+        await self._call("GET /api/leaderboard/{board}", "GET", "/api/leaderboard/global", params={"limit": 20})
+
+    async def run(self, deadline: float):
+        await self.start()
+        names, weights = zip(*JOURNEY_WEIGHTS.items())
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            await getattr(self, name)()
+            self.recorder.journeys[name].append((time.perf_counter() - started) * 1000)
+
+
+async def measure_loop_lag(recorder: Recorder, deadline: float, interval: float = 0.05):
+    while time.monotonic() < deadline:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        recorder.loop_lag.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+
+async def run_step(base_url: str, users: int, seconds: float, think: float, run_id: str) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        deadline = started + seconds
+        players = [Player(i, run_id, client, recorder, think) for i in range(users)]
+        await asyncio.gather(measure_loop_lag(recorder, deadline), *(player.run(deadline) for player in players))
+        elapsed = time.monotonic() - started
+    return recorder.summary(elapsed)
+
+
+def start_server(workers: int, port: int, env: Dict[str, str], log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_healthy(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError("Backend did not become healthy")
+
+
+def saturated(step: dict, previous: Optional[dict], args) -> Optional[str]:
+    """Why this step counts as saturated, or None"""
+    if step["error_rate"] > args.max_error_rate:
+        return f"errors {step['error_rate']:.1%}"
+    if step["p99_ms"] > args.p99_slo_ms:
+        return f"p99 {step['p99_ms']:.0f}ms"
+    if previous and step["requests_per_s"] < previous["requests_per_s"] * (1 + args.min_gain):
+        return f"throughput +{step['requests_per_s'] / previous['requests_per_s'] - 1:.0%}"
+    return None
+
+
+async def run_configuration(workers: int, args, env: Dict[str, str], scratch) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    log = open(args.server_log, "a", encoding="utf-8") if args.server_log else subprocess.DEVNULL
+    server = start_server(workers, args.port, env, log)
+    steps, saturation = [], None
+    try:
+        await wait_until_healthy(base_url, server)
+        if args.warmup_seconds:
+            # Startup pre-fetching, lazy SDK imports and cold caches are not steady state
+            await run_step(base_url, args.users[0], args.warmup_seconds, args.think_ms / 1000, f"{workers}w-warmup")
+        print(f"\n{workers} worker(s)")
+        print(f"  {'users':>6} {'req/s':>9} {'journeys/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'loop lag':>9}")
+        previous = None
+        for users in args.users:
+            step = await run_step(base_url, users, args.step_seconds, args.think_ms / 1000, f"{workers}w{users}u")
+            step["users"] = users
+            reason = saturated(step, previous, args)
+            step["saturated"] = reason
+            steps.append(step)
+            print(f"  {users:>6} {step['requests_per_s']:>9} {step['journeys_per_s']:>11} {step['p50_ms']:>8} "
+                  f"{step['p99_ms']:>8} {step['error_rate']:>7.1%} {step['loop_lag_p99_ms']:>8}ms"
+                  f"{'  saturated: ' + reason if reason else ''}")
+            if reason:
+                break
+            saturation = step
+            previous = step
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        if args.server_log:
+            log.close()
+        await scratch.flushdb()
+
+    if saturation:
+        print(f"  saturation point: {saturation['users']} users, {saturation['requests_per_s']} req/s, p99 {saturation['p99_ms']}ms")
+    else:
+        print("  saturated at the first step: start with fewer --users")
+    return {
+        "workers": workers,
+        "steps": steps,
+        "saturation": saturation and {
+            "users": saturation["users"],
+            "requests_per_s": saturation["requests_per_s"],
+            "p99_ms": saturation["p99_ms"],
+        },
+    }
+
+
+async def main(args):
+    scratch = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=args.redis_db,
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True
+    )
+    await scratch.ping()
+    if await scratch.dbsize():
+        raise SystemExit(f"Redis db {args.redis_db} is not empty; pick an empty scratch --redis-db")
+
+    config = stack_config(args.error_rate, args.rate_limit_rate, args.set)
+    stack = FakeStack(config, redis_upstream=f"{settings.REDIS_HOST}:{settings.REDIS_PORT}")
+    env = {
+        **stack.env(),
+        "REDIS_DB": str(args.redis_db),
+        "TRACING_ENABLED": "false",
+    }
+    results = []
+    stack.start()
+    try:
+        for name, entry in config.items():
+            print(f"{name:9} {entry['latency_ms']}±{entry['jitter_ms']}ms  errors {entry['error_rate']:.1%}  "
+                  f"429s {entry['rate_limit_rate']:.1%}")
+        for workers in args.workers:
+            results.append(await run_configuration(workers, args, env, scratch))
+    finally:
+        stack.stop()
+        await scratch.aclose()
+
+    print("\nSaturation points")
+    for result in results:
+        point = result["saturation"]
+        summary = f"{point['users']} users, {point['requests_per_s']} req/s, p99 {point['p99_ms']}ms" if point else "below the first step"
+        print(f"  {result['workers']} worker(s): {summary}")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"stand_ins": config, "args": {k: v for k, v in vars(args).items() if k != "save"}, "results": results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="uvicorn worker counts to compare")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 25, 50, 100, 200], help="Concurrent players per step")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--warmup-seconds", type=float, default=15, help="Unmeasured load before the first step")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a player's requests")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the backend under test")
+    parser.add_argument("--redis-db", type=int, default=15, help="Empty scratch Redis database")
+    parser.add_argument("--p99-slo-ms", type=float, default=3000)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Throughput gain below which a step is saturated")
+    parser.add_argument("--save", help="Write all steps to this JSON file")
+    parser.add_argument("--server-log", help="Append the backend's output to this file (default: discarded)")
+    add_stack_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Matchmaking load test - pairing latency with thousands of queued players
+
+Pre-fills the queues with a backlog of waiting players, starts the
+background matcher and then streams new players in at a fixed arrival
+rate, all against the configured Redis. Reports enqueue (pairing call)
+latency, matcher tick duration and time spent waiting in the queue, and
+exits non-zero when the enqueue p99 exceeds --max-enqueue-p99-ms or fewer
+than --min-matched of all players were paired.
+
+--db must name a scratch Redis database other than the configured REDIS_DB
+with no matchmaking state in it; afterwards the run deletes only the queue
+keys and battle sessions it created. Run from backend/:
+
+    python -m benchmarks.matchmaking_load --db 15 --backlog 5000 --arrivals 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+import redis.asyncio as redis
+
+from config import settings
+from models.battle import MatchTicket
+from services.redis_service import redis_service
+from services.matchmaking_service import matchmaking_service
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return "n/a"
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50={p50:8.2f}ms  p99={p99:8.2f}ms  max={samples[-1]:8.2f}ms  (n={len(samples)})"
+
+
+def p99(samples) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+
+
+def random_level() -> int:
+    # Most players sit in the low-to-mid levels, a few are far ahead
+    return max(1, min(100, int(random.gauss(25, 15))))
+
+
+async def prefill(client, players: int, enqueued_at: dict):
+    """Queue a backlog directly, without matching, to start from a full queue"""
+    now_ms = int(time.time() * 1000)
+    async with client.pipeline(transaction=False) as pipe:
+        for i in range(players):
+            ticket = MatchTicket(player_id=f"backlog-{i}", level=random_level())
+            pipe.hset(matchmaking_service.levels_key, ticket.player_id, ticket.level)
+            pipe.hset(matchmaking_service.tickets_key, ticket.player_id, ticket.model_dump_json())
+            pipe.zadd(
+                matchmaking_service._queue_key(matchmaking_service.bucket_for(ticket.level)),
+                {ticket.player_id: now_ms}
+            )
+            enqueued_at[ticket.player_id] = now_ms
+        await pipe.execute()
+
+
+async def cleanup(client, battle_ids):
+    """Delete the matchmaking keys (absent before the run) and this run's battle sessions"""
+    keys = [key async for key in client.scan_iter("matchmaking:{mm}:*")]
+    keys += [matchmaking_service._session_key(battle_id) for battle_id in battle_ids]
+    for i in range(0, len(keys), 1000):
+        await client.delete(*keys[i:i + 1000])
+
+
+async def main(
+    backlog: int,
+    arrivals: int,
+    rate: float,
+    concurrency: int,
+    settle: float,
+    db: int,
+    max_enqueue_p99_ms: float,
+    min_matched: float
+) -> bool:
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=db,
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True
+    )
+    await client.ping()
+    if [key async for key in client.scan_iter("matchmaking:{mm}:*", count=1000)]:
+        raise SystemExit(f"Redis db {db} already holds matchmaking:* keys; pick a scratch --db")
+    redis_service.client = client
+
+    enqueued_at = {}
+    enqueue_ms = []
+    tick_ms = []
+
+    print(f"Pre-filling {backlog:,} queued players...")
+    await prefill(client, backlog, enqueued_at)
+
+    async def matcher():
+        while True:
+            started = time.perf_counter()
+            await matchmaking_service.match_waiting()
+            tick_ms.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(matchmaking_service.tick_interval)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def arrive(i: int):
+        async with semaphore:
+            ticket = MatchTicket(player_id=f"arrival-{i}", level=random_level())
+            enqueued_at[ticket.player_id] = int(time.time() * 1000)
+            started = time.perf_counter()
+            await matchmaking_service.enqueue(ticket)
+            enqueue_ms.append((time.perf_counter() - started) * 1000)
+
+    matcher_task = asyncio.create_task(matcher())
+    print(f"Streaming {arrivals:,} arrivals at {rate:,.0f}/s (concurrency {concurrency})...")
+    started = time.perf_counter()
+    tasks = []
+    for i in range(arrivals):
+        tasks.append(asyncio.create_task(arrive(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(settle)
+    matcher_task.cancel()
+
+    matches = await client.hgetall(matchmaking_service.matches_key)
+    waits = [
+        json.loads(raw)["matched_at"] - enqueued_at[player_id]
+        for player_id, raw in matches.items()
+        if player_id in enqueued_at
+    ]
+    still_queued = await client.hlen(matchmaking_service.levels_key)
+    battle_ids = {json.loads(raw)["battle_id"] for raw in matches.values()}
+
+    print(f"\nArrivals done in {elapsed:.1f}s ({arrivals / elapsed:,.0f}/s)")
+    print(f"enqueue + pairing call   {percentiles(enqueue_ms)}")
+    print(f"matcher tick             {percentiles(tick_ms)}")
+    print(f"time in queue            {percentiles(waits)}")
+    print(f"players matched          {len(matches):,} of {backlog + arrivals:,} ({still_queued:,} still queued)")
+
+    await cleanup(client, battle_ids)
+    await client.aclose()
+
+    failures = []
+    if p99(enqueue_ms) > max_enqueue_p99_ms:
+        failures.append(f"enqueue p99 {p99(enqueue_ms):.2f}ms is above {max_enqueue_p99_ms:.2f}ms")
+    matched_share = len(matches) / (backlog + arrivals)
+    if matched_share < min_matched:
+        failures.append(f"only {matched_share:.1%} of players were matched (minimum {min_matched:.1%})")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backlog", type=int, default=5000, help="Players already waiting at start")
+    parser.add_argument("--arrivals", type=int, default=5000, help="Players joining during the run")
+    parser.add_argument("--rate", type=float, default=1000, help="Arrivals per second")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--settle", type=float, default=5, help="Seconds to let the matcher drain afterwards")
+    parser.add_argument("--db", type=int, required=True, help="Scratch Redis DB, not the configured REDIS_DB")
+    parser.add_argument("--max-enqueue-p99-ms", type=float, default=50, help="Fail above this enqueue p99")
+    parser.add_argument("--min-matched", type=float, default=0.9, help="Fail below this share of players matched")
+    args = parser.parse_args()
+    if args.db == settings.REDIS_DB:
+        parser.error(f"--db {args.db} is the configured REDIS_DB; pick a scratch database")
+    passed = asyncio.run(main(
+        args.backlog, args.arrivals, args.rate, args.concurrency, args.settle, args.db,
+        args.max_enqueue_p99_ms, args.min_matched
+    ))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Pokémon endpoint benchmark - /api/pokemon/{id} and /api/pokemon/random, before and after
+
+Serves both endpoints through the ASGI app in-process and compares:
+
+  before  the previous handlers: Redis read, PokemonData validation in the
+          service, response_model validation and JSONResponse encoding
+  after   the current routes: ORJSONResponse app, trusted cache reads and
+          per-species pre-serialized bodies
+
+Species records are seeded into a scratch Redis database (--redis-db, on
+the configured REDIS_HOST) and deleted afterwards, so no PokéAPI calls are
+made. Run from backend/:
+
+    python -m benchmarks.pokemon_endpoints --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+import httpx
+import redis.asyncio as redis
+from fastapi import FastAPI, APIRouter, HTTPException
+
+from config import settings
+from models.pokemon import PokemonData, Rarity
+from services.redis_service import redis_service
+from services.pokemon_service import pokemon_service
+from app_factory import create_app
+
+SPECIES = range(1, 152)
+
+
+def species_record(pokemon_id: int) -> dict:
+    """A PokéAPI-shaped cache entry, as get_pokemon stores it"""
+    rng = random.Random(pokemon_id)
+    return {
+        "id": pokemon_id,
+        "name": f"species-{pokemon_id}",
+        "types": rng.sample(["fire", "water", "grass", "electric", "psychic", "normal"], rng.randint(1, 2)),
+        "stats": {name: rng.randint(20, 150) for name in ("hp", "attack", "defense", "speed")},
+        "sprite": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png",
+        "back_sprite": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/back/{pokemon_id}.png",
+        "rarity": pokemon_service.determine_rarity(pokemon_id).value,
+    }
+
+
+def legacy_app() -> FastAPI:
+    """The two endpoints as they were before pre-serialized responses"""
+    router = APIRouter()
+
+    async def legacy_get_pokemon(pokemon_id: int) -> PokemonData:
+        cached_data = await redis_service.get(f"pokemon:{pokemon_id}")
+        if isinstance(cached_data, str):
+            return PokemonData(**json.loads(cached_data))
+        return PokemonData(**cached_data)
+
+    @router.get("/random", response_model=PokemonData)
+    async def get_random_pokemon(rarity: Optional[Rarity] = None):
+        try:
+            return await legacy_get_pokemon(pokemon_service.random_pokemon_id(rarity))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.get("/{pokemon_id}", response_model=PokemonData)
+    async def get_pokemon(pokemon_id: int):
+        try:
+            return await legacy_get_pokemon(pokemon_id)
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=f"Pokémon not found: {str(e)}")
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/pokemon")
+    return app
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+async def run_endpoint(app: FastAPI, path_for, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm-up: fills the per-species body cache in the "after" app
+        for pokemon_id in SPECIES:
+            (await client.get(f"/api/pokemon/{pokemon_id}")).raise_for_status()
+
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(path_for(i))
+
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                t = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - t) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "requests_per_s": round(requests / elapsed),
+        "p50_ms": round(pct(latencies, 0.5), 3),
+        "p99_ms": round(pct(latencies, 0.99), 3),
+    }
+
+
+async def main(args):
+    client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=args.redis_db,
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True
+    )
+    await client.ping()
+    redis_service.client = client
+    keys = [f"pokemon:{pokemon_id}" for pokemon_id in SPECIES]
+    if await client.exists(*keys):
+        raise SystemExit(f"Redis db {args.redis_db} already holds pokemon:* keys; pick an empty --redis-db")
+
+    async with client.pipeline(transaction=False) as pipe:
+        for pokemon_id, key in zip(SPECIES, keys):
+            pipe.set(key, json.dumps(species_record(pokemon_id)), ex=3600)
+        await pipe.execute()
+
+    endpoints = {
+        "/api/pokemon/{id}": lambda i: f"/api/pokemon/{SPECIES[i % len(SPECIES)]}",
+        "/api/pokemon/random": lambda i: "/api/pokemon/random",
+    }
+    apps = {"before": legacy_app(), "after": create_app("server")}
+    try:
+        print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}")
+        for endpoint, path_for in endpoints.items():
+            results = {}
+            for label, app in apps.items():
+                results[label] = await run_endpoint(app, path_for, args.requests, args.concurrency)
+                print(f"  {endpoint:22} {label:6} {results[label]}")
+            speedup = results["after"]["requests_per_s"] / max(1, results["before"]["requests_per_s"])
+            print(f"  {endpoint:22} speedup x{speedup:.2f}")
+    finally:
+        await client.delete(*keys)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis-db", type=int, default=15, help="Scratch Redis database for the seeded species")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite - Battle engine, services and routes against local fakes, with saved baselines
+
+Groups:
+
+  engine   BattleEngine methods, in-process (ns/op)
+  pokemon  PokemonService Redis hit, body-cache hit and PokéAPI miss paths,
+           with fakes.redis_store.FakeRedis and fakes.pokeapi.LocalPokeApi
+  gemini   GeminiService calls under concurrency with fakes.gemini.FakeGenerativeModel
+           (--gemini-latency-ms per call) and the rate limiter lifted
+  routes   End-to-end requests through create_app("server") over an ASGI client
+
+Nothing leaves the process: no Redis, PokéAPI or Gemini is needed. Run from
+backend/, save a baseline, and compare later runs against it:
+
+    python -m benchmarks.suite run --save benchmarks/baseline.json
+    python -m benchmarks.suite run --compare benchmarks/baseline.json
+    python -m benchmarks.suite compare old.json new.json --threshold 0.15
+
+A case regresses when its ops/s drops by more than --threshold; compare
+exits with status 1 if any case does.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from fakes.gemini import FakeGenerativeModel
+from fakes.pokeapi import LocalPokeApi
+from fakes.redis_store import FakeRedis
+from services.battle_engine import battle_engine
+from services.gemini_service import gemini_service, RateLimiter
+from services.pokemon_service import pokemon_service
+from services.redis_service import redis_service
+
+GROUPS = ("engine", "pokemon", "gemini", "routes")
+
+ATTACKER = {"level": 25, "stats": {"attack": 84}, "types": ["fire"]}
+DEFENDER = {"stats": {"defense": 78}, "types": ["grass", "poison"]}
+MOVE = {"name": "Flamethrower", "type": "fire", "power": 90}
+MOVES = [
+    {"name": "Ember", "type": "fire", "power": 40, "accuracy": 1.0},
+    {"name": "Scratch", "type": "normal", "power": 40, "accuracy": 1.0},
+    {"name": "Flamethrower", "type": "fire", "power": 90, "accuracy": 1.0},
+]
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def bench_sync(fn: Callable[[], object], iterations: int, rounds: int = 5) -> dict:
+    """Best of several rounds, so one scheduler hiccup does not become a regression"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter_ns() - started) / iterations)
+    return {"ns_per_op": round(best, 1), "ops_per_s": round(1e9 / best)}
+
+
+async def bench_async(fn: Callable[[int], Awaitable[object]], requests: int, concurrency: int) -> dict:
+    """requests calls of fn(i) spread over concurrency workers"""
+    latencies: List[float] = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await fn(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "ops_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(pct(latencies, 0.5), 3),
+        "p99_ms": round(pct(latencies, 0.99), 3),
+    }
+
+
+def engine_group(args) -> Dict[str, dict]:
+    n = 2000 if args.quick else 20000
+    cases = {
+        "engine.calculate_damage": lambda: battle_engine.calculate_damage(ATTACKER, DEFENDER, MOVE),
+        "engine.get_type_effectiveness": lambda: battle_engine.get_type_effectiveness("fire", ["grass", "poison"]),
+        "engine.calculate_capture_rate": lambda: battle_engine.calculate_capture_rate(0.3, "rare"),
+        "engine.attempt_capture": lambda: battle_engine.attempt_capture(25, 0.3, "uncommon"),
+        "engine.award_experience": lambda: battle_engine.award_experience(20, 24),
+        "engine.check_level_up": lambda: battle_engine.check_level_up(9000, 20),
+        "engine.calculate_stat_growth": lambda: battle_engine.calculate_stat_growth(84, 50),
+    }
+    return {name: bench_sync(fn, n) for name, fn in cases.items()}
+
+
+async def pokemon_group(args) -> Dict[str, dict]:
+    requests = 2000 if args.quick else 20000
+    species = range(1, 152)
+
+    async def redis_hit(i):
+        await pokemon_service.get_pokemon(species[i % len(species)])
+
+    async def body_hit(i):
+        await pokemon_service.get_pokemon_json(species[i % len(species)])
+
+    async def pokeapi_miss(i):
+        pokemon_id = species[i % len(species)]
+        await redis_service.client.delete(f"pokemon:{pokemon_id}")
+        await pokemon_service.get_pokemon(pokemon_id)
+
+    for pokemon_id in species:
+        await pokemon_service.get_pokemon_json(pokemon_id)
+
+    return {
+        "pokemon.get_pokemon.redis_hit": await bench_async(redis_hit, requests, 50),
+        "pokemon.get_pokemon_json.body_hit": await bench_async(body_hit, requests, 50),
+        "pokemon.get_pokemon.pokeapi_miss": await bench_async(pokeapi_miss, requests // 10, 20),
+    }
+
+
+async def gemini_group(args) -> Dict[str, dict]:
+    requests = 100 if args.quick else 400
+
+    async def commentary(i):
+        await gemini_service.generate_battle_commentary("Charmander", "Bulbasaur", "Ember", 18 + i % 5, 2.0)
+
+    async def move(i):
+        await gemini_service.select_ai_move({"name": "Charmander", "types": ["fire"]}, {"name": "Bulbasaur", "types": ["grass"]}, MOVES)
+
+    async def encounter(i):
+        await gemini_service.generate_encounter_text(f"pokemon-{i}", ["fire"], 5)
+
+    return {
+        "gemini.battle_commentary": await bench_async(commentary, requests, 20),
+        "gemini.select_ai_move": await bench_async(move, requests, 20),
+        "gemini.encounter_text.batched": await bench_async(encounter, requests, 20),
+    }
+
+
+async def routes_group(args) -> Dict[str, dict]:
+    from app_factory import create_app
+
+    requests = 1000 if args.quick else 10000
+    app = create_app("server")
+    damage = {"attacker": ATTACKER, "defender": DEFENDER, "move": MOVE}
+    ai_move = {"ai_pokemon": {"name": "Charmander", "types": ["fire"]}, "player_pokemon": {"name": "Bulbasaur", "types": ["grass"]}, "available_moves": MOVES}
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        def call(method: str, path_for, body=None):
+            async def run(i):
+                response = await client.request(method, path_for(i), json=body)
+                response.raise_for_status()
+            return run
+
+        cases = {
+            "routes.GET /api/health": call("GET", lambda i: "/api/health"),
+            "routes.GET /api/pokemon/{id}": call("GET", lambda i: f"/api/pokemon/{1 + i % 151}"),
+            "routes.GET /api/pokemon/random": call("GET", lambda i: "/api/pokemon/random"),
+            "routes.POST /api/battle/calculate-damage": call("POST", lambda i: "/api/battle/calculate-damage", damage),
+            "routes.POST /api/ai/move": call("POST", lambda i: "/api/ai/move", ai_move),
+        }
+        for name, fn in cases.items():
+            # Warm-up fills the species caches and lazy imports
+            await bench_async(fn, 200, 10)
+            count = requests // 10 if "/ai/" in name else requests
+            results[name] = await bench_async(fn, count, 50)
+    return results
+
+
+async def run_groups(args) -> Dict[str, dict]:
+    # Fakes in place of every upstream; FakeRedis serves both the cache and the app
+    redis_service.client = FakeRedis(latency_ms=args.redis_latency_ms)
+    pokeapi = LocalPokeApi(latency_ms=args.pokeapi_latency_ms)
+    pokemon_service.base_url = "http://pokeapi.local/api/v2"
+    pokemon_service._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=pokeapi.app))
+    gemini_service._model = FakeGenerativeModel(latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_latency_ms / 4)
+    gemini_service.rate_limiter = RateLimiter(max_calls=10 ** 9, time_window=60)
+
+    results: Dict[str, dict] = {}
+    try:
+        for group in args.only or GROUPS:
+            print(f"[{group}]", file=sys.stderr)
+            if group == "engine":
+                group_results = engine_group(args)
+            else:
+                group_results = await globals()[f"{group}_group"](args)
+            for name, result in group_results.items():
+                print(f"  {name:45} {result}", file=sys.stderr)
+            results.update(group_results)
+    finally:
+        await pokemon_service.close_client()
+    return results
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: dict, new: dict, threshold: float) -> bool:
+    """Print the ops/s change per case; False if any case regressed beyond threshold"""
+    ok = True
+    print(f"{'case':45} {'base ops/s':>12} {'new ops/s':>12} {'change':>8}")
+    for name, result in new["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            print(f"{name:45} {'-':>12} {result['ops_per_s']:>12} {'new':>8}")
+            continue
+        change = result["ops_per_s"] / old["ops_per_s"] - 1 if old["ops_per_s"] else 0.0
+        flag = ""
+        if change < -threshold:
+            flag, ok = "  REGRESSION", False
+        print(f"{name:45} {old['ops_per_s']:>12} {result['ops_per_s']:>12} {change:>+8.1%}{flag}")
+    for name in sorted(base["results"].keys() - new["results"].keys()):
+        print(f"{name:45} {'missing from new results':>34}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--only", nargs="+", choices=GROUPS, help="Groups to run (default: all)")
+    run.add_argument("--quick", action="store_true", help="Fewer iterations, for a smoke run")
+    run.add_argument("--save", help="Write results to this JSON file")
+    run.add_argument("--compare", help="Baseline JSON file to compare the results against")
+    run.add_argument("--threshold", type=float, default=0.15, help="Allowed ops/s drop (default 0.15)")
+    run.add_argument("--redis-latency-ms", type=float, default=0)
+    run.add_argument("--pokeapi-latency-ms", type=float, default=5)
+    run.add_argument("--gemini-latency-ms", type=float, default=50)
+
+    cmp = commands.add_parser("compare", help="Compare two saved result files")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(0 if compare(load(args.base), load(args.new), args.threshold) else 1)
+
+    # Per-call info logs from the services would dominate the output
+    logging.disable(logging.INFO)
+    random.seed(0)
+    results = asyncio.run(run_groups(args))
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "latency_ms": {
+                "redis": args.redis_latency_ms,
+                "pokeapi": args.pokeapi_latency_ms,
+                "gemini": args.gemini_latency_ms,
+            },
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {len(results)} results to {args.save}", file=sys.stderr)
+    if args.compare and not compare(load(args.compare), report, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -17,25 +17,121 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
+    REDIS_MAX_CONNECTIONS: int = 50  # Connection pool size (server profile)
     
     # AI API Configuration
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-2.0-flash-lite"
     DEEPSEEK_API_KEY: str = ""
     DEEPSEEK_MODEL: str = "deepseek-chat"
+    GEMINI_API_ENDPOINT: str = ""  # Override the Gemini REST endpoint, e.g. http://localhost:9102 for a stand-in
+    DEEPSEEK_BASE_URL: str = "https://api.deepseek.com"
+    GEMINI_RATE_LIMIT_PER_MINUTE: int = 60  # Gemini calls per worker per minute (the API quota)
+    GEMINI_BATCH_WINDOW_MS: int = 50  # Narrative requests arriving within this window share one call
+    GEMINI_BATCH_MAX_ITEMS: int = 8
+
+    # Conversation History Configuration
+    CONVERSATION_TOKEN_BUDGET: int = 600  # Estimated tokens of verbatim history per prompt
+    CONVERSATION_SUMMARY_TOKEN_BUDGET: int = 150  # Cap for the rolling summary of older turns
+    CONVERSATION_SESSION_TTL: int = 7200  # 2 hours
+
+    # Quest Inventory Configuration
+    QUEST_INVENTORY_LEVEL_BAND: int = 5  # Player levels per inventory bucket
+    QUEST_INVENTORY_POOL_SIZE: int = 20  # Pre-generated quests kept per bucket
+    QUEST_INVENTORY_REFILL_INTERVAL: int = 30  # Seconds between refill passes
+    QUEST_INVENTORY_QUOTA_RESERVE: int = 20  # Gemini calls per minute left for live traffic
+    QUEST_INVENTORY_DEMAND_WINDOW: int = 3600  # Only refill buckets requested within this window
+    
+    QUEST_REAPER_INTERVAL: int = 60  # Seconds between expired quest/challenge sweeps
+    QUEST_MAX_PROGRESS_INCREMENT: int = 10  # Largest progress step one update-progress call may report
+    DAILY_CHALLENGE_ACTIVE_DAYS: int = 7  # Players seen within this many days get challenges precomputed
+    
+    # Gameplay Event Stream Configuration
+    GAME_EVENTS_STREAM_MAXLEN: int = 100000  # Approximate cap on retained events
+    GAME_EVENTS_BATCH_SIZE: int = 200  # Events read per batch by each consumer group
+    GAME_EVENTS_BLOCK_MS: int = 1000
+    
+    # Leaderboard Configuration
+    LEADERBOARD_SNAPSHOT_INTERVAL: int = 3600  # Seconds between top-N snapshots
+    LEADERBOARD_SNAPSHOT_SIZE: int = 100
+    
+    # PvP Matchmaking Configuration
+    MATCHMAKING_BUCKET_SIZE: int = 5  # Levels per queue bucket
+    MATCHMAKING_BASE_WINDOW: int = 2  # Max level gap when a player first queues
+    MATCHMAKING_WINDOW_STEP: int = 2  # Levels added to the gap every widen interval
+    MATCHMAKING_WIDEN_INTERVAL: int = 5  # Seconds
+    MATCHMAKING_MAX_WINDOW: int = 20
+    MATCHMAKING_TICK_MS: int = 250  # Background re-match interval for waiting players
+    MATCHMAKING_TICKET_TTL: int = 300  # Seconds before a waiting player is dropped
+    BATTLE_SESSION_TTL: int = 1800
+    
+    # XP Settlement Configuration
+    XP_SETTLEMENT_INTERVAL: int = 600  # Seconds between settlement batching runs
+    XP_SETTLEMENT_BATCH_TTL: int = 3600  # Seconds a built batch waits for the wallet before expiring
+    XP_SETTLEMENT_MAX_CALLS: int = 50  # update_stats calls per batched transaction
+    
+    # Egg Incubation Configuration
+    EGG_INCUBATION_FLUSH_INTERVAL: int = 900  # Seconds between scheduled step settlements
+    EGG_INCUBATION_FLUSH_THRESHOLD: int = 2  # Settle right away once an egg is this close to hatching
+    EGG_INCUBATION_BATCH_TTL: int = 3600
+    EGG_INCUBATION_MAX_CALLS: int = 50
     
     # Firebase Configuration
     FIREBASE_SERVICE_ACCOUNT_PATH: str = "serviceAccountKey.json"
+    FIREBASE_AUTH_MAX_WORKERS: int = 8  # Threads for blocking firebase_admin auth calls
+    FIREBASE_UID_CACHE_TTL: int = 300  # Seconds a wallet's Firebase user is remembered as existing (also after deletion)
+    FIREBASE_TOKEN_REFRESH_MARGIN: int = 300  # Re-mint cached custom tokens this long before expiry
+    FIREBASE_AUTH_EMULATOR_HOST: str = ""  # host:port of an Auth emulator; no service account is needed then
+    FIREBASE_PROJECT_ID: str = "pokechain-local"  # Project used with the emulator
     
     # OneChain Configuration
     ONECHAIN_PACKAGE_ID: str = "0x2965e5ecb6bb4c48f098d16d3ce8bb9e8f4e80ea479a7edc9b00592a0e4dfa19"
     ONECHAIN_MARKETPLACE_ID: str = "0xfb5ab0c4845bc4f7ad6cb0b6f25e24e78fd18f3868b9be8ff050711f4227e2a3"
     ONECHAIN_NETWORK: str = "testnet"
     ONECHAIN_RPC_URL: str = "https://rpc-testnet.onelabs.cc:443"
+    ONECHAIN_LOCAL_CHAIN: bool = False  # Serve RPC from the in-process stand-in (fakes.sui_chain) instead
+    ONECHAIN_LOCAL_LATENCY_MS: float = 0  # Simulated round trip per stand-in RPC call
+    
+    # Chain Indexer Configuration
+    CHAIN_INDEXER_ENABLED: bool = True
+    CHAIN_INDEX_DB_PATH: str = "chain_index.db"  # SQLite (WAL) read model of on-chain NFTs
+    CHAIN_INDEXER_POLL_INTERVAL: int = 5  # Seconds between node polls
+    CHAIN_INDEXER_PAGE_SIZE: int = 50
+    CHAIN_INDEXER_OWNER_REFRESH_SIZE: int = 500  # Indexed NFTs re-read per poll to catch wallet transfers (0 = off)
     
     # PokéAPI Configuration
     POKEAPI_BASE_URL: str = "https://pokeapi.co/api/v2"
     POKEMON_CACHE_TTL: int = 86400  # 24 hours
+    POKEAPI_MAX_CONNECTIONS: int = 20  # Keep-alive pool to PokéAPI (server profile)
+    POKEMON_SNAPSHOT_PATH: str = "data/pokemon_snapshot.json"  # Seeds the in-process cache (serverless profile)
+    POKEMON_HTTP_MAX_AGE: int = 604800  # Cache-Control max-age for species responses (7 days)
+    POKEMON_BATCH_MAX_IDS: int = 50
+    
+    # Observability Configuration
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics at /metrics
+    METRICS_TOKEN: str = ""  # Bearer token scrapers send to /metrics; it answers 403 while empty
+    METRICS_MULTIPROC_DIR: str = ""  # Shared by the workers so any one's /metrics covers all of them
+    METRICS_PUBLISH_INTERVAL: int = 5  # Seconds between a worker's snapshots in METRICS_MULTIPROC_DIR
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.01  # Share of requests traced (unless a trusted traceparent decides)
+    TRACE_TRUSTED_SOURCES: str = ""  # Client IPs/CIDRs whose traceparent sampled flag is honoured, e.g. "10.0.0.0/8"
+    TRACE_EXPORTER: str = "file"  # "file" (JSON Lines) or "console"
+    TRACE_FILE_PATH: str = "traces.jsonl"
+    TRACE_QUEUE_SIZE: int = 1000  # Finished traces waiting to be written; more are dropped, not waited for
+    ADMIN_API_TOKEN: str = ""  # X-Admin-Token for /api/admin; admin endpoints are off while empty
+    PROFILER_INTERVAL_MS: float = 5  # Sampling interval for worker-wide profiles
+    PROFILER_REQUEST_INTERVAL_MS: float = 1  # Sampling interval for single-request profiles
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_KEEP_REQUESTS: int = 20  # Single-request profiles kept in memory per worker
+    
+    # Logging Configuration
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (JSON Lines) or "text"
+    LOG_LEVELS: str = "httpx=WARNING"  # Per-module levels, e.g. "services.gemini_service=DEBUG,httpx=WARNING"
+    LOG_ASYNC: bool = True  # Write from a background thread behind a bounded queue
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting to be written; more are dropped, not waited for
+    LOG_SAMPLE_RATE: float = 0.1  # Share of high-volume info events (and access lines) written
+    LOG_SAMPLE_RATES: str = ""  # Per-module overrides, e.g. "services.quest_service=1,uvicorn.access=0.01"
     
     # Game Configuration
     STARTER_POKEMON_IDS: str = "1,4,7,25,133,152,155,158,175"
@@ -49,6 +145,20 @@ class Settings(BaseSettings):
     def starter_pokemon_ids_list(self) -> List[int]:
         return [int(id.strip()) for id in self.STARTER_POKEMON_IDS.split(",")]
     
+    @property
+    def trace_trusted_sources_list(self) -> List[str]:
+        return [source.strip() for source in self.TRACE_TRUSTED_SOURCES.split(",") if source.strip()]
+    
+    @property
+    def log_levels_map(self) -> Dict[str, str]:
+        pairs = [entry.split("=", 1) for entry in self.LOG_LEVELS.split(",") if entry.strip()]
+        return {name.strip(): level.strip() for name, level in pairs}
+    
+    @property
+    def log_sample_rates_map(self) -> Dict[str, float]:
+        pairs = [entry.split("=", 1) for entry in self.LOG_SAMPLE_RATES.split(",") if entry.strip()]
+        return {name.strip(): float(rate) for name, rate in pairs}
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
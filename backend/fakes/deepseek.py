@@ -0,0 +1,80 @@
+"""
+DeepSeek stand-in - OpenAI-compatible /chat/completions with injected latency, errors and 429s
+
+For load tests, run it and set DEEPSEEK_BASE_URL=http://localhost:9103 (and
+any DEEPSEEK_API_KEY):
+
+    python -m fakes.deepseek --port 9103 --latency-ms 800
+"""
+import time
+import uuid
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fakes.faults import Faults, RATE_LIMITED, ERROR
+
+REPLY = (
+    "Ah, a fine question, young trainer! Fire-type Pokémon like Charmander shine against Grass types, "
+    "but keep a Water type like Squirtle away from them."
+)
+
+
+class LocalDeepSeekApi:
+    """Answers every chat completion with a short Professor Oak reply"""
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.request_count = 0
+        self.app = self._build_app()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Local DeepSeek API")
+
+        @app.post("/chat/completions")
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            self.request_count += 1
+            body = await request.json()
+            await self.faults.delay()
+            outcome = self.faults.outcome()
+            if outcome == RATE_LIMITED:
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached for requests", "type": "rate_limit_error"}},
+                    status_code=429,
+                    headers={"Retry-After": "1"}
+                )
+            if outcome == ERROR:
+                return JSONResponse({"error": {"message": "Service is too busy", "type": "server_error"}}, status_code=503)
+            prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "deepseek-chat"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": REPLY},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(REPLY) // 4,
+                    "total_tokens": prompt_tokens + len(REPLY) // 4,
+                },
+            }
+
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    from fakes.faults import add_fault_arguments, faults_from_args
+
+    parser = argparse.ArgumentParser(description="Run the local DeepSeek API stand-in")
+    add_fault_arguments(parser, port=9103)
+    args = parser.parse_args()
+    uvicorn.run(LocalDeepSeekApi(faults_from_args(args)).app, port=args.port)
@@ -0,0 +1,63 @@
+"""
+Fault injection for the stand-ins - Latency, errors and rate limiting drawn per request
+"""
+import asyncio
+import random
+from typing import Optional
+
+RATE_LIMITED = "rate_limited"
+ERROR = "error"
+
+
+class Faults:
+    """
+    What happens to one request: delay() sleeps latency_ms +/- jitter_ms,
+    then outcome() is RATE_LIMITED for rate_limit_rate of requests, ERROR
+    for error_rate of them, else None
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+
+    def latency(self) -> float:
+        """Seconds to delay the next request"""
+        if not (self.latency_ms or self.jitter_ms):
+            return 0.0
+        return max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    async def delay(self):
+        latency = self.latency()
+        if latency:
+            await asyncio.sleep(latency)
+
+    def outcome(self) -> Optional[str]:
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return RATE_LIMITED
+        if roll < self.rate_limit_rate + self.error_rate:
+            return ERROR
+        return None
+
+
+def add_fault_arguments(parser, port: int):
+    """The CLI options every stand-in server takes"""
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+
+
+def faults_from_args(args) -> Faults:
+    return Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
@@ -0,0 +1,83 @@
+"""
+Firebase Auth stand-in - The Identity Toolkit calls firebase_admin makes for wallet logins
+
+Implements accounts:lookup and account creation the way the Firebase Auth
+emulator does, with users kept in memory. For load tests, run it and set
+FIREBASE_AUTH_EMULATOR_HOST=localhost:9104; no service account is needed:
+
+    python -m fakes.firebase_auth --port 9104 --latency-ms 150
+"""
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fakes.faults import Faults, RATE_LIMITED, ERROR
+
+PREFIX = "/identitytoolkit.googleapis.com/v1/projects/{project_id}"
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": {"code": status, "message": message, "errors": [{"message": message}]}}, status_code=status)
+
+
+class LocalFirebaseAuth:
+    """In-memory users; a duplicate uid fails with DUPLICATE_LOCAL_ID like the real service"""
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.request_count = 0
+        self.app = self._build_app()
+
+    async def _fault(self) -> Optional[JSONResponse]:
+        self.request_count += 1
+        await self.faults.delay()
+        outcome = self.faults.outcome()
+        if outcome == RATE_LIMITED:
+            return _error(429, "QUOTA_EXCEEDED : Exceeded quota for account lookups.")
+        if outcome == ERROR:
+            return _error(503, "INTERNAL_ERROR")
+        return None
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Local Firebase Auth")
+
+        @app.post(PREFIX + "/accounts:lookup")
+        async def lookup(project_id: str, request: Request):
+            failed = await self._fault()
+            if failed:
+                return failed
+            body = await request.json()
+            users = [self.users[uid] for uid in body.get("localId", []) if uid in self.users]
+            return {"kind": "identitytoolkit#GetAccountInfoResponse", "users": users} if users else {}
+
+        @app.post(PREFIX + "/accounts")
+        async def create(project_id: str, request: Request):
+            failed = await self._fault()
+            if failed:
+                return failed
+            body = await request.json()
+            uid = body.get("localId")
+            if not uid:
+                return _error(400, "MISSING_LOCAL_ID")
+            if uid in self.users:
+                return _error(400, "DUPLICATE_LOCAL_ID")
+            now = str(int(time.time() * 1000))
+            self.users[uid] = {"localId": uid, "createdAt": now, "lastLoginAt": now, "providerUserInfo": []}
+            return {"kind": "identitytoolkit#SignupNewUserResponse", "localId": uid}
+
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    from fakes.faults import add_fault_arguments, faults_from_args
+
+    parser = argparse.ArgumentParser(description="Run the local Firebase Auth stand-in")
+    add_fault_arguments(parser, port=9104)
+    args = parser.parse_args()
+    uvicorn.run(LocalFirebaseAuth(faults_from_args(args)).app, port=args.port)
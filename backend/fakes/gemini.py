@@ -0,0 +1,148 @@
+"""
+Gemini stand-in - A GenerativeModel replacement and a generateContent REST server, with injected
+latency, errors and quota exhaustion
+
+Both return plausible output for the backend's prompts: JSON quests and
+narrative batches when JSON is requested, a move name for move selection,
+a sentence otherwise. In process, generate_content blocks for the latency
+like the SDK's HTTP call:
+
+    gemini_service._model = FakeGenerativeModel(latency_ms=400)
+
+or as a server for load tests (set GEMINI_API_ENDPOINT=http://localhost:9102):
+
+    python -m fakes.gemini --port 9102 --latency-ms 400 --rate-limit-rate 0.02
+"""
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fakes.faults import Faults, RATE_LIMITED, ERROR
+
+
+def fake_text(prompt: str, generation_config: Dict[str, Any]) -> str:
+    """Response text shaped like what the backend expects for this prompt"""
+    mime_type = generation_config.get("response_mime_type") or generation_config.get("responseMimeType")
+    if mime_type == "application/json":
+        batch = re.search(r"JSON array of exactly (\d+) strings", prompt)
+        if batch:
+            count = int(batch.group(1))
+            return json.dumps([f"Narrative text {i} for a thrilling moment!" for i in range(1, count + 1)])
+        return json.dumps({
+            "title": "Forest Showdown",
+            "description": "Wild Pokémon gather in the forest. Prove your strength in battle!",
+            "objective_type": "battle",
+            "objective_target": 3,
+            "reward_type": "tokens",
+            "reward_amount": 300,
+        })
+    if "Respond with ONLY the move name" in prompt:
+        move = re.search(r'"name":\s*"([^"]+)"', prompt)
+        return move.group(1) if move else "Tackle"
+    return "The battle heats up as both Pokémon give it everything they have!"
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Drop-in for google.generativeai.GenerativeModel.generate_content
+
+    error_rate is the share of calls that raise as a failed API call would;
+    rate_limit_rate the share that raise a 429 "Resource exhausted".
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        seed: int = 0
+    ):
+        self.faults = Faults(latency_ms, jitter_ms, error_rate, rate_limit_rate, seed)
+        self.call_count = 0
+        self._lock = threading.Lock()  # Called from worker threads
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> FakeResponse:
+        with self._lock:
+            self.call_count += 1
+            latency, outcome = self.faults.latency(), self.faults.outcome()
+        time.sleep(latency)
+        if outcome == RATE_LIMITED:
+            raise RuntimeError("429 Resource exhausted: quota exceeded for generate_content")
+        if outcome == ERROR:
+            raise RuntimeError("500 Internal error encountered")
+        return FakeResponse(fake_text(prompt, generation_config or {}))
+
+
+class LocalGeminiApi:
+    """
+    The generateContent method of the Generative Language REST API
+
+    Serves POST /v1beta/models/{model}:generateContent, which the SDK calls
+    with transport="rest" and a client_options api_endpoint.
+    """
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.request_count = 0
+        self.app = self._build_app()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Local Gemini API")
+
+        @app.post("/{version}/models/{model_method}")
+        async def generate_content(version: str, model_method: str, request: Request):
+            self.request_count += 1
+            body = await request.json()
+            await self.faults.delay()
+            outcome = self.faults.outcome()
+            if outcome == RATE_LIMITED:
+                return JSONResponse(
+                    {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED"}},
+                    status_code=429
+                )
+            if outcome == ERROR:
+                return JSONResponse(
+                    {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}},
+                    status_code=500
+                )
+            prompt = "\n".join(
+                part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])
+            )
+            text = fake_text(prompt, body.get("generationConfig", {}))
+            return {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": len(prompt) // 4,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": (len(prompt) + len(text)) // 4,
+                },
+            }
+
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    from fakes.faults import add_fault_arguments, faults_from_args
+
+    parser = argparse.ArgumentParser(description="Run the local Gemini API stand-in")
+    add_fault_arguments(parser, port=9102)
+    args = parser.parse_args()
+    uvicorn.run(LocalGeminiApi(faults_from_args(args)).app, port=args.port)
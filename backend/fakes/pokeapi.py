@@ -0,0 +1,119 @@
+"""
+Local PokéAPI stand-in - Serves /pokemon/{id} and /pokemon-species/{id} with generated data
+
+Responses have the fields PokemonService reads, in PokéAPI's shape, and are
+deterministic per ID. Latency, errors and 429s are configurable:
+
+    pokeapi = LocalPokeApi(latency_ms=120, error_rate=0.01)
+    pokemon_service.base_url = "http://pokeapi.local/api/v2"
+    pokemon_service._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=pokeapi.app))
+
+or as a standalone server (set POKEAPI_BASE_URL=http://localhost:9101/api/v2):
+
+    python -m fakes.pokeapi --port 9101 --latency-ms 120
+"""
+import random
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fakes.faults import Faults, RATE_LIMITED, ERROR
+
+MAX_SPECIES = 1025
+TYPES = ["normal", "fire", "water", "grass", "electric", "ice", "fighting", "poison", "ground",
+         "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy"]
+SPRITES = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon"
+
+
+class LocalPokeApi:
+    """
+    PokéAPI with configurable latency and failures
+
+    error_rate is the share of requests answered 500, rate_limit_rate the
+    share answered 429 with Retry-After, as PokéAPI's CDN does under load.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        seed: int = 0
+    ):
+        self.faults = Faults(latency_ms, jitter_ms, error_rate, rate_limit_rate, seed)
+        self.request_count = 0
+        self.app = self._build_app()
+
+    def pokemon(self, pokemon_id: int, base_url: str) -> Dict[str, Any]:
+        rng = random.Random(pokemon_id)
+        stats = {name: rng.randint(20, 150) for name in ("hp", "attack", "defense", "special-attack", "special-defense", "speed")}
+        types = rng.sample(TYPES, rng.randint(1, 2))
+        return {
+            "id": pokemon_id,
+            "name": f"pokemon-{pokemon_id}",
+            "stats": [{"base_stat": value, "effort": 0, "stat": {"name": name}} for name, value in stats.items()],
+            "types": [{"slot": slot, "type": {"name": name}} for slot, name in enumerate(types, 1)],
+            "sprites": {
+                "front_default": f"{SPRITES}/{pokemon_id}.png",
+                "back_default": f"{SPRITES}/back/{pokemon_id}.png",
+                "other": {"official-artwork": {"front_default": f"{SPRITES}/other/official-artwork/{pokemon_id}.png"}},
+                "versions": {"generation-v": {"black-white": {"animated": {
+                    "front_default": f"{SPRITES}/versions/generation-v/black-white/animated/{pokemon_id}.gif",
+                    "back_default": f"{SPRITES}/versions/generation-v/black-white/animated/back/{pokemon_id}.gif",
+                }}}},
+            },
+            "species": {"name": f"pokemon-{pokemon_id}", "url": f"{base_url}pokemon-species/{pokemon_id}/"},
+        }
+
+    def species(self, pokemon_id: int) -> Dict[str, Any]:
+        rng = random.Random(pokemon_id)
+        return {
+            "id": pokemon_id,
+            "name": f"pokemon-{pokemon_id}",
+            "capture_rate": rng.choice([3, 45, 90, 190, 255]),
+            "is_legendary": pokemon_id in (144, 145, 146, 150),
+            "is_mythical": pokemon_id == 151,
+        }
+
+    async def _respond(self, pokemon_id: int, body):
+        self.request_count += 1
+        await self.faults.delay()
+        outcome = self.faults.outcome()
+        if outcome == RATE_LIMITED:
+            return JSONResponse({"detail": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
+        if outcome == ERROR:
+            return JSONResponse({"detail": "Internal Server Error"}, status_code=500)
+        if not 1 <= pokemon_id <= MAX_SPECIES:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return body()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Local PokéAPI")
+
+        @app.get("/api/v2/pokemon/{pokemon_id}")
+        @app.get("/api/v2/pokemon/{pokemon_id}/")
+        async def get_pokemon(pokemon_id: int, request: Request):
+            base_url = f"{request.base_url}api/v2/"
+            return await self._respond(pokemon_id, lambda: self.pokemon(pokemon_id, base_url))
+
+        @app.get("/api/v2/pokemon-species/{pokemon_id}")
+        @app.get("/api/v2/pokemon-species/{pokemon_id}/")
+        async def get_species(pokemon_id: int):
+            return await self._respond(pokemon_id, lambda: self.species(pokemon_id))
+
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    from fakes.faults import add_fault_arguments
+
+    parser = argparse.ArgumentParser(description="Run the local PokéAPI stand-in")
+    add_fault_arguments(parser, port=9101)
+    args = parser.parse_args()
+    pokeapi = LocalPokeApi(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
+    uvicorn.run(pokeapi.app, port=args.port)
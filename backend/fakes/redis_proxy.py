@@ -0,0 +1,169 @@
+"""
+Redis stand-in - A RESP proxy in front of a real Redis that injects latency, errors and refused connections
+
+The backend uses streams, sorted sets, pipelines and transactions, so data
+commands go to a real Redis (use a scratch database); the proxy only adds
+the failure modes. Commands that arrive together (a pipeline) share one
+delay, as they would share one network round trip. For load tests, run it
+and set REDIS_PORT=9105:
+
+    python -m fakes.redis_proxy --port 9105 --upstream localhost:6379 --latency-ms 2 --error-rate 0.001
+
+error_rate of data commands are answered with an error reply instead of
+reaching Redis; rate_limit_rate of new connections are refused with
+"max number of clients reached", Redis's answer to connection saturation.
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+from fakes.faults import Faults, RATE_LIMITED
+
+# Connection setup is never failed, so clients can always get going
+SETUP_COMMANDS = {b"HELLO", b"AUTH", b"SELECT", b"CLIENT", b"PING", b"QUIT", b"READONLY"}
+INJECTED_ERROR = b"-ERR injected failure (fakes.redis_proxy)\r\n"
+MAX_CLIENTS_ERROR = b"-ERR max number of clients reached\r\n"
+
+AGGREGATES = {ord("*"): 1, ord("~"): 1, ord(">"): 1, ord("%"): 2, ord("|"): 2}
+BLOBS = {ord("$"), ord("!"), ord("=")}
+
+
+def frame_end(buf: bytearray, pos: int = 0) -> Optional[int]:
+    """Index just past the RESP2/RESP3 frame starting at pos, or None if it is incomplete"""
+    line_end = buf.find(b"\r\n", pos)
+    if line_end < 0:
+        return None
+    kind = buf[pos]
+    if kind in BLOBS:
+        length = int(buf[pos + 1:line_end])
+        if length < 0:
+            return line_end + 2
+        end = line_end + 2 + length + 2
+        return end if len(buf) >= end else None
+    if kind in AGGREGATES:
+        count = int(buf[pos + 1:line_end])
+        pos = line_end + 2
+        for _ in range(max(0, count) * AGGREGATES[kind]):
+            if pos >= len(buf):
+                return None
+            pos = frame_end(buf, pos)
+            if pos is None:
+                return None
+        if kind == ord("|"):
+            # Attributes precede the reply they describe
+            return frame_end(buf, pos) if pos < len(buf) else None
+        return pos
+    # Simple line: + - : _ , # ( or an inline command
+    return line_end + 2
+
+
+def command_name(frame: bytes) -> bytes:
+    """The command name of a request frame (an array of bulk strings)"""
+    if frame[:1] != b"*":
+        return frame.split(None, 1)[0].upper() if frame.strip() else b""
+    header_end = frame.find(b"\r\n")
+    length_end = frame.find(b"\r\n", header_end + 2)
+    return frame[length_end + 2:frame.find(b"\r\n", length_end + 2)].upper()
+
+
+class RedisFaultProxy:
+    """Forwards RESP connections to upstream_host:upstream_port, injecting faults per Faults"""
+
+    def __init__(self, upstream_host: str, upstream_port: int, faults: Optional[Faults] = None):
+        self.upstream_host = upstream_host
+        self.upstream_port = upstream_port
+        self.faults = faults or Faults()
+        self.command_count = 0
+        self.injected_errors = 0
+        self.refused_connections = 0
+
+    def _split(self, buf: bytearray) -> Tuple[List[bytes], int]:
+        frames, pos = [], 0
+        while pos < len(buf):
+            end = frame_end(buf, pos)
+            if end is None:
+                break
+            frames.append(bytes(buf[pos:end]))
+            pos = end
+        return frames, pos
+
+    async def _read_reply(self, reader: asyncio.StreamReader, buf: bytearray) -> bytes:
+        while True:
+            end = frame_end(buf) if buf else None
+            if end is not None:
+                reply = bytes(buf[:end])
+                del buf[:end]
+                return reply
+            data = await reader.read(65536)
+            if not data:
+                raise ConnectionError("Upstream Redis closed the connection")
+            buf += data
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        if self.faults.outcome() == RATE_LIMITED:
+            self.refused_connections += 1
+            client_writer.write(MAX_CLIENTS_ERROR)
+            await client_writer.drain()
+            client_writer.close()
+            return
+
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.upstream_host, self.upstream_port)
+        requests, replies = bytearray(), bytearray()
+        try:
+            while True:
+                data = await client_reader.read(65536)
+                if not data:
+                    break
+                requests += data
+                frames, consumed = self._split(requests)
+                if not frames:
+                    continue
+                del requests[:consumed]
+                self.command_count += len(frames)
+
+                await self.faults.delay()
+                failed = [
+                    command_name(frame) not in SETUP_COMMANDS and self.faults.outcome() is not None
+                    for frame in frames
+                ]
+                forwarded = [frame for frame, fail in zip(frames, failed) if not fail]
+                if forwarded:
+                    upstream_writer.write(b"".join(forwarded))
+                    await upstream_writer.drain()
+
+                out = []
+                for fail in failed:
+                    if fail:
+                        self.injected_errors += 1
+                        out.append(INJECTED_ERROR)
+                    else:
+                        out.append(await self._read_reply(upstream_reader, replies))
+                client_writer.write(b"".join(out))
+                await client_writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            upstream_writer.close()
+            client_writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from fakes.faults import add_fault_arguments, faults_from_args
+
+    parser = argparse.ArgumentParser(description="Run the Redis fault-injecting proxy")
+    add_fault_arguments(parser, port=9105)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--upstream", default="localhost:6379", help="host:port of the real Redis")
+    args = parser.parse_args()
+    upstream_host, upstream_port = args.upstream.rsplit(":", 1)
+    proxy = RedisFaultProxy(upstream_host, int(upstream_port), faults_from_args(args))
+    try:
+        asyncio.run(proxy.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
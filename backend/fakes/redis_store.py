@@ -0,0 +1,72 @@
+"""
+In-memory Redis stand-in - The key/value subset of redis.asyncio.Redis used by the cache paths
+
+Behaves like a client created with decode_responses=True: values are
+stored and returned as strings. For benchmarks that should not depend on a
+running Redis:
+
+    redis_service.client = FakeRedis()
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+
+class FakeRedis:
+    """Strings with optional expiry; latency_ms delays every command"""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.command_count = 0
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    async def _command(self):
+        self.command_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def ping(self) -> bool:
+        await self._command()
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        await self._command()
+        return self._live(key)
+
+    async def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        await self._command()
+        if nx and self._live(key) is not None:
+            return None
+        self._data[key] = (str(value), time.monotonic() + ex if ex else None)
+        return True
+
+    async def setex(self, key: str, ttl: int, value) -> bool:
+        return await self.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str) -> int:
+        await self._command()
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def exists(self, *keys: str) -> int:
+        await self._command()
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    async def flushdb(self):
+        await self._command()
+        self._data.clear()
+
+    async def close(self):
+        pass
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,196 @@
+"""
+Stand-in stack - Every external dependency of the backend as a local server, for load tests
+
+Starts PokéAPI, Gemini, DeepSeek, Firebase Auth, OneChain RPC and a Redis
+fault proxy, one process each so a busy stand-in cannot slow the others,
+and prints the environment that points the backend at them:
+
+    python -m fakes.stack --redis-upstream localhost:6379
+    python -m fakes.stack --set gemini.latency_ms=1200 --set gemini.rate_limit_rate=0.05
+
+Defaults approximate the production services' latency; --error-rate and
+--rate-limit-rate apply to all of them unless overridden with --set.
+"""
+import copy
+import multiprocessing
+import socket
+import time
+from typing import Any, Dict, Optional
+
+DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "onechain": {"port": 9100, "latency_ms": 80, "jitter_ms": 30, "error_rate": 0, "rate_limit_rate": 0},
+    "pokeapi": {"port": 9101, "latency_ms": 120, "jitter_ms": 40, "error_rate": 0, "rate_limit_rate": 0},
+    "gemini": {"port": 9102, "latency_ms": 600, "jitter_ms": 200, "error_rate": 0, "rate_limit_rate": 0},
+    "deepseek": {"port": 9103, "latency_ms": 900, "jitter_ms": 300, "error_rate": 0, "rate_limit_rate": 0},
+    "firebase": {"port": 9104, "latency_ms": 150, "jitter_ms": 50, "error_rate": 0, "rate_limit_rate": 0},
+    "redis": {"port": 9105, "latency_ms": 0.3, "jitter_ms": 0.1, "error_rate": 0, "rate_limit_rate": 0},
+}
+
+
+def _serve(name: str, config: Dict[str, Any], host: str, redis_upstream: str):
+    """Process entry point: build one stand-in and serve it until terminated"""
+    import asyncio
+    import logging
+
+    import uvicorn
+
+    from fakes.faults import Faults
+
+    faults = Faults(config["latency_ms"], config["jitter_ms"], config["error_rate"], config["rate_limit_rate"])
+    if name == "redis":
+        from fakes.redis_proxy import RedisFaultProxy
+
+        upstream_host, upstream_port = redis_upstream.rsplit(":", 1)
+        asyncio.run(RedisFaultProxy(upstream_host, int(upstream_port), faults).serve(host, config["port"]))
+        return
+
+    logging.disable(logging.INFO)
+    if name == "onechain":
+        from fakes.sui_chain import LocalSuiChain
+
+        app = LocalSuiChain(
+            latency_ms=config["latency_ms"],
+            jitter_ms=config["jitter_ms"],
+            error_rate=config["error_rate"],
+            rate_limit_rate=config["rate_limit_rate"]
+        ).app
+    elif name == "pokeapi":
+        from fakes.pokeapi import LocalPokeApi
+
+        app = LocalPokeApi(config["latency_ms"], config["jitter_ms"], config["error_rate"], config["rate_limit_rate"]).app
+    elif name == "gemini":
+        from fakes.gemini import LocalGeminiApi
+
+        app = LocalGeminiApi(faults).app
+    elif name == "deepseek":
+        from fakes.deepseek import LocalDeepSeekApi
+
+        app = LocalDeepSeekApi(faults).app
+    elif name == "firebase":
+        from fakes.firebase_auth import LocalFirebaseAuth
+
+        app = LocalFirebaseAuth(faults).app
+    else:
+        raise ValueError(f"Unknown stand-in: {name}")
+    uvicorn.run(app, host=host, port=config["port"], log_level="warning", access_log=False)
+
+
+def _wait_for_port(host: str, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Stand-in on {host}:{port} did not start")
+
+
+class FakeStack:
+    """The stand-in servers, started and stopped together"""
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Dict[str, Any]]] = None,
+        redis_upstream: str = "localhost:6379",
+        host: str = "127.0.0.1"
+    ):
+        self.config = config or copy.deepcopy(DEFAULTS)
+        self.redis_upstream = redis_upstream
+        self.host = host
+        self._processes = []
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point the backend at the stand-ins"""
+        ports = {name: config["port"] for name, config in self.config.items()}
+        return {
+            "POKEAPI_BASE_URL": f"http://{self.host}:{ports['pokeapi']}/api/v2",
+            "GEMINI_API_ENDPOINT": f"http://{self.host}:{ports['gemini']}",
+            "GEMINI_API_KEY": "load-test",
+            "DEEPSEEK_BASE_URL": f"http://{self.host}:{ports['deepseek']}",
+            "DEEPSEEK_API_KEY": "load-test",
+            "FIREBASE_AUTH_EMULATOR_HOST": f"{self.host}:{ports['firebase']}",
+            "ONECHAIN_RPC_URL": f"http://{self.host}:{ports['onechain']}",
+            "ONECHAIN_LOCAL_CHAIN": "false",
+            "REDIS_HOST": self.host,
+            "REDIS_PORT": str(ports["redis"]),
+        }
+
+    def start(self):
+        for name, config in self.config.items():
+            try:
+                socket.create_connection((self.host, config["port"]), timeout=0.5).close()
+            except OSError:
+                continue
+            raise RuntimeError(f"Port {config['port']} for the {name} stand-in is already in use")
+        context = multiprocessing.get_context("spawn")
+        for name, config in self.config.items():
+            process = context.Process(
+                target=_serve, args=(name, config, self.host, self.redis_upstream), name=f"fake-{name}", daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        for config in self.config.values():
+            _wait_for_port(self.host, config["port"])
+
+    def stop(self):
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        self._processes = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def stack_config(error_rate: Optional[float] = None, rate_limit_rate: Optional[float] = None, overrides=()) -> Dict[str, Dict[str, Any]]:
+    """DEFAULTS with global failure rates and "name.key=value" overrides applied"""
+    config = copy.deepcopy(DEFAULTS)
+    for entry in config.values():
+        if error_rate is not None:
+            entry["error_rate"] = error_rate
+        if rate_limit_rate is not None:
+            entry["rate_limit_rate"] = rate_limit_rate
+    for override in overrides:
+        target, value = override.split("=", 1)
+        name, key = target.split(".", 1)
+        if name not in config or key not in config[name]:
+            raise ValueError(f"Unknown stand-in setting: {target}")
+        config[name][key] = int(value) if key == "port" else float(value)
+    return config
+
+
+def add_stack_arguments(parser):
+    parser.add_argument("--redis-upstream", default="localhost:6379", help="host:port of the real Redis behind the proxy")
+    parser.add_argument("--error-rate", type=float, help="Error rate for every stand-in")
+    parser.add_argument("--rate-limit-rate", type=float, help="429 (or refused connection) rate for every stand-in")
+    parser.add_argument(
+        "--set", action="append", default=[], metavar="NAME.KEY=VALUE",
+        help="Per stand-in setting, e.g. gemini.latency_ms=1200 (keys: port, latency_ms, jitter_ms, error_rate, rate_limit_rate)"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+    stack = FakeStack(stack_config(args.error_rate, args.rate_limit_rate, args.set), args.redis_upstream)
+    with stack:
+        for name, config in stack.config.items():
+            print(f"{name:9} :{config['port']}  {config['latency_ms']}±{config['jitter_ms']}ms  "
+                  f"errors {config['error_rate']:.1%}  429s {config['rate_limit_rate']:.1%}")
+        print("\nPoint the backend at the stand-ins with:\n")
+        for key, value in stack.env().items():
+            print(f"export {key}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,596 @@
+"""
+Local Sui/OneChain stand-in - In-process JSON-RPC node modelling the game's Move package
+
+Keeps objects, owners, transactions and events in memory and implements the
+pokemon, egg and marketplace entry points with the same rules (and abort
+codes) as contracts/pokemon_nft/sources. Serves the subset of the JSON-RPC
+API the backend uses, with configurable latency and failures, as an ASGI app:
+
+    chain = LocalSuiChain(latency_ms=80)
+    sui_rpc.use_transport(httpx.ASGITransport(app=chain.app))
+
+or as a standalone server for load tests:
+
+    python -m fakes.sui_chain --port 9100 --latency-ms 80
+"""
+import asyncio
+import copy
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from config import settings
+
+CLOCK_ID = "0x6"
+# Full node limits: objects per sui_multiGetObjects, results per page of any query
+MAX_MULTI_GET_OBJECTS = 50
+QUERY_MAX_RESULT_LIMIT = 50
+COIN_TYPE = "0x2::coin::Coin<0x2::oct::OCT>"
+
+
+class MoveAbort(Exception):
+    def __init__(self, module: str, function: str, code: int):
+        super().__init__(f"MoveAbort in {module}::{function} with code {code}")
+
+
+def _new_id() -> str:
+    return "0x" + uuid.uuid4().hex + uuid.uuid4().hex
+
+
+def _text(value: Any) -> str:
+    """vector<u8> arguments may arrive as strings or byte lists"""
+    return bytes(value).decode() if isinstance(value, list) else str(value)
+
+
+def _starter_stats(species_id: int) -> Dict[str, int]:
+    stats = {
+        1: (45, 49, 49, 45), 4: (39, 52, 43, 65), 7: (44, 48, 65, 43),
+        25: (35, 55, 40, 90), 133: (55, 55, 50, 55), 152: (45, 49, 65, 45),
+        155: (39, 52, 43, 65), 158: (50, 65, 64, 43), 175: (35, 20, 65, 20),
+    }.get(species_id, (40, 45, 45, 40))
+    return dict(zip(("hp", "attack", "defense", "speed"), stats))
+
+
+def _scale_stats(stats: Dict[str, int], level: int) -> Dict[str, int]:
+    bonus = level - 1 if level > 1 else 0
+    return {name: value + value * bonus // 10 for name, value in stats.items()}
+
+
+class _TxContext:
+    """Collects a transaction's object changes, and the undo log to roll them back"""
+
+    def __init__(self, chain: "LocalSuiChain", sender: str):
+        self.chain = chain
+        self.sender = sender
+        self.changes: Dict[str, str] = {}  # object_id -> created/mutated/wrapped/deleted
+        self.events: List[Dict[str, Any]] = []
+        self.deleted_types: Dict[str, str] = {}
+        self._undo_objects: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._undo_listings: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def backup(self, object_id: str):
+        """Remember an object's state before the transaction first touches it"""
+        if object_id not in self._undo_objects:
+            obj = self.chain.objects.get(object_id)
+            self._undo_objects[object_id] = obj and {**obj, "fields": copy.deepcopy(obj["fields"])}
+
+    def backup_listing(self, nft_id: str):
+        if nft_id not in self._undo_listings:
+            self._undo_listings[nft_id] = self.chain.listings.get(nft_id)
+
+    def rollback(self):
+        for store, undo in ((self.chain.objects, self._undo_objects), (self.chain.listings, self._undo_listings)):
+            for key, previous in undo.items():
+                if previous is None:
+                    store.pop(key, None)
+                else:
+                    store[key] = previous
+        self.changes = {}
+        self.events = []
+
+    def create(self, type_: str, owner: Optional[str], fields: Dict[str, Any]) -> str:
+        object_id = _new_id()
+        self.backup(object_id)
+        self.chain.objects[object_id] = {"type": type_, "owner": owner, "fields": fields, "version": 1}
+        self.changes[object_id] = "created"
+        return object_id
+
+    def mutate(self, object_id: str, owner: Any = ...):
+        self.backup(object_id)
+        obj = self.chain.objects[object_id]
+        if owner is not ...:
+            obj["owner"] = owner
+        if self.changes.get(object_id) != "created":
+            self.changes[object_id] = "mutated"
+
+    def wrap(self, object_id: str):
+        self.backup(object_id)
+        self.chain.objects[object_id]["owner"] = None
+        self.changes[object_id] = "wrapped"
+
+    def delete(self, object_id: str):
+        self.backup(object_id)
+        self.deleted_types[object_id] = self.chain.objects.pop(object_id)["type"]
+        self.changes[object_id] = "deleted" if self.changes.get(object_id) != "created" else "gone"
+
+
+class LocalSuiChain:
+    """
+    In-memory chain state plus the Move entry points of the game package
+
+    Latency is applied per JSON-RPC request as latency_ms +/- jitter_ms;
+    error_rate of requests fail with HTTP 503 and rate_limit_rate with 429,
+    as public RPC gateways do under load. Like a full node, it rejects
+    sui_multiGetObjects with more than 50 IDs and caps query pages at 50.
+    Every created or mutated object version is kept for
+    sui_tryMultiGetPastObjects.
+    Transactions are executed with local_executeTransaction, which takes the
+    same {"sender", "calls": [{"target", "arguments"}]} shape the backend's
+    settlement batches and prepare_* helpers produce; signatures are not
+    checked. A failed call rolls the whole transaction back, as on chain.
+    """
+
+    def __init__(
+        self,
+        package_id: str = settings.ONECHAIN_PACKAGE_ID,
+        marketplace_id: str = settings.ONECHAIN_MARKETPLACE_ID,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        fee_percentage: int = 250,
+        error_rate: float = 0,
+        rate_limit_rate: float = 0
+    ):
+        self.package_id = package_id
+        self.marketplace_id = marketplace_id
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fee_percentage = fee_percentage
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.transactions: List[Dict[str, Any]] = []
+        self.tx_by_digest: Dict[str, Dict[str, Any]] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.listings: Dict[str, Dict[str, Any]] = {}
+        self.history: Dict[tuple, Dict[str, Any]] = {}  # (object_id, version) -> object then
+        self.request_count = 0
+        self.objects[marketplace_id] = {
+            "type": f"{package_id}::marketplace::Marketplace",
+            "owner": "shared",
+            "fields": {"fee_percentage": fee_percentage},
+            "version": 1,
+        }
+        self.objects[CLOCK_ID] = {"type": "0x2::clock::Clock", "owner": "shared", "fields": {}, "version": 1}
+        self.entry_points: Dict[str, Callable] = {
+            "pokemon::mint_starter": self._mint_starter,
+            "pokemon::mint_captured": self._mint_captured,
+            "pokemon::evolve_pokemon": self._evolve_pokemon,
+            "pokemon::add_experience": self._add_experience,
+            "pokemon::update_stats": self._update_stats,
+            "egg::breed_pokemon": self._breed_pokemon,
+            "egg::increment_incubation": self._increment_incubation,
+            "egg::add_battle_steps": lambda ctx, egg: self._increment_incubation(ctx, egg, 1),
+            "egg::hatch_egg": self._hatch_egg,
+            "marketplace::list_pokemon": lambda ctx, m, nft, price: self._list(ctx, m, nft, price, "pokemon"),
+            "marketplace::list_egg": lambda ctx, m, nft, price: self._list(ctx, m, nft, price, "egg"),
+            "marketplace::buy_pokemon": lambda ctx, m, nft, coin: self._buy(ctx, m, nft, coin, "pokemon"),
+            "marketplace::buy_egg": lambda ctx, m, nft, coin: self._buy(ctx, m, nft, coin, "egg"),
+            "marketplace::cancel_listing_pokemon": lambda ctx, m, nft: self._cancel(ctx, m, nft, "pokemon"),
+            "marketplace::cancel_listing_egg": lambda ctx, m, nft: self._cancel(ctx, m, nft, "egg"),
+        }
+        self.app = self._build_app()
+
+    # ============================================
+    # Entry points (mirroring the Move modules)
+    # ============================================
+
+    def _owned(self, ctx: _TxContext, object_id: str, type_suffix: str) -> Dict[str, Any]:
+        obj = self.objects.get(object_id)
+        if obj is None or not obj["type"].endswith(type_suffix):
+            raise ValueError(f"Object {object_id} is not a {type_suffix}")
+        if obj["owner"] != ctx.sender:
+            raise ValueError(f"Object {object_id} is not owned by {ctx.sender}")
+        ctx.backup(object_id)
+        return obj
+
+    def _new_pokemon(self, ctx, species_id, name, level, experience, stats, types) -> str:
+        return ctx.create(f"{self.package_id}::pokemon::Pokemon", ctx.sender, {
+            "species_id": int(species_id),
+            "name": _text(name),
+            "level": level,
+            "experience": experience,
+            "stats": stats,
+            "types": [_text(t) for t in types],
+            "owner": ctx.sender,
+            "mint_timestamp": int(time.time() * 1000),
+            "evolution_stage": 0,
+        })
+
+    def _mint_starter(self, ctx, species_id, name, types, clock=CLOCK_ID):
+        return self._new_pokemon(ctx, species_id, name, 1, 0, _starter_stats(int(species_id)), types)
+
+    def _mint_captured(self, ctx, species_id, name, level, types, clock=CLOCK_ID):
+        level = int(level)
+        stats = _scale_stats(_starter_stats(int(species_id)), level)
+        return self._new_pokemon(ctx, species_id, name, level, level ** 3, stats, types)
+
+    def _evolve_pokemon(self, ctx, pokemon_id, new_species_id, new_name):
+        fields = self._owned(ctx, pokemon_id, "::pokemon::Pokemon")["fields"]
+        required = {0: 12, 1: 20}.get(fields["evolution_stage"], 100)
+        if fields["level"] < required:
+            raise MoveAbort("pokemon", "evolve_pokemon", 0)
+        if fields["evolution_stage"] >= 2:
+            raise MoveAbort("pokemon", "evolve_pokemon", 1)
+        fields["evolution_stage"] += 1
+        fields["species_id"] = int(new_species_id)
+        fields["name"] = _text(new_name)
+        fields["stats"] = {name: value + value // 5 for name, value in fields["stats"].items()}
+        ctx.mutate(pokemon_id)
+
+    def _add_experience(self, ctx, pokemon_id, exp_gained):
+        fields = self._owned(ctx, pokemon_id, "::pokemon::Pokemon")["fields"]
+        fields["experience"] += int(exp_gained)
+        if fields["experience"] >= fields["level"] * 100 and fields["level"] < 100:
+            fields["level"] += 1
+            fields["stats"] = _scale_stats(_starter_stats(fields["species_id"]), fields["level"])
+        ctx.mutate(pokemon_id)
+
+    def _update_stats(self, ctx, pokemon_id, experience, level, hp, attack, defense, speed):
+        fields = self._owned(ctx, pokemon_id, "::pokemon::Pokemon")["fields"]
+        fields.update(experience=int(experience), level=int(level))
+        fields["stats"] = {"hp": int(hp), "attack": int(attack), "defense": int(defense), "speed": int(speed)}
+        ctx.mutate(pokemon_id)
+
+    def _breed_pokemon(self, ctx, parent1_species, parent2_species, genetics, clock=CLOCK_ID):
+        return ctx.create(f"{self.package_id}::egg::Egg", ctx.sender, {
+            "parent1_species": int(parent1_species),
+            "parent2_species": int(parent2_species),
+            "incubation_steps": 0,
+            "required_steps": 10,
+            "genetics": list(genetics) if isinstance(genetics, list) else [],
+            "owner": ctx.sender,
+            "created_timestamp": int(time.time() * 1000),
+        })
+
+    def _increment_incubation(self, ctx, egg_id, steps):
+        fields = self._owned(ctx, egg_id, "::egg::Egg")["fields"]
+        fields["incubation_steps"] = min(fields["required_steps"], fields["incubation_steps"] + int(steps))
+        ctx.mutate(egg_id)
+
+    def _hatch_egg(self, ctx, egg_id, species, name, types, clock=CLOCK_ID):
+        fields = self._owned(ctx, egg_id, "::egg::Egg")["fields"]
+        if fields["incubation_steps"] < fields["required_steps"]:
+            raise MoveAbort("egg", "hatch_egg", 2)
+        ctx.delete(egg_id)
+        return self._mint_starter(ctx, species, name, types)
+
+    def _list(self, ctx, marketplace_id, nft_id, price, nft_type):
+        suffix = "::pokemon::Pokemon" if nft_type == "pokemon" else "::egg::Egg"
+        self._owned(ctx, nft_id, suffix)
+        if int(price) <= 0:
+            raise MoveAbort("marketplace", f"list_{nft_type}", 1)
+        ctx.backup_listing(nft_id)
+        self.listings[nft_id] = {"nft_type": nft_type, "seller": ctx.sender, "price": int(price)}
+        ctx.wrap(nft_id)
+        ctx.mutate(marketplace_id)
+
+    def _take_listing(self, nft_id, function):
+        listing = self.listings.get(nft_id)
+        if listing is None:
+            raise MoveAbort("marketplace", function, 4)
+        return listing
+
+    def _buy(self, ctx, marketplace_id, nft_id, coin_id, nft_type):
+        listing = self._take_listing(nft_id, f"buy_{nft_type}")
+        ctx.backup_listing(nft_id)
+        coin = self._owned(ctx, coin_id, COIN_TYPE)
+        if coin["fields"]["balance"] < listing["price"]:
+            raise MoveAbort("marketplace", f"buy_{nft_type}", 2)
+        del self.listings[nft_id]
+
+        fee = listing["price"] * self.fee_percentage // 10000
+        coin["fields"]["balance"] -= listing["price"]
+        ctx.create(COIN_TYPE, self.package_id, {"balance": fee})
+        ctx.create(COIN_TYPE, listing["seller"], {"balance": listing["price"] - fee})
+        if coin["fields"]["balance"] == 0:
+            ctx.delete(coin_id)
+        else:
+            ctx.mutate(coin_id)
+        ctx.mutate(nft_id, owner=ctx.sender)
+        ctx.mutate(marketplace_id)
+
+    def _cancel(self, ctx, marketplace_id, nft_id, nft_type):
+        listing = self._take_listing(nft_id, f"cancel_listing_{nft_type}")
+        ctx.backup_listing(nft_id)
+        if listing["seller"] != ctx.sender:
+            raise MoveAbort("marketplace", f"cancel_listing_{nft_type}", 3)
+        del self.listings[nft_id]
+        ctx.mutate(nft_id, owner=listing["seller"])
+        ctx.mutate(marketplace_id)
+
+    # ============================================
+    # Transactions
+    # ============================================
+
+    def mint_coin(self, owner: str, balance: int) -> str:
+        """Give an address a payment coin (test faucet)"""
+        object_id = _new_id()
+        self.objects[object_id] = {"type": COIN_TYPE, "owner": owner, "fields": {"balance": balance}, "version": 1}
+        return object_id
+
+    def execute(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute {"sender", "calls": [{"target": "<pkg>::<module>::<fn>", "arguments": [...]}]}
+
+        Returns the transaction block; a failing call rolls everything back
+        and is reported in effects.status like a Move abort.
+        """
+        sender = transaction["sender"]
+        ctx = _TxContext(self, sender)
+        status = {"status": "success"}
+        inputs: List[Dict[str, Any]] = []
+        commands: List[Dict[str, Any]] = []
+
+        for call in transaction["calls"]:
+            package, module, function = call["target"].split("::")
+            arguments = []
+            for value in call["arguments"]:
+                obj = self.objects.get(value) if isinstance(value, str) else None
+                if obj is not None and obj["owner"] is not None:
+                    inputs.append({"type": "object", "objectId": value})
+                else:
+                    inputs.append({"type": "pure", "value": str(value) if isinstance(value, int) else value})
+                arguments.append({"Input": len(inputs) - 1})
+            commands.append({"MoveCall": {"package": package, "module": module, "function": function, "arguments": arguments}})
+
+        try:
+            for call in transaction["calls"]:
+                package, module, function = call["target"].split("::")
+                handler = self.entry_points.get(f"{module}::{function}")
+                if package != self.package_id or handler is None:
+                    raise ValueError(f"Unknown entry point {call['target']}")
+                handler(ctx, *call["arguments"])
+        except Exception as e:
+            ctx.rollback()
+            status = {"status": "failure", "error": str(e)}
+
+        return self._record(ctx, inputs, commands, status)
+
+    def transfer_objects(self, sender: str, object_ids: List[str], recipient: str) -> Dict[str, Any]:
+        """
+        A wallet transfer (TransferObjects command, no Move call into the package)
+
+        Allowed for any owned object with `store`, which Pokémon and Eggs have.
+        """
+        ctx = _TxContext(self, sender)
+        status = {"status": "success"}
+        inputs = [{"type": "object", "objectId": object_id} for object_id in object_ids]
+        inputs.append({"type": "pure", "valueType": "address", "value": recipient})
+        commands = [{"TransferObjects": [[{"Input": i} for i in range(len(object_ids))], {"Input": len(object_ids)}]}]
+        try:
+            for object_id in object_ids:
+                obj = self.objects.get(object_id)
+                if obj is None or obj["owner"] != sender:
+                    raise ValueError(f"Object {object_id} is not owned by {sender}")
+                ctx.mutate(object_id, owner=recipient)
+        except Exception as e:
+            ctx.rollback()
+            status = {"status": "failure", "error": str(e)}
+        return self._record(ctx, inputs, commands, status)
+
+    def _record(
+        self,
+        ctx: _TxContext,
+        inputs: List[Dict[str, Any]],
+        commands: List[Dict[str, Any]],
+        status: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Apply versions, store the transaction block and return it"""
+        digest = uuid.uuid4().hex
+        object_changes = []
+        for object_id, change in ctx.changes.items():
+            if change == "gone":
+                continue
+            if change == "deleted":
+                object_changes.append({"type": change, "objectId": object_id, "objectType": ctx.deleted_types[object_id]})
+                continue
+            obj = self.objects[object_id]
+            entry = {"type": change, "objectId": object_id, "objectType": obj["type"]}
+            if change in ("created", "mutated"):
+                obj["version"] += 1
+                entry["version"] = str(obj["version"])
+                entry["owner"] = self._owner_json(obj["owner"])
+                self.history[(object_id, obj["version"])] = {**obj, "fields": copy.deepcopy(obj["fields"])}
+            object_changes.append(entry)
+
+        tx = {
+            "digest": digest,
+            "timestampMs": str(int(time.time() * 1000)),
+            "transaction": {"data": {"sender": ctx.sender, "transaction": {
+                "kind": "ProgrammableTransaction", "inputs": inputs, "transactions": commands,
+            }}},
+            "effects": {"status": status},
+            "objectChanges": object_changes,
+            "events": ctx.events,
+            "_packages": {c["MoveCall"]["package"] for c in commands if "MoveCall" in c},
+            "_calls": {(c["MoveCall"]["module"], c["MoveCall"]["function"]) for c in commands if "MoveCall" in c},
+            "_inputs": {i["objectId"] for i in inputs if i["type"] == "object"},
+        }
+        self.transactions.append(tx)
+        self.tx_by_digest[digest] = tx
+        self.events.extend({**e, "id": {"txDigest": digest, "eventSeq": str(i)}} for i, e in enumerate(ctx.events))
+        return self._tx_json(tx)
+
+    # ============================================
+    # JSON-RPC
+    # ============================================
+
+    def _owner_json(self, owner: Optional[str]) -> Any:
+        if owner == "shared":
+            return {"Shared": {"initial_shared_version": 1}}
+        return {"AddressOwner": owner} if owner else None
+
+    def _tx_json(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in tx.items() if not k.startswith("_")}
+
+    def _object_json(self, object_id: str, obj: Optional[Dict[str, Any]] = ...) -> Dict[str, Any]:
+        if obj is ...:
+            obj = self.objects.get(object_id)
+        if obj is None or obj["owner"] is None:
+            return {"error": {"code": "notExists", "object_id": object_id}}
+        return {"data": {
+            "objectId": object_id,
+            "version": str(obj["version"]),
+            "type": obj["type"],
+            "owner": self._owner_json(obj["owner"]),
+            "content": {"dataType": "moveObject", "type": obj["type"], "fields": self._move_json(object_id, obj["fields"])},
+        }}
+
+    def _move_json(self, object_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Render fields the way the node does: UID wrapper, u64 as strings, nested structs"""
+        rendered: Dict[str, Any] = {"id": {"id": object_id}}
+        for name, value in fields.items():
+            if name == "stats":
+                rendered[name] = {
+                    "type": f"{self.package_id}::pokemon::Stats",
+                    "fields": {k: str(v) for k, v in value.items()},
+                }
+            elif isinstance(value, int) and name != "genetics":
+                rendered[name] = str(value)
+            else:
+                rendered[name] = value
+        return rendered
+
+    def _matches(self, tx: Dict[str, Any], filter_: Optional[Dict[str, Any]]) -> bool:
+        if not filter_:
+            return True
+        if "MoveFunction" in filter_:
+            f = filter_["MoveFunction"]
+            if f["package"] not in tx["_packages"]:
+                return False
+            return all(
+                f.get(field) is None or any(call[i] == f[field] for call in tx["_calls"])
+                for i, field in enumerate(("module", "function"))
+            )
+        if "InputObject" in filter_:
+            return filter_["InputObject"] in tx["_inputs"]
+        if "FromAddress" in filter_:
+            return tx["transaction"]["data"]["sender"] == filter_["FromAddress"]
+        return False
+
+    def _page(self, items: List[Any], key: Callable[[Any], str], cursor, limit, descending=False):
+        ordered = list(reversed(items)) if descending else items
+        start = 0
+        if cursor is not None:
+            keys = [key(item) for item in ordered]
+            start = keys.index(cursor) + 1 if cursor in keys else len(ordered)
+        page = ordered[start:start + min(limit or QUERY_MAX_RESULT_LIMIT, QUERY_MAX_RESULT_LIMIT)]
+        return {
+            "data": page,
+            "nextCursor": key(page[-1]) if page else cursor,
+            "hasNextPage": start + len(page) < len(ordered),
+        }
+
+    def rpc(self, method: str, params: List[Any]) -> Any:
+        """Dispatch one JSON-RPC call"""
+        if method == "suix_queryTransactionBlocks":
+            query, cursor, limit, descending = (params + [None, None, False])[:4]
+            matched = [tx for tx in self.transactions if self._matches(tx, query.get("filter"))]
+            page = self._page(matched, lambda tx: tx["digest"], cursor, limit, descending)
+            page["data"] = [self._tx_json(tx) for tx in page["data"]]
+            return page
+        if method == "sui_getTransactionBlock":
+            tx = self.tx_by_digest.get(params[0])
+            if tx is None:
+                raise KeyError(f"Could not find the referenced transaction {params[0]}")
+            return self._tx_json(tx)
+        if method == "sui_multiGetObjects":
+            if len(params[0]) > MAX_MULTI_GET_OBJECTS:
+                raise ValueError(
+                    f"Size of the object list exceeds the max number of objects per query ({MAX_MULTI_GET_OBJECTS})"
+                )
+            return [self._object_json(object_id) for object_id in params[0]]
+        if method == "sui_tryMultiGetPastObjects":
+            if len(params[0]) > MAX_MULTI_GET_OBJECTS:
+                raise ValueError(
+                    f"Size of the object list exceeds the max number of objects per query ({MAX_MULTI_GET_OBJECTS})"
+                )
+            results = []
+            for ref in params[0]:
+                obj = self.history.get((ref["objectId"], int(ref["version"])))
+                if obj is None:
+                    results.append({"status": "VersionNotFound", "details": [ref["objectId"], ref["version"]]})
+                else:
+                    results.append({"status": "VersionFound", "details": self._object_json(ref["objectId"], obj)["data"]})
+            return results
+        if method == "sui_getObject":
+            return self._object_json(params[0])
+        if method == "suix_getOwnedObjects":
+            address, query, cursor, limit = (params + [None, None, None])[:4]
+            struct = ((query or {}).get("filter") or {}).get("StructType")
+            owned = [
+                object_id for object_id, obj in self.objects.items()
+                if obj["owner"] == address and (struct is None or obj["type"] == struct)
+            ]
+            page = self._page(owned, lambda object_id: object_id, cursor, limit)
+            page["data"] = [self._object_json(object_id) for object_id in page["data"]]
+            return page
+        if method == "suix_queryEvents":
+            query, cursor, limit, descending = (params + [None, None, None, False])[:4]
+            return self._page(self.events, lambda e: f"{e['id']['txDigest']}:{e['id']['eventSeq']}", cursor, limit, descending)
+        if method == "sui_getLatestCheckpointSequenceNumber":
+            return str(len(self.transactions))
+        if method == "local_executeTransaction":
+            return self.execute(params[0])
+        raise NotImplementedError(f"Method not supported by the local chain: {method}")
+
+    async def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms))
+            await asyncio.sleep(delay / 1000)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Local OneChain RPC")
+
+        @app.post("/")
+        async def json_rpc(request: Request):
+            body = await request.json()
+            self.request_count += 1
+            await self._delay()
+            roll = random.random()
+            if roll < self.rate_limit_rate:
+                return JSONResponse({"error": "Too many requests"}, status_code=429, headers={"Retry-After": "1"})
+            if roll < self.rate_limit_rate + self.error_rate:
+                return JSONResponse({"error": "Service unavailable"}, status_code=503)
+            try:
+                return {"jsonrpc": "2.0", "id": body.get("id"), "result": self.rpc(body["method"], body.get("params", []))}
+            except NotImplementedError as e:
+                return {"jsonrpc": "2.0", "id": body.get("id"), "error": {"code": -32601, "message": str(e)}}
+            except Exception as e:
+                return {"jsonrpc": "2.0", "id": body.get("id"), "error": {"code": -32602, "message": str(e)}}
+
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local OneChain RPC stand-in")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    args = parser.parse_args()
+    chain = LocalSuiChain(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+    uvicorn.run(chain.app, port=args.port)
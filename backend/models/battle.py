@@ -42,3 +42,15 @@ class DamageResult(BaseModel):
     effectiveness: float
     critical: bool
     message: str
+
+
+class MatchTicket(BaseModel):
+    player_id: str = Field(..., min_length=1)
+    level: int = Field(..., ge=1, le=100)
+    pokemon: Dict[str, Any] = {}  # Pokémon the player brings to the battle
+
+
+class PvPBattleState(BattleState):
+    """BattleState for a matchmade battle; player_ids[0] plays player_pokemon"""
+    player_ids: List[str]
+    created_at: int
@@ -54,6 +54,7 @@ class CaptureAttempt(BaseModel):
     pokemon_id: int
     health_percent: float = Field(..., ge=0.0, le=1.0)
     rarity: Rarity
+    player_id: Optional[str] = None  # Set to count successful captures towards quests
 
 
 class CaptureResult(BaseModel):
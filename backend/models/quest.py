@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
 from enum import Enum
 from datetime import datetime
@@ -39,14 +39,38 @@ class Quest(BaseModel):
     expires_at: datetime
 
 
+class QuestDraft(BaseModel):
+    """Flat quest shape the AI model fills in; QuestService maps it onto Quest"""
+    title: str = Field(..., min_length=1, max_length=60)
+    description: str = Field(..., min_length=1)
+    objective_type: ObjectiveType
+    objective_target: int = Field(..., ge=1, le=5)
+    reward_type: RewardType
+    reward_amount: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_reward_amount(self):
+        if self.reward_type == RewardType.TOKENS:
+            if self.reward_amount is None or not 100 <= self.reward_amount <= 1000:
+                raise ValueError("token rewards need reward_amount between 100 and 1000")
+        elif self.reward_type == RewardType.POKEMON:
+            if self.reward_amount is None or not 1 <= self.reward_amount <= 151:
+                raise ValueError("pokemon rewards need reward_amount set to a pokemon_id (1-151)")
+        else:
+            self.reward_amount = None
+        return self
+
+
 class QuestGenerationRequest(BaseModel):
     player_team: List[dict]
     player_level: int = Field(default=1, ge=1)
+    player_id: Optional[str] = None
 
 
 class DailyChallenge(BaseModel):
     id: str
     description: str
+    type: Optional[ObjectiveType] = None
     progress: int = Field(default=0, ge=0)
     target: int = Field(..., ge=1)
     reward: QuestReward
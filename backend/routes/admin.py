@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from typing import Optional
+import time
+
+from services.profiler import profiler_service, admin_token_valid, ProfilerUnavailableError, FORMATS
+
+router = APIRouter()
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _profile_response(name: str, sampler, fmt: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    body = profiler_service.render(name, sampler, fmt)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    headers = {"X-Profile-Samples": str(sampler.sample_count)}
+    if fmt == "collapsed":
+        headers["Content-Disposition"] = f'attachment; filename="profile-{stamp}.folded"'
+        return PlainTextResponse(body, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="profile-{stamp}.speedscope.json"'
+    return ORJSONResponse(body, headers=headers)
+
+
+@router.post("/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    format: str = "speedscope"
+):
+    """
+    Sample this worker's event loop for N seconds while it serves traffic
+
+    Returns a speedscope profile (open at https://www.speedscope.app) or,
+    with format=collapsed, stacks for flamegraph.pl.
+    """
+    try:
+        name, sampler = await profiler_service.profile_for(seconds)
+    except ProfilerUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _profile_response(name, sampler, format)
+
+
+@router.get("/profile/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str, format: str = "speedscope"):
+    """
+    Profile of a single request sent with "X-Profile: 1" (see the X-Profile-Id header)
+    """
+    profile = profiler_service.get_request_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _profile_response(*profile, format)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any, List
-from services.gemini_service import gemini_service
+from typing import Dict, Any, List, Optional
+from services.gemini_service import gemini_service, FALLBACK_QUEST
+from services.conversation_service import conversation_service, estimate_tokens
 
 router = APIRouter()
 
@@ -81,7 +82,7 @@ async def generate_quest(request: QuestGenerationRequest):
             request.player_team,
             request.player_level
         )
-        return quest
+        return quest if quest is not None else FALLBACK_QUEST
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate quest: {str(e)}")
 
@@ -109,22 +110,41 @@ async def generate_hatching_text(request: HatchingRequest):
 class TrainerDialogueRequest(BaseModel):
     player_message: str
     trainer_personality: str  # 'friendly', 'competitive', 'mysterious'
-    conversation_history: List[Dict[str, str]] = []
+    conversation_history: List[Dict[str, str]] = []  # Only used to seed a new session
     context: Dict[str, Any] = None
+    session_id: Optional[str] = None
 
 
 @router.post("/dialogue")
 async def generate_trainer_dialogue(request: TrainerDialogueRequest):
     """
     Generate AI trainer dialogue response
+
+    History is kept server-side per session_id; send the returned
+    session_id back instead of the full conversation_history.
     """
     try:
+        session_id = request.session_id or conversation_service.new_session_id()
+        session = {"summary": "", "turns": []}
+        if request.session_id:
+            session = await conversation_service.load_session(session_id)
+        if not session["turns"] and not session["summary"]:
+            session["turns"] = conversation_service.normalize_turns(request.conversation_history)
+
+        summary, turns = conversation_service.window(
+            session,
+            reserve_tokens=estimate_tokens(request.player_message)
+        )
         response = await gemini_service.generate_trainer_dialogue(
             request.player_message,
             request.trainer_personality,
-            request.conversation_history,
-            request.context
+            turns,
+            request.context,
+            history_summary=summary
+        )
+        await conversation_service.record_exchange(
+            session_id, session, request.player_message, response
         )
-        return {"response": response}
+        return {"response": response, "session_id": session_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate trainer dialogue: {str(e)}")
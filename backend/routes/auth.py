@@ -1,20 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
-from config import settings
-import os
+from services.auth_service import wallet_auth_service
 
 router = APIRouter()
 
-# Initialize Firebase Admin SDK
-if not firebase_admin._apps:
-    if os.path.exists(settings.FIREBASE_SERVICE_ACCOUNT_PATH):
-        cred = credentials.Certificate(settings.FIREBASE_SERVICE_ACCOUNT_PATH)
-        firebase_admin.initialize_app(cred)
-    else:
-        print("⚠️  Warning: Firebase service account key not found. Authentication will not work.")
-
 
 class WalletAuthRequest(BaseModel):
     walletAddress: str
@@ -29,26 +18,18 @@ async def authenticate_wallet(request: WalletAuthRequest):
     """
     Generate a custom Firebase token for wallet authentication
     """
-    # Check if Firebase is initialized
-    if not firebase_admin._apps:
+    # Initialize Firebase Admin SDK on first use
+    if not await wallet_auth_service.ensure_firebase():
         raise HTTPException(
             status_code=503, 
             detail="Firebase authentication is not configured. This is optional and doesn't affect core game functionality."
         )
     
     try:
-        wallet_address = request.walletAddress
-        
-        # Create or get user with wallet address as UID
-        try:
-            user = firebase_auth.get_user(wallet_address)
-        except firebase_auth.UserNotFoundError:
-            user = firebase_auth.create_user(uid=wallet_address)
+        # Create or get user with wallet address as UID, then mint (or reuse) a custom token
+        custom_token = await wallet_auth_service.login(request.walletAddress)
         
-        # Generate custom token
-        custom_token = firebase_auth.create_custom_token(wallet_address)
-        
-        return WalletAuthResponse(token=custom_token.decode('utf-8'))
+        return WalletAuthResponse(token=custom_token)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Authentication failed: {str(e)}")
@@ -59,14 +40,17 @@ async def verify_wallet(wallet_address: str):
     """
     Verify if a wallet address is registered
     """
+    if not await wallet_auth_service.ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase authentication is not configured.")
+    
     try:
-        user = firebase_auth.get_user(wallet_address)
+        user = await wallet_auth_service.get_user(wallet_address)
+        if user is None:
+            return {"exists": False}
         return {
             "exists": True,
-            "uid": user.uid,
-            "created_at": user.user_metadata.creation_timestamp,
+            "uid": user["uid"],
+            "created_at": user["created_at"],
         }
-    except firebase_auth.UserNotFoundError:
-        return {"exists": False}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
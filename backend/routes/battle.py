@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from models.battle import DamageCalculation, DamageResult
 from models.pokemon import CaptureAttempt, CaptureResult
+from models.quest import ObjectiveType
 from services.battle_engine import battle_engine
+from services.game_events import game_event_service
+from services.xp_ledger import xp_ledger
+from services.egg_incubation import egg_incubation_service
+from services.settlement_batches import SettlementUnavailableError, UnknownNftError, NftOwnershipError
 
 router = APIRouter()
 
@@ -33,24 +39,85 @@ async def calculate_capture_rate(attempt: CaptureAttempt):
             attempt.health_percent,
             attempt.rarity
         )
-        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if result.success and attempt.player_id:
+        await game_event_service.publish(
+            attempt.player_id,
+            ObjectiveType.CAPTURE,
+            pokemon_id=attempt.pokemon_id,
+            rarity=attempt.rarity.value
+        )
+    return result
+
 
 @router.post("/award-xp")
-async def award_experience(winner_level: int, loser_level: int):
+async def award_experience(
+    winner_level: int = Query(..., ge=1, le=100),
+    loser_level: int = Query(..., ge=1, le=100),
+    player_id: Optional[str] = None,
+    pokemon_types: List[str] = Query(default=[]),
+    nft_id: Optional[str] = None,
+    egg_ids: List[str] = Query(default=[])
+):
     """
     Calculate experience points awarded after battle
+
+    Pass player_id to count the win towards the player's quests, challenges
+    and leaderboards; pokemon_types (the winner's types) feeds per-type rankings.
+    Pass nft_id (the winner's Pokémon NFT, owned by player_id) to accumulate
+    the XP in the off-chain ledger, computed from the NFT's own level rather
+    than winner_level; it is settled on chain in periodic batches.
+    Pass egg_ids to add the win's incubation step to each of the player's eggs.
+    Ownership of the NFT and every egg is checked against the chain index
+    before anything is recorded.
     """
+    if (nft_id or egg_ids) and not player_id:
+        raise HTTPException(status_code=400, detail="nft_id and egg_ids require player_id")
+
     try:
         xp = battle_engine.award_experience(winner_level, loser_level)
         level_up = battle_engine.check_level_up(xp, winner_level)
-        
-        return {
-            "experience_gained": xp,
-            "level_up": level_up,
-            "new_level": winner_level + 1 if level_up else winner_level,
-        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    result = {
+        "experience_gained": xp,
+        "level_up": level_up,
+        "new_level": winner_level + 1 if level_up else winner_level,
+    }
+    try:
+        nft = await xp_ledger.load_pokemon(nft_id, player_id) if nft_id else None
+        eggs = {egg_id: await egg_incubation_service.load_egg(egg_id, player_id) for egg_id in egg_ids}
+
+        if nft:
+            ledger = await xp_ledger.award(nft_id, player_id, loser_level, nft=nft)
+            result.update(
+                experience_gained=ledger["experience_gained"],
+                level_up=ledger["levels_gained"] > 0,
+                new_level=ledger["level"],
+                ledger=ledger
+            )
+        if eggs:
+            result["eggs"] = [
+                await egg_incubation_service.add_steps(egg_id, player_id, egg=egg)
+                for egg_id, egg in eggs.items()
+            ]
+    except UnknownNftError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except NftOwnershipError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except SettlementUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if player_id:
+        await game_event_service.publish(
+            player_id,
+            ObjectiveType.BATTLE,
+            winner_level=winner_level,
+            loser_level=loser_level,
+            xp=result["experience_gained"],
+            types=",".join(t.lower() for t in pokemon_types) or None
+        )
+    return result
@@ -1,11 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from models.pokemon import Rarity
 from services.blockchain_service import blockchain_service
+from services.marketplace_index import marketplace_index, MAX_INDEXED_PRICE
+from services.xp_ledger import xp_ledger
+from services.egg_incubation import egg_incubation_service
+from services.settlement_batches import SettlementUnavailableError, UnknownNftError, NftOwnershipError
+from services.auth_service import wallet_auth_service, InvalidWalletTokenError
+
+# Off-chain state settled on chain in per-owner batches, by batch kind
+SETTLEMENT_BATCHERS = {batcher.kind: batcher for batcher in (xp_ledger, egg_incubation_service)}
 
 router = APIRouter()
 
 
+async def require_wallet(authorization: Optional[str] = Header(None)) -> str:
+    """The caller's wallet address, from the Firebase ID token sent as a bearer token"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Wallet authentication required")
+    if not await wallet_auth_service.ensure_firebase():
+        raise HTTPException(status_code=503, detail="Firebase authentication is not configured.")
+    try:
+        return await wallet_auth_service.verify_id_token(token)
+    except InvalidWalletTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
 class MintPokemonRequest(BaseModel):
     owner: str
     species_id: int
@@ -19,6 +41,10 @@ class MintEggRequest(BaseModel):
     parent2_id: str
 
 
+class SettlementSubmittedRequest(BaseModel):
+    digest: str
+
+
 class UpdateStatsRequest(BaseModel):
     nft_id: str
     new_xp: int
@@ -38,6 +64,55 @@ async def get_player_nfts(address: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch NFTs: {str(e)}")
 
 
+@router.get("/listings")
+async def get_listings(
+    nft_type: Optional[str] = Query(default=None, pattern="^(pokemon|egg)$"),
+    species_id: Optional[int] = None,
+    rarity: Optional[Rarity] = None,
+    min_price: Optional[int] = Query(default=None, ge=0, le=MAX_INDEXED_PRICE),
+    max_price: Optional[int] = Query(default=None, ge=0, le=MAX_INDEXED_PRICE),
+    min_level: Optional[int] = Query(default=None, ge=1, le=100),
+    max_level: Optional[int] = Query(default=None, ge=1, le=100),
+    sort: str = Query(default="price_asc", pattern="^(price_asc|price_desc|newest)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    """
+    Browse active marketplace listings
+    
+    Prices are in the payment coin's smallest unit. Pass next_cursor from
+    the previous response to get the next page.
+    """
+    try:
+        return await marketplace_index.search(
+            nft_type=nft_type,
+            species_id=species_id,
+            rarity=rarity.value if rarity else None,
+            min_price=min_price,
+            max_price=max_price,
+            min_level=min_level,
+            max_level=max_level,
+            sort=sort,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch listings: {str(e)}")
+
+
+@router.get("/listings/floor")
+async def get_floor_prices(species_id: Optional[int] = None):
+    """
+    Get the floor (cheapest) listing price and listing count per Pokémon species
+    """
+    try:
+        return {"floor_prices": await marketplace_index.floor_prices(species_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch floor prices: {str(e)}")
+
+
 @router.post("/prepare-mint-pokemon")
 async def prepare_mint_pokemon(request: MintPokemonRequest):
     """
@@ -86,3 +161,83 @@ async def prepare_update_stats(request: UpdateStatsRequest):
         return tx_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to prepare stats update: {str(e)}")
+
+
+@router.get("/settlements/{owner}")
+async def get_settlements(
+    owner: str,
+    kind: Optional[str] = Query(default=None, pattern="^(xp|incubation)$"),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """
+    Get an owner's settlement batches (XP and egg incubation), newest first
+    
+    A "pending" batch carries the batched transaction for the owner's
+    wallet to sign and execute.
+    """
+    batchers = [SETTLEMENT_BATCHERS[kind]] if kind else SETTLEMENT_BATCHERS.values()
+    try:
+        batches = [b for batcher in batchers for b in await batcher.get_batches(owner, limit)]
+    except SettlementUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    batches.sort(key=lambda b: b["created_at"], reverse=True)
+    return {"batches": batches[:limit]}
+
+
+@router.post("/settlements/{batch_id}/submitted")
+async def mark_settlement_submitted(
+    batch_id: str,
+    request: SettlementSubmittedRequest,
+    wallet: str = Depends(require_wallet)
+):
+    """
+    Report the digest of an executed settlement transaction
+    
+    Only the batch's owner may report it, signed in with the Firebase ID
+    token of their wallet login.
+    """
+    try:
+        batch = batcher = None
+        for batcher in SETTLEMENT_BATCHERS.values():
+            batch = await batcher.get_batch(batch_id)
+            if batch:
+                break
+        if batch is None:
+            raise HTTPException(status_code=404, detail=f"Settlement batch {batch_id} not found")
+        if batch["owner"] != wallet:
+            raise HTTPException(status_code=403, detail=f"Settlement batch {batch_id} belongs to another wallet")
+        return await batcher.mark_submitted(batch_id, request.digest)
+    except SettlementUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/eggs/{egg_id}/steps")
+async def add_incubation_steps(egg_id: str, owner: str, steps: int = Query(default=1, ge=1, le=10)):
+    """
+    Count incubation steps for an egg off-chain
+    
+    The egg must be owned by owner. Steps are settled on chain in batched
+    increment_incubation calls.
+    """
+    try:
+        return await egg_incubation_service.add_steps(egg_id, owner, steps)
+    except UnknownNftError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except NftOwnershipError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except SettlementUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/eggs/{egg_id}/incubation")
+async def get_incubation_progress(egg_id: str):
+    """
+    Get an egg's incubation progress, including steps not yet settled on chain
+    """
+    try:
+        progress = await egg_incubation_service.get_progress(egg_id)
+    except SettlementUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Egg {egg_id} not found")
+    return progress
@@ -0,0 +1,104 @@
+"""
+Leaderboard API Routes
+"""
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Optional
+import logging
+
+from services.leaderboard_service import leaderboard_service, LeaderboardUnavailableError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _board_key(board: str, metric: str, pokemon_type: Optional[str], week: Optional[str]) -> str:
+    try:
+        return leaderboard_service.board_key(board, metric, pokemon_type, week)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/{board}")
+async def get_leaderboard(
+    board: str,
+    metric: str = "xp",
+    pokemon_type: Optional[str] = None,
+    week: Optional[str] = None,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=100)
+):
+    """
+    Get one page of a leaderboard
+    
+    Args:
+        board: "global", "weekly" or "type" (with pokemon_type)
+        metric: "xp", "wins" or "captures"
+        week: ISO week for weekly boards, e.g. 2025-W07 (defaults to current)
+        offset: Rank offset of the page
+        limit: Page size (max 100)
+    """
+    key = _board_key(board, metric, pokemon_type, week)
+    try:
+        return await leaderboard_service.get_page(key, offset, limit)
+    except LeaderboardUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching leaderboard: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch leaderboard: {str(e)}"
+        )
+
+
+@router.get("/{board}/player/{player_id}")
+async def get_player_rank(
+    board: str,
+    player_id: str,
+    metric: str = "xp",
+    pokemon_type: Optional[str] = None,
+    week: Optional[str] = None,
+    radius: int = Query(default=0, ge=0, le=25)
+):
+    """
+    Get a player's rank and score, optionally with the players around them
+    
+    Args:
+        radius: Number of neighbours to include above and below the player
+    """
+    key = _board_key(board, metric, pokemon_type, week)
+    try:
+        result = await leaderboard_service.get_player(key, player_id, radius)
+    except LeaderboardUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching player rank: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch player rank: {str(e)}"
+        )
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player {player_id} is not ranked on this board"
+        )
+    return result
+
+
+@router.get("/{board}/snapshots")
+async def get_leaderboard_snapshots(
+    board: str,
+    metric: str = "xp",
+    pokemon_type: Optional[str] = None,
+    week: Optional[str] = None,
+    limit: int = Query(default=1, ge=1, le=24)
+):
+    """
+    Get the most recent periodic snapshots of a leaderboard's top entries
+    """
+    key = _board_key(board, metric, pokemon_type, week)
+    try:
+        return {"snapshots": await leaderboard_service.get_snapshots(key, limit)}
+    except LeaderboardUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
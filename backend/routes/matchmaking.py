@@ -0,0 +1,85 @@
+"""
+PvP Matchmaking API Routes
+"""
+from fastapi import APIRouter, HTTPException, status
+import logging
+
+from models.battle import MatchTicket
+from services.matchmaking_service import matchmaking_service, MatchmakingUnavailableError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/queue")
+async def join_queue(ticket: MatchTicket):
+    """
+    Join the PvP queue
+    
+    Returns "matched" with the battle session if an opponent is already
+    waiting, otherwise "queued"; poll /status/{player_id} until matched.
+    """
+    try:
+        return await matchmaking_service.enqueue(ticket)
+    except MatchmakingUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error joining matchmaking queue: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to join queue: {str(e)}"
+        )
+
+
+@router.get("/status/{player_id}")
+async def get_match_status(player_id: str):
+    """
+    Get a player's matchmaking status
+    """
+    try:
+        return await matchmaking_service.get_status(player_id)
+    except MatchmakingUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching matchmaking status: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch status: {str(e)}"
+        )
+
+
+@router.delete("/queue/{player_id}")
+async def leave_queue(player_id: str):
+    """
+    Leave the PvP queue
+    """
+    try:
+        removed = await matchmaking_service.cancel(player_id)
+    except MatchmakingUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Player {player_id} is not queued"
+        )
+    return {"success": True}
+
+
+@router.get("/battle/{battle_id}")
+async def get_battle_session(battle_id: str):
+    """
+    Get a matchmade battle session
+    """
+    try:
+        session = await matchmaking_service.get_session(battle_id)
+    except MatchmakingUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Battle {battle_id} not found"
+        )
+    return session
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from services.metrics import metrics, metrics_token_valid
+
+router = APIRouter()
+
+
+async def require_metrics_token(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not metrics_token_valid(token):
+        raise HTTPException(status_code=403, detail="Metrics token required")
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)]
+)
+async def get_metrics():
+    """
+    Prometheus metrics of every live worker process (text exposition format)
+    """
+    return PlainTextResponse(await metrics.render_all(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,39 @@
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Optional, List
 import random
 
+from config import settings
 from models.pokemon import PokemonData, Rarity
 from services.pokemon_service import pokemon_service
 
 router = APIRouter()
 
+# Species data does not change, so browsers and CDNs may keep it for a long time
+SPECIES_CACHE_CONTROL = f"public, max-age={settings.POKEMON_HTTP_MAX_AGE}"
+
+
+def _matches(request: Request, etag: Optional[str]) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": SPECIES_CACHE_CONTROL})
+
+
+def _species_response(request: Request, body: bytes, etag: Optional[str]) -> Response:
+    if etag is None:
+        # Partial list (some species failed to fetch): serve it, but never let it be cached
+        return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+    if _matches(request, etag):
+        return _not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": SPECIES_CACHE_CONTROL}
+    return Response(body, media_type="application/json", headers=headers)
+
 
 @router.get("/random", response_model=PokemonData)
 async def get_random_pokemon(rarity: Optional[Rarity] = None):
@@ -14,8 +41,9 @@ async def get_random_pokemon(rarity: Optional[Rarity] = None):
     Get a random Pokémon with optional rarity filter
     """
     try:
-        pokemon = await pokemon_service.get_random_pokemon(rarity)
-        return pokemon
+        pokemon_id = pokemon_service.random_pokemon_id(rarity)
+        body, _ = await pokemon_service.get_pokemon_json(pokemon_id)
+        return Response(body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -26,31 +54,62 @@ async def get_random_starter():
     Get a random starter Pokémon from the predefined list
     """
     try:
-        pokemon = await pokemon_service.get_random_starter()
-        return pokemon
+        starter_id = random.choice(pokemon_service.starter_ids)
+        body, _ = await pokemon_service.get_pokemon_json(starter_id)
+        return Response(body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/starters/all")
-async def get_all_starters():
+async def get_all_starters(request: Request):
     """
     Get all available starter Pokémon
     """
+    # Revalidation is answered from the in-process ETags, without a cache lookup
+    etag = pokemon_service.cached_list_etag(pokemon_service.starter_ids)
+    if _matches(request, etag):
+        return _not_modified(etag)
+    try:
+        body, etag = await pokemon_service.get_list_json(pokemon_service.starter_ids, "starters")
+        return _species_response(request, body, etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch")
+async def get_pokemon_batch(request: Request, ids: str):
+    """
+    Get several Pokémon by ID in one request (ids=1,4,7)
+    """
+    try:
+        pokemon_ids: List[int] = list(dict.fromkeys(int(id.strip()) for id in ids.split(",") if id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not pokemon_ids or len(pokemon_ids) > settings.POKEMON_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Request 1 to {settings.POKEMON_BATCH_MAX_IDS} ids")
+
+    etag = pokemon_service.cached_list_etag(pokemon_ids)
+    if _matches(request, etag):
+        return _not_modified(etag)
     try:
-        starters = await pokemon_service.get_all_starters()
-        return {"starters": starters}
+        body, etag = await pokemon_service.get_list_json(pokemon_ids, "pokemon")
+        return _species_response(request, body, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{pokemon_id}", response_model=PokemonData)
-async def get_pokemon(pokemon_id: int):
+async def get_pokemon(request: Request, pokemon_id: int):
     """
     Get Pokémon data by ID
     """
+    etag = pokemon_service.cached_etag(pokemon_id)
+    if _matches(request, etag):
+        return _not_modified(etag)
     try:
-        pokemon = await pokemon_service.get_pokemon(pokemon_id)
-        return pokemon
+        # Pre-serialized body: validated once when cached, not on every response
+        body, etag = await pokemon_service.get_pokemon_json(pokemon_id)
+        return _species_response(request, body, etag)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Pokémon not found: {str(e)}")
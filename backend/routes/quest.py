@@ -1,8 +1,8 @@
 """
 Quest API Routes
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Body, Query, status
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import logging
 
@@ -13,10 +13,11 @@ from models.quest import (
     ObjectiveType
 )
 from services.quest_service import quest_service
+from services.quest_store import quest_store, QuestStoreUnavailableError
+from services.daily_challenge_scheduler import daily_challenge_scheduler
+from services.gemini_service import gemini_service
 from config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -36,9 +37,14 @@ async def generate_quest(request: QuestGenerationRequest):
     try:
         quest = await quest_service.generate_quest(
             player_team=request.player_team,
-            player_level=request.player_level
+            player_level=request.player_level,
+            player_id=request.player_id
         )
+        if request.player_id:
+            await quest_store.add_quest(request.player_id, quest)
         return quest
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating quest: {str(e)}")
         raise HTTPException(
@@ -48,19 +54,25 @@ async def generate_quest(request: QuestGenerationRequest):
 
 
 @router.get("/daily-challenges", response_model=List[DailyChallenge])
-async def get_daily_challenges(player_level: int = 1):
+async def get_daily_challenges(player_level: int = 1, player_id: Optional[str] = None):
     """
     Generate daily challenges for a player
     
     Args:
         player_level: Player's current level
+        player_id: Optional player ID; today's challenges and progress are kept server-side
         
     Returns:
         List of 3 daily challenges
     """
     try:
-        challenges = await quest_service.generate_daily_challenges(player_level)
-        return challenges
+        if player_id:
+            await daily_challenge_scheduler.record_active(player_id, player_level)
+            return await daily_challenge_scheduler.get_challenges(player_id, player_level)
+
+        return await quest_service.generate_daily_challenges(player_level)
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating daily challenges: {str(e)}")
         raise HTTPException(
@@ -71,27 +83,51 @@ async def get_daily_challenges(player_level: int = 1):
 
 @router.post("/update-progress")
 async def update_quest_progress(
-    quest_data: Dict[str, Any],
     action_type: str,
-    increment: int = 1
+    increment: int = Query(1, ge=1, le=settings.QUEST_MAX_PROGRESS_INCREMENT),
+    player_id: Optional[str] = None,
+    quest_data: Optional[Dict[str, Any]] = Body(default=None)
 ):
     """
     Update quest progress based on player action
     
+    With player_id, progress is applied server-side to all of the player's
+    matching active quests. Sending quest_data instead is the legacy
+    stateless mode.
+    
     Args:
-        quest_data: Current quest data
         action_type: Type of action (battle, capture, hatch, trade)
-        increment: Amount to increment progress
+        increment: Amount to increment progress (1 to QUEST_MAX_PROGRESS_INCREMENT)
+        player_id: Player whose stored quests are updated
+        quest_data: Current quest data (legacy)
         
     Returns:
-        Updated quest
+        Updated quests, or the single updated quest in legacy mode
     """
     try:
-        # Convert dict to Quest object
-        quest = Quest(**quest_data)
-        
         # Convert action type string to enum
         action_enum = ObjectiveType(action_type)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid action type: {action_type}"
+        )
+
+    try:
+        if player_id:
+            result = await quest_store.apply_progress(
+                player_id, action_enum, increment, challenges=False
+            )
+            return {"quests": result["quests"]}
+
+        if quest_data is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Either player_id or quest_data is required"
+            )
+
+        # Convert dict to Quest object
+        quest = Quest(**quest_data)
         
         # Update progress
         updated_quest = quest_service.update_quest_progress(
@@ -107,11 +143,10 @@ async def update_quest_progress(
             "quest": updated_quest,
             "completed": is_completed
         }
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid action type: {action_type}"
-        )
+    except HTTPException:
+        raise
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating quest progress: {str(e)}")
         raise HTTPException(
@@ -121,30 +156,51 @@ async def update_quest_progress(
 
 
 @router.post("/complete")
-async def complete_quest(quest_id: str):
+async def complete_quest(quest_id: str, player_id: Optional[str] = None):
     """
     Mark a quest as completed and award rewards
     
     Args:
         quest_id: ID of the quest to complete
+        player_id: Player who owns the quest; required to verify completion
         
     Returns:
         Completion status and reward information
     """
     try:
-        # In a real implementation, this would:
-        # 1. Verify quest is actually completed
-        # 2. Award rewards to player
-        # 3. Update database
-        # 4. Return reward details
-        
-        logger.info(f"Quest {quest_id} completed")
-        
+        if not player_id:
+            # Legacy clients without server-side quests: nothing to verify
+            logger.info(f"Quest {quest_id} completed")
+            return {
+                "success": True,
+                "message": "Quest completed successfully",
+                "quest_id": quest_id
+            }
+
+        result = await quest_store.complete_quest(player_id, quest_id)
+        if result["status"] == "not_found":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Quest {quest_id} not found"
+            )
+        if result["status"] == "incomplete":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Quest {quest_id} objectives are not completed yet"
+            )
+
+        logger.info(f"Quest {quest_id} completed by {player_id}")
         return {
             "success": True,
-            "message": "Quest completed successfully",
-            "quest_id": quest_id
+            "message": "Quest completed successfully"
+            if result["status"] == "completed" else "Quest was already completed",
+            "quest_id": quest_id,
+            "rewards": result["quest"]["rewards"]
         }
+    except HTTPException:
+        raise
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error completing quest: {str(e)}")
         raise HTTPException(
@@ -155,20 +211,47 @@ async def complete_quest(quest_id: str):
 
 @router.post("/challenge/update-progress")
 async def update_challenge_progress(
-    challenge_data: Dict[str, Any],
-    increment: int = 1
+    increment: int = Query(1, ge=1, le=settings.QUEST_MAX_PROGRESS_INCREMENT),
+    player_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+    challenge_data: Optional[Dict[str, Any]] = Body(default=None)
 ):
     """
     Update daily challenge progress
     
+    With player_id and action_type, progress is applied server-side to the
+    player's matching challenges. Sending challenge_data instead is the
+    legacy stateless mode.
+    
     Args:
-        challenge_data: Current challenge data
-        increment: Amount to increment progress
+        increment: Amount to increment progress (1 to QUEST_MAX_PROGRESS_INCREMENT)
+        player_id: Player whose stored challenges are updated
+        action_type: Type of action (battle, capture, hatch, trade)
+        challenge_data: Current challenge data (legacy)
         
     Returns:
-        Updated challenge
+        Updated challenges, or the single updated challenge in legacy mode
     """
     try:
+        if player_id:
+            try:
+                action_enum = ObjectiveType(action_type)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid action type: {action_type}"
+                )
+            result = await quest_store.apply_progress(
+                player_id, action_enum, increment, quests=False
+            )
+            return {"challenges": result["challenges"]}
+
+        if challenge_data is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Either player_id and action_type or challenge_data is required"
+            )
+
         # Convert dict to DailyChallenge object
         challenge = DailyChallenge(**challenge_data)
         
@@ -185,6 +268,10 @@ async def update_challenge_progress(
             "challenge": updated_challenge,
             "completed": is_completed
         }
+    except HTTPException:
+        raise
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating challenge progress: {str(e)}")
         raise HTTPException(
@@ -193,11 +280,32 @@ async def update_challenge_progress(
         )
 
 
+@router.get("/active/{player_id}")
+async def get_active_quests(player_id: str):
+    """
+    Get a player's stored active quests and daily challenges
+    """
+    try:
+        return {
+            "quests": await quest_store.get_active_quests(player_id),
+            "challenges": await quest_store.get_daily_challenges(player_id)
+        }
+    except QuestStoreUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching active quests: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch active quests: {str(e)}"
+        )
+
+
 @router.get("/health")
 async def quest_health_check():
     """Health check endpoint for quest service"""
     return {
         "status": "healthy",
         "service": "quest",
+        "generation": gemini_service.quest_metrics,
         "timestamp": datetime.now().isoformat()
     }
@@ -1,22 +1,34 @@
+import logging
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
 from config.settings import settings
 from typing import List, Optional
+from services.conversation_service import conversation_service, estimate_tokens
+from services.metrics import upstream_timer
+from services.tracing import tracer
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Configure DeepSeek API (OpenAI compatible)
 DEEPSEEK_API_KEY = settings.DEEPSEEK_API_KEY if hasattr(settings, 'DEEPSEEK_API_KEY') else None
 DEEPSEEK_MODEL = "deepseek-chat"
 
-# Initialize OpenAI client with DeepSeek endpoint
-client = None
-if DEEPSEEK_API_KEY:
-    client = OpenAI(
-        api_key=DEEPSEEK_API_KEY,
-        base_url="https://api.deepseek.com"
-    )
+# OpenAI client with DeepSeek endpoint, created on first use (the SDK is slow to import)
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None and DEEPSEEK_API_KEY:
+        from openai import OpenAI
+        
+        _client = OpenAI(
+            api_key=DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL
+        )
+    return _client
 
 class Message(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -24,12 +36,14 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    history: Optional[List[Message]] = []
+    history: Optional[List[Message]] = []  # Only used to seed a new session
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     success: bool
     error: Optional[str] = None
+    session_id: Optional[str] = None
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_trainer(request: ChatRequest):
@@ -37,6 +51,7 @@ async def chat_with_trainer(request: ChatRequest):
     Chat with AI Pokémon Trainer using DeepSeek
     """
     try:
+        client = get_client()
         if not client or not DEEPSEEK_API_KEY:
             raise HTTPException(status_code=500, detail="DeepSeek API key not configured")
 
@@ -52,12 +67,27 @@ Use Pokémon terminology and occasionally mention specific Pokémon examples."""
             {"role": "system", "content": system_prompt}
         ]
         
-        # Add conversation history
-        for msg in request.history[-10:]:  # Keep last 10 messages for context
+        # Load server-side history, seeding new sessions from the request
+        session_id = request.session_id or conversation_service.new_session_id()
+        session = {"summary": "", "turns": []}
+        if request.session_id:
+            session = await conversation_service.load_session(session_id)
+        if not session["turns"] and not session["summary"]:
+            session["turns"] = conversation_service.normalize_turns(
+                [msg.dict() for msg in request.history or []]
+            )
+
+        # Add token-budgeted conversation history
+        summary, turns = conversation_service.window(
+            session,
+            reserve_tokens=estimate_tokens(request.message)
+        )
+        if summary:
             messages.append({
-                "role": msg.role,
-                "content": msg.content
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary}"
             })
+        messages.extend(turns)
         
         # Add current user message
         messages.append({
@@ -66,21 +96,26 @@ Use Pokémon terminology and occasionally mention specific Pokémon examples."""
         })
 
         # Call DeepSeek API
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=200
-        )
+        with upstream_timer("deepseek"), tracer.span("deepseek.chat.completions", kind="client", model=DEEPSEEK_MODEL):
+            response = client.chat.completions.create(
+                model=DEEPSEEK_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=200
+            )
+
+        reply = response.choices[0].message.content
+        await conversation_service.record_exchange(session_id, session, request.message, reply)
 
         return ChatResponse(
-            response=response.choices[0].message.content,
-            success=True
+            response=reply,
+            success=True,
+            session_id=session_id
         )
 
     except Exception as e:
         error_msg = str(e)
-        print(f"Error in trainer dialogue: {error_msg}")
+        logger.warning("Error in trainer dialogue", extra={"error": error_msg})
         
         # Handle specific error types
         if "429" in error_msg or "Resource exhausted" in error_msg:
@@ -0,0 +1,219 @@
+"""
+Auth Service - Wallet logins against Firebase Auth without blocking the event loop
+"""
+import asyncio
+import json
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+from services.redis_service import redis_service
+from services.metrics import CACHE_REQUESTS, upstream_timer
+from services.tracing import tracer, thread_timed
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_TOKEN_LIFETIME = 3600  # firebase_admin mints custom tokens valid for one hour
+
+
+class InvalidWalletTokenError(ValueError):
+    """Raised when a Firebase ID token is malformed, expired or not signed by Firebase"""
+
+
+class WalletAuthService:
+    """
+    Firebase user lookup and custom token minting for wallet logins
+
+    firebase_admin's auth calls are blocking HTTP requests, so they run on a
+    small dedicated thread pool. Wallets known to have a Firebase user are
+    cached in Redis for FIREBASE_UID_CACHE_TTL, so repeat logins skip
+    get_user; the TTL is kept short because a user deleted in Firebase
+    still reads as existing until it lapses. Custom tokens are
+    reused until FIREBASE_TOKEN_REFRESH_MARGIN before they expire.
+    Concurrent logins for the same wallet share one Firebase round trip.
+
+    firebase_admin is imported and initialized on first use rather than at
+    startup, which keeps it off the serverless cold-start path.
+    """
+
+    def __init__(self):
+        self.uid_ttl = settings.FIREBASE_UID_CACHE_TTL
+        self.token_ttl = CUSTOM_TOKEN_LIFETIME - settings.FIREBASE_TOKEN_REFRESH_MARGIN
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.FIREBASE_AUTH_MAX_WORKERS,
+            thread_name_prefix="firebase-auth"
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._firebase_auth = None
+        self._firebase_missing = False
+        self._init_lock = threading.Lock()
+
+    def _init_firebase(self) -> bool:
+        with self._init_lock:
+            if self._firebase_missing:
+                return False
+            if self._firebase_auth is None:
+                import firebase_admin
+                from firebase_admin import credentials, auth
+
+                if not firebase_admin._apps and settings.FIREBASE_AUTH_EMULATOR_HOST:
+                    # firebase_admin switches to the emulator (and unsigned tokens) on this variable
+                    os.environ["FIREBASE_AUTH_EMULATOR_HOST"] = settings.FIREBASE_AUTH_EMULATOR_HOST
+                    firebase_admin.initialize_app(options={"projectId": settings.FIREBASE_PROJECT_ID})
+                elif not firebase_admin._apps:
+                    if not os.path.exists(settings.FIREBASE_SERVICE_ACCOUNT_PATH):
+                        logger.warning("⚠️  Firebase service account key not found. Authentication will not work.")
+                        self._firebase_missing = True
+                        return False
+                    firebase_admin.initialize_app(credentials.Certificate(settings.FIREBASE_SERVICE_ACCOUNT_PATH))
+                self._firebase_auth = auth
+        return True
+
+    async def ensure_firebase(self) -> bool:
+        """Import and initialize firebase_admin if needed; False when it is not configured"""
+        if self._firebase_auth is not None:
+            return True
+        return await self._run(self._init_firebase)
+
+    async def _auth(self):
+        """firebase_admin.auth, initialized on the thread pool (never on the event loop) on first use"""
+        if not await self.ensure_firebase():
+            raise RuntimeError("Firebase authentication is not configured")
+        return self._firebase_auth
+
+    def _uid_key(self, wallet_address: str) -> str:
+        return f"auth:uid:{wallet_address}"
+
+    def _token_key(self, wallet_address: str) -> str:
+        return f"auth:token:{wallet_address}"
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        name = getattr(fn, "__name__", "call")
+        with upstream_timer("firebase"), tracer.span(f"firebase.{name}", kind="client") as span:
+            return await loop.run_in_executor(self._executor, thread_timed(span, partial(fn, *args, **kwargs)))
+
+    async def _coalesced(self, key: str, factory: Callable) -> Any:
+        """
+        Run factory() once for concurrent callers with the same key
+
+        If the caller running factory() is cancelled, the shared future is
+        cancelled too and the waiters start over rather than hang.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            CACHE_REQUESTS.inc(f"auth_{key.split(':', 1)[0]}", "coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self._coalesced(key, factory)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key, None)
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        if not redis_service.client:
+            return None
+        try:
+            return await redis_service.client.get(key)
+        except Exception as e:
+            logger.warning(f"Auth cache read failed: {e}")
+            return None
+
+    async def _cache_set(self, key: str, value: str, ttl: int):
+        if not redis_service.client:
+            return
+        try:
+            await redis_service.client.set(key, value, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Auth cache write failed: {e}")
+
+    async def _lookup_user(self, wallet_address: str) -> Optional[Dict[str, Any]]:
+        """The wallet's Firebase user as {uid, created_at}, or None if there is none"""
+        firebase_auth = await self._auth()
+        try:
+            user = await self._run(firebase_auth.get_user, wallet_address)
+        except firebase_auth.UserNotFoundError:
+            return None
+        return {"uid": user.uid, "created_at": user.user_metadata.creation_timestamp}
+
+    async def get_user(self, wallet_address: str) -> Optional[Dict[str, Any]]:
+        """Cached {uid, created_at} for a registered wallet, else None"""
+        cached = await self._cache_get(self._uid_key(wallet_address))
+        if cached:
+            CACHE_REQUESTS.inc("auth_user", "hit")
+            return json.loads(cached)
+        CACHE_REQUESTS.inc("auth_user", "miss")
+
+        user = await self._coalesced(f"user:{wallet_address}", lambda: self._lookup_user(wallet_address))
+        if user:
+            await self._cache_set(self._uid_key(wallet_address), json.dumps(user), self.uid_ttl)
+        return user
+
+    async def _ensure_user(self, wallet_address: str):
+        if await self.get_user(wallet_address):
+            return
+        firebase_auth = await self._auth()
+        try:
+            user = await self._run(firebase_auth.create_user, uid=wallet_address)
+        except firebase_auth.UidAlreadyExistsError:
+            # Created by a concurrent login on another worker; cached on its next lookup
+            return
+        record = {"uid": user.uid, "created_at": user.user_metadata.creation_timestamp}
+        await self._cache_set(self._uid_key(wallet_address), json.dumps(record), self.uid_ttl)
+
+    async def _mint_token(self, wallet_address: str) -> str:
+        await self._ensure_user(wallet_address)
+        firebase_auth = await self._auth()
+        token = await self._run(firebase_auth.create_custom_token, wallet_address)
+        token = token.decode("utf-8") if isinstance(token, bytes) else token
+        await self._cache_set(self._token_key(wallet_address), token, self.token_ttl)
+        return token
+
+    async def verify_id_token(self, id_token: str) -> str:
+        """
+        The wallet address a Firebase ID token was issued to
+
+        Clients exchange the custom token from login for an ID token, whose
+        UID is the wallet address. Raises InvalidWalletTokenError if the
+        token does not verify.
+        """
+        firebase_auth = await self._auth()
+        try:
+            claims = await self._run(firebase_auth.verify_id_token, id_token)
+        except (ValueError, firebase_auth.InvalidIdTokenError) as e:
+            raise InvalidWalletTokenError(f"Invalid ID token: {e}")
+        return claims["uid"]
+
+    async def login(self, wallet_address: str) -> str:
+        """A Firebase custom token for the wallet, creating its user on first login"""
+        cached = await self._cache_get(self._token_key(wallet_address))
+        if cached:
+            CACHE_REQUESTS.inc("auth_token", "hit")
+            return cached
+        CACHE_REQUESTS.inc("auth_token", "miss")
+        return await self._coalesced(f"token:{wallet_address}", lambda: self._mint_token(wallet_address))
+
+
+# Global instance
+wallet_auth_service = WalletAuthService()
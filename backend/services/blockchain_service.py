@@ -2,22 +2,41 @@
 Blockchain Service - Handles OneChain/Sui blockchain interactions
 Placeholder implementation until smart contracts are deployed
 """
+import logging
 from typing import List, Dict, Any
 
+from services.chain_indexer import chain_index_store
+from services.xp_ledger import xp_ledger
+
+logger = logging.getLogger(__name__)
+
 
 class BlockchainService:
     def __init__(self):
         # TODO: Initialize Sui client when pysui is installed
         self.client = None
-        print("⚠️  Blockchain service initialized (placeholder mode)")
+        logger.info("⚠️  Blockchain service initialized (placeholder mode)")
 
     async def get_player_nfts(self, address: str) -> List[Dict[str, Any]]:
         """
         Get all NFTs owned by a wallet address
+        
+        Reads the local chain index; NFTs escrowed in a marketplace listing
+        are included with listed=True. Pokémon with XP not yet settled on
+        chain show their off-chain ledger values with unsettled=True.
         """
-        # TODO: Implement actual blockchain query
-        # For now, return empty list
-        return []
+        nfts = await chain_index_store.get_owner_nfts(address)
+        ledger = await xp_ledger.get_states([nft["id"] for nft in nfts if nft["kind"] == "pokemon"])
+        for nft in nfts:
+            state = ledger.get(nft["id"])
+            if state and state["pending_xp"] > 0:
+                nft.update(
+                    level=state["level"],
+                    experience=state["experience"],
+                    stats=state["stats"],
+                    unsettled=True
+                )
+        return nfts
 
     async def prepare_mint_pokemon(
         self,
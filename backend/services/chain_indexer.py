@@ -0,0 +1,511 @@
+"""
+Chain Indexer - Follows the game package's transactions into a local SQLite index
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+from services.sui_rpc import SuiRpcClient, sui_rpc
+
+logger = logging.getLogger(__name__)
+
+NFT_TYPES = {
+    "::pokemon::Pokemon": "pokemon",
+    "::egg::Egg": "egg",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nfts (
+    object_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT,
+    listed INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    updated_digest TEXT,
+    updated_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS nfts_owner ON nfts (owner, kind);
+CREATE TABLE IF NOT EXISTS transactions (
+    digest TEXT PRIMARY KEY,
+    timestamp_ms INTEGER,
+    sender TEXT,
+    calls TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    cursor TEXT,
+    updated_at INTEGER
+);
+"""
+
+# Called inside the write transaction for every new event: handler(conn, event)
+EventHandler = Callable[[sqlite3.Connection, Dict[str, Any]], None]
+
+
+def nft_kind(object_type: Optional[str]) -> Optional[str]:
+    """'pokemon' / 'egg' for the package's NFT types (any package version), else None"""
+    for suffix, kind in NFT_TYPES.items():
+        if object_type and object_type.endswith(suffix):
+            return kind
+    return None
+
+
+def _move_value(value: Any) -> Any:
+    """Flatten Move JSON: u64 strings to int, nested structs to their fields"""
+    if isinstance(value, dict):
+        if "fields" in value:
+            return _move_value(value["fields"])
+        if set(value) == {"id"}:
+            return value["id"]
+        return {k: _move_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_move_value(v) for v in value]
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+def nft_from_object(response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    A sui_getObject response as {**fields, owner, kind, listed}, the shape of
+    ChainIndexStore.get_nft; None unless it is a live, address-owned NFT
+    """
+    data = response.get("data") or {}
+    kind = nft_kind(data.get("type"))
+    owner = data.get("owner")
+    if not kind or not data.get("content") or not isinstance(owner, dict) or "AddressOwner" not in owner:
+        return None
+    fields = _move_value(data["content"]["fields"])
+    return {**fields, "id": data["objectId"], "owner": owner["AddressOwner"], "kind": kind, "listed": False}
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn one raw record ({"tx": transaction block, "objects": {id: fields}})
+    into an indexer event
+
+    Returns {digest, timestamp_ms, sender, success, calls, changes, objects},
+    where success is whether the transaction executed (effects status),
+    calls are the package's Move calls with resolved arguments and changes
+    are the Pokémon/Egg object changes.
+    """
+    tx = record["tx"]
+    data = tx.get("transaction", {}).get("data", {})
+    programmable = data.get("transaction", {})
+    inputs = programmable.get("inputs", [])
+
+    def resolve(argument):
+        if isinstance(argument, dict) and "Input" in argument:
+            item = inputs[argument["Input"]]
+            return item.get("objectId") if item.get("type") == "object" else _move_value(item.get("value"))
+        return None
+
+    calls = []
+    for command in programmable.get("transactions", []):
+        move_call = command.get("MoveCall")
+        if move_call:
+            calls.append({
+                "package": move_call["package"],
+                "module": move_call["module"],
+                "function": move_call["function"],
+                "args": [resolve(a) for a in move_call.get("arguments", [])],
+            })
+
+    changes = []
+    for change in tx.get("objectChanges", []):
+        kind = nft_kind(change.get("objectType"))
+        if kind:
+            owner = change.get("owner")
+            changes.append({
+                "type": change["type"],
+                "object_id": change["objectId"],
+                "kind": kind,
+                "owner": owner.get("AddressOwner") if isinstance(owner, dict) else None,
+            })
+
+    return {
+        "digest": tx["digest"],
+        "timestamp_ms": int(tx.get("timestampMs") or 0),
+        "sender": data.get("sender"),
+        "success": tx.get("effects", {}).get("status", {}).get("status") == "success",
+        "calls": calls,
+        "changes": changes,
+        "objects": {k: _move_value(v) for k, v in record.get("objects", {}).items()},
+    }
+
+
+def apply_nft_changes(conn: sqlite3.Connection, event: Dict[str, Any]):
+    """Core handler: keep the nfts table in step with Pokémon/Egg object changes"""
+    for change in event["changes"]:
+        object_id = change["object_id"]
+        if change["type"] == "deleted":
+            conn.execute("DELETE FROM nfts WHERE object_id = ?", (object_id,))
+            continue
+
+        fields = event["objects"].get(object_id)
+        if change["type"] == "wrapped":
+            # Only the marketplace wraps NFTs: it is escrowed in a listing
+            conn.execute(
+                "UPDATE nfts SET listed = 1, updated_digest = ?, updated_at = ? WHERE object_id = ?",
+                (event["digest"], event["timestamp_ms"], object_id)
+            )
+            continue
+
+        existing = conn.execute("SELECT data FROM nfts WHERE object_id = ?", (object_id,)).fetchone()
+        data = json.loads(existing[0]) if existing else {"id": object_id}
+        if fields:
+            data.update(fields)
+        conn.execute(
+            """
+            INSERT INTO nfts (object_id, kind, owner, listed, data, updated_digest, updated_at)
+            VALUES (?, ?, ?, 0, ?, ?, ?)
+            ON CONFLICT (object_id) DO UPDATE SET
+                owner = COALESCE(excluded.owner, nfts.owner),
+                listed = 0,
+                data = excluded.data,
+                updated_digest = excluded.updated_digest,
+                updated_at = excluded.updated_at
+            """,
+            (object_id, change["kind"], change["owner"], json.dumps(data), event["digest"], event["timestamp_ms"])
+        )
+
+
+class ChainIndexStore:
+    """
+    SQLite (WAL) read model of the game's on-chain state
+
+    Events are applied exactly once: each transaction digest is recorded in
+    the same SQLite transaction as its effects and the advanced cursor.
+    Handlers only see transactions that executed successfully.
+    Extra read models (e.g. the marketplace index) register their schema
+    and an event handler that runs inside that transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schemas: List[str] = [SCHEMA]
+        self._handlers: List[EventHandler] = [apply_nft_changes]
+        self._initialized = False
+
+    def register(self, schema: str, handler: EventHandler):
+        """Add a read model; its schema is created on first use"""
+        self._schemas.append(schema)
+        self._handlers.append(handler)
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        if not self._initialized:
+            with self._write_lock:
+                for schema in self._schemas:
+                    conn.executescript(schema)
+                self._initialized = True
+        return conn
+
+    def apply_sync(self, events: List[Dict[str, Any]], cursor_name: Optional[str] = None, cursor: Optional[str] = None) -> int:
+        """Apply events (skipping ones already indexed) and advance the cursor atomically"""
+        conn = self._conn()
+        applied = 0
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for event in events:
+                    # A failed (aborted) transaction changes nothing: it is only recorded as
+                    # seen, without calls, so read models never apply or rebuild from it
+                    calls = event["calls"] if event["success"] else []
+                    inserted = conn.execute(
+                        "INSERT OR IGNORE INTO transactions (digest, timestamp_ms, sender, calls) VALUES (?, ?, ?, ?)",
+                        (event["digest"], event["timestamp_ms"], event["sender"], json.dumps(calls))
+                    ).rowcount
+                    if not inserted or not event["success"]:
+                        continue
+                    for handler in self._handlers:
+                        handler(conn, event)
+                    applied += 1
+                if cursor_name is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cursors (name, cursor, updated_at) VALUES (?, ?, ?)",
+                        (cursor_name, cursor, int(time.time()))
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return applied
+
+    async def apply(self, events: List[Dict[str, Any]], cursor_name: Optional[str] = None, cursor: Optional[str] = None) -> int:
+        return await asyncio.to_thread(self.apply_sync, events, cursor_name, cursor)
+
+    def query_sync(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return self._conn().execute(sql, params).fetchall()
+
+    async def query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self.query_sync, sql, params)
+
+    async def get_cursor(self, name: str) -> Optional[str]:
+        rows = await self.query("SELECT cursor FROM cursors WHERE name = ?", (name,))
+        return rows[0]["cursor"] if rows else None
+
+    def refresh_owners_sync(
+        self,
+        current: Dict[str, Any],
+        cursor_name: str,
+        cursor: str
+    ) -> int:
+        """
+        Write re-read owners ({id: (updated_digest when read, owner)}) and
+        advance the cursor; returns how many rows changed
+
+        Owner None means no longer held by an address. A row whose
+        updated_digest moved on in the meantime was just indexed from a newer
+        transaction and is left alone. Fields only change through package
+        calls, which the transaction follower already applies.
+        """
+        conn = self._conn()
+        now = int(time.time() * 1000)
+        changed = 0
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for object_id, (digest, owner) in current.items():
+                    changed += conn.execute(
+                        """
+                        UPDATE nfts SET owner = ?, updated_at = ?
+                        WHERE object_id = ? AND listed = 0 AND updated_digest IS ? AND owner IS NOT ?
+                        """,
+                        (owner, now, object_id, digest, owner)
+                    ).rowcount
+                conn.execute(
+                    "INSERT OR REPLACE INTO cursors (name, cursor, updated_at) VALUES (?, ?, ?)",
+                    (cursor_name, cursor, int(time.time()))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    async def refresh_owners(self, current: Dict[str, Any], cursor_name: str, cursor: str) -> int:
+        return await asyncio.to_thread(self.refresh_owners_sync, current, cursor_name, cursor)
+
+    async def get_nft(self, object_id: str) -> Optional[Dict[str, Any]]:
+        """One indexed Pokémon or Egg, with its actual owner (see get_owner_nfts)"""
+        rows = await self.query("SELECT kind, owner, listed, data FROM nfts WHERE object_id = ?", (object_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        return {**json.loads(row["data"]), "owner": row["owner"], "kind": row["kind"], "listed": bool(row["listed"])}
+
+    async def get_owner_nfts(self, owner: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Pokémon and Eggs owned (or listed for sale) by an address
+
+        The Move structs' own `owner` field is not updated on transfer, so
+        it is replaced with the object's actual owner.
+        """
+        sql = "SELECT kind, owner, listed, data FROM nfts WHERE owner = ?"
+        params: tuple = (owner,)
+        if kind:
+            sql += " AND kind = ?"
+            params += (kind,)
+        rows = await self.query(sql + " ORDER BY updated_at DESC", params)
+        return [
+            {**json.loads(row["data"]), "owner": row["owner"], "kind": row["kind"], "listed": bool(row["listed"])}
+            for row in rows
+        ]
+
+
+class ChainIndexer:
+    """
+    Polls the node for transactions that call the game package and feeds them to the store
+
+    The Move modules emit no events, so the indexer reads transaction blocks
+    (Move calls plus object changes) and fetches the current fields of every
+    Pokémon/Egg they touch, or their fields at the last version the page
+    changed if they have been wrapped since. Raw pages can be recorded to JSONL and replayed
+    later without a node.
+
+    Pokémon and Eggs have `store`, so wallets can transfer them without
+    calling the package; those transactions never match the filter. Each
+    poll therefore also re-reads the next CHAIN_INDEXER_OWNER_REFRESH_SIZE
+    indexed NFTs (see refresh_owners), so every owner is rechecked once per
+    (indexed NFTs / refresh size) polls.
+    """
+
+    def __init__(self, store: ChainIndexStore, rpc: SuiRpcClient, package_id: str):
+        self.store = store
+        self.rpc = rpc
+        self.package_id = package_id
+        self.cursor_name = f"package:{package_id}"
+        self.page_size = settings.CHAIN_INDEXER_PAGE_SIZE
+        self.poll_interval = settings.CHAIN_INDEXER_POLL_INTERVAL
+        self.owner_refresh_size = settings.CHAIN_INDEXER_OWNER_REFRESH_SIZE
+        self.owner_cursor_name = f"owners:{package_id}"
+        self.record_path: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch_records(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        object_ids = sorted({
+            change["objectId"]
+            for tx in transactions
+            for change in tx.get("objectChanges", [])
+            if nft_kind(change.get("objectType")) and change["type"] not in ("deleted", "wrapped")
+        })
+        objects = {}
+        for response in await self.rpc.multi_get_objects(object_ids):
+            data = response.get("data")
+            if data and data.get("content"):
+                objects[data["objectId"]] = _move_value(data["content"]["fields"])
+
+        # Listed (wrapped) or burnt since: read them as of their last change in this page
+        versions = {
+            change["objectId"]: change["version"]
+            for tx in transactions
+            for change in tx.get("objectChanges", [])
+            if change["type"] in ("created", "mutated") and change["objectId"] in object_ids
+        }
+        missing = [{"objectId": k, "version": v} for k, v in versions.items() if k not in objects]
+        for response in await self.rpc.try_multi_get_past_objects(missing) if missing else []:
+            data = response.get("details") if response.get("status") == "VersionFound" else None
+            if data and data.get("content"):
+                objects[data["objectId"]] = _move_value(data["content"]["fields"])
+
+        records = []
+        for tx in transactions:
+            touched = {c["objectId"] for c in tx.get("objectChanges", [])}
+            records.append({"tx": tx, "objects": {k: v for k, v in objects.items() if k in touched}})
+        return records
+
+    async def sync_once(self) -> int:
+        """Index every new transaction since the checkpoint; returns how many were applied"""
+        cursor = await self.store.get_cursor(self.cursor_name)
+        applied = 0
+        while True:
+            page = await self.rpc.query_transaction_blocks(
+                {
+                    "filter": {"MoveFunction": {"package": self.package_id, "module": None, "function": None}},
+                    "options": {"showInput": True, "showObjectChanges": True, "showEffects": True},
+                },
+                cursor,
+                self.page_size
+            )
+            records = await self._fetch_records(page.get("data", []))
+            if self.record_path and records:
+                with open(self.record_path, "a") as f:
+                    for record in records:
+                        f.write(json.dumps(record) + "\n")
+
+            cursor = page.get("nextCursor") or cursor
+            applied += await self.store.apply([normalize_record(r) for r in records], self.cursor_name, cursor)
+            if not page.get("hasNextPage"):
+                break
+
+        if applied:
+            logger.info(f"Indexed {applied} chain transactions")
+        return applied
+
+    async def refresh_owners(self) -> int:
+        """
+        Re-read the next owner_refresh_size indexed NFTs from the node
+
+        Walks the index in object ID order, wrapping around at the end, and
+        picks up owners changed by wallet transfers. Escrowed (listed) NFTs
+        are skipped: the marketplace calls keep those current. Returns how
+        many NFTs changed.
+        """
+        after = await self.store.get_cursor(self.owner_cursor_name) or ""
+        rows = await self.store.query(
+            "SELECT object_id, updated_digest FROM nfts WHERE listed = 0 AND object_id > ? ORDER BY object_id LIMIT ?",
+            (after, self.owner_refresh_size)
+        )
+        responses = await self.rpc.multi_get_objects([row["object_id"] for row in rows]) if rows else []
+        current = {
+            row["object_id"]: (row["updated_digest"], (nft_from_object(response) or {}).get("owner"))
+            for row, response in zip(rows, responses)
+        }
+        cursor = rows[-1]["object_id"] if len(rows) == self.owner_refresh_size else ""
+        changed = await self.store.refresh_owners(current, self.owner_cursor_name, cursor)
+        if changed:
+            logger.info(f"Refreshed {changed} NFT owners")
+        return changed
+
+    async def replay(self, path: str, batch_size: int = 500) -> int:
+        """Apply recorded records from a JSONL fixture; already indexed ones are skipped"""
+        applied = 0
+        batch = []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    batch.append(normalize_record(json.loads(line)))
+                if len(batch) >= batch_size:
+                    applied += await self.store.apply(batch)
+                    batch = []
+        if batch:
+            applied += await self.store.apply(batch)
+        return applied
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.sync_once()
+                if self.owner_refresh_size > 0:
+                    await self.refresh_owners()
+            except Exception as e:
+                logger.warning(f"Chain indexer sync failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start following the chain"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        """Stop following the chain"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instances
+chain_index_store = ChainIndexStore(settings.CHAIN_INDEX_DB_PATH)
+chain_indexer = ChainIndexer(chain_index_store, sui_rpc, settings.ONECHAIN_PACKAGE_ID)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync or replay the local chain index")
+    parser.add_argument("--replay", help="JSONL fixture of recorded records to apply")
+    parser.add_argument("--record", help="Append fetched records to this JSONL file while syncing")
+    args = parser.parse_args()
+
+    from services.log_pipeline import log_pipeline
+
+    log_pipeline.setup(queued=False)
+
+    async def main():
+        if args.replay:
+            print(f"Replayed {await chain_indexer.replay(args.replay)} transactions")
+        else:
+            chain_indexer.record_path = args.record
+            print(f"Indexed {await chain_indexer.sync_once()} transactions")
+        await sui_rpc.close()
+
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+"""
+Conversation Service - Server-side chat sessions with token-budgeted history
+"""
+import re
+import time
+import uuid
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import settings
+from services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+# Client payloads use either player/trainer or user/assistant roles
+ROLE_ALIASES = {
+    "player": "user",
+    "user": "user",
+    "trainer": "assistant",
+    "assistant": "assistant",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+class ConversationService:
+    """Stores chat sessions by ID and keeps prompt history within a token budget"""
+
+    def __init__(self):
+        self.token_budget = settings.CONVERSATION_TOKEN_BUDGET
+        self.summary_token_budget = settings.CONVERSATION_SUMMARY_TOKEN_BUDGET
+        self.session_ttl = settings.CONVERSATION_SESSION_TTL
+        # Fallback store when Redis is unavailable: session_id -> (expires_at, session)
+        self._local_sessions: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._max_local_sessions = 1000
+
+    def new_session_id(self) -> str:
+        return str(uuid.uuid4())
+
+    def normalize_turns(self, history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Convert client history into {"role": "user"|"assistant", "content": "..."} turns
+
+        Accepts both the dialogue format ({"role": "player", "message": ...})
+        and the chat format ({"role": "user", "content": ...}).
+        """
+        turns = []
+        for msg in history or []:
+            content = msg.get("content") or msg.get("message") or ""
+            role = ROLE_ALIASES.get(msg.get("role", ""), "user")
+            if content:
+                turns.append({"role": role, "content": content})
+        return turns
+
+    async def load_session(self, session_id: str) -> Dict[str, Any]:
+        """
+        Load a session's summary and verbatim turns
+
+        Returns an empty session if the ID is unknown or expired.
+        """
+        key = f"conversation:{session_id}"
+        try:
+            session = await redis_service.get(key)
+            if isinstance(session, dict):
+                return session
+        except Exception as e:
+            logger.warning(f"Conversation read failed for {session_id}: {e}")
+
+        entry = self._local_sessions.get(session_id)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return {"summary": "", "turns": []}
+
+    async def save_session(self, session_id: str, session: Dict[str, Any]):
+        """Persist a session, preferring Redis and falling back to process memory"""
+        key = f"conversation:{session_id}"
+        if redis_service.client:
+            try:
+                await redis_service.set(key, session, ttl=self.session_ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Conversation write failed for {session_id}: {e}")
+
+        if len(self._local_sessions) >= self._max_local_sessions:
+            # Drop the session closest to expiry
+            oldest = min(self._local_sessions, key=lambda sid: self._local_sessions[sid][0])
+            self._local_sessions.pop(oldest, None)
+        self._local_sessions[session_id] = (time.time() + self.session_ttl, session)
+
+    async def record_exchange(
+        self,
+        session_id: str,
+        session: Dict[str, Any],
+        user_message: str,
+        assistant_message: str
+    ) -> Dict[str, Any]:
+        """
+        Append one user/assistant exchange, compact the session and save it
+        """
+        turns = session.get("turns", []) + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message},
+        ]
+        turns, summary = self.compact(turns, session.get("summary", ""))
+        session = {"summary": summary, "turns": turns}
+        await self.save_session(session_id, session)
+        return session
+
+    def compact(
+        self,
+        turns: List[Dict[str, str]],
+        summary: str = "",
+        budget: Optional[int] = None
+    ) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Keep the newest turns that fit the token budget and roll the rest into the summary
+
+        Args:
+            turns: Conversation turns, oldest first
+            summary: Existing rolling summary of earlier turns
+            budget: Token budget for verbatim turns (defaults to CONVERSATION_TOKEN_BUDGET)
+
+        Returns:
+            (kept turns, updated summary)
+        """
+        if budget is None:
+            budget = self.token_budget
+
+        kept: List[Dict[str, str]] = []
+        used = 0
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn["content"])
+            if used + cost > budget:
+                break
+            kept.append(turn)
+            used += cost
+        kept.reverse()
+
+        rolled = turns[:len(turns) - len(kept)]
+        if rolled:
+            summary = self._extend_summary(summary, rolled)
+        return kept, summary
+
+    def window(
+        self,
+        session: Dict[str, Any],
+        reserve_tokens: int = 0
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Get (summary, turns) for a prompt, leaving room for the incoming message
+
+        The stored session is not modified; turns that do not fit are
+        folded into the returned summary only.
+        """
+        budget = max(0, self.token_budget - reserve_tokens)
+        turns, summary = self.compact(session.get("turns", []), session.get("summary", ""), budget)
+        return summary, turns
+
+    def _extend_summary(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        """Append short digests of rolled-off turns, dropping the oldest lines past the cap"""
+        lines = [line for line in summary.split("\n") if line]
+        for turn in turns:
+            speaker = "Player" if turn["role"] == "user" else "Trainer"
+            lines.append(f"{speaker}: {self._digest(turn['content'])}")
+
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            cost = estimate_tokens(line)
+            if used + cost > self.summary_token_budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+        return "\n".join(kept)
+
+    def _digest(self, text: str, max_words: int = 20) -> str:
+        """First sentence of a message, capped at max_words"""
+        first_sentence = re.split(r"(?<=[.!?])\s+", text.strip(), maxsplit=1)[0]
+        words = first_sentence.split()
+        if len(words) > max_words:
+            return " ".join(words[:max_words]) + "..."
+        return first_sentence
+
+
+# Global instance
+conversation_service = ConversationService()
@@ -0,0 +1,162 @@
+"""
+Daily Challenge Scheduler - Precomputes each active player's daily challenges at UTC rollover
+"""
+import asyncio
+import time
+import logging
+from datetime import datetime, timedelta, timezone, date
+from typing import List, Dict, Any, Optional
+
+from config import settings
+from services.redis_service import redis_service
+from services.quest_service import quest_service
+from services.quest_store import quest_store
+
+logger = logging.getLogger(__name__)
+
+
+class DailyChallengeScheduler:
+    """
+    Keeps daily challenges ready in the quest store
+
+    Players are tracked in a sorted set by last activity, with their latest
+    level in a hash; both drop players once they have been inactive for
+    DAILY_CHALLENGE_ACTIVE_DAYS. After each UTC midnight one worker (guarded by a Redis
+    lock) writes the new day's deterministic challenges for every player
+    active in the last DAILY_CHALLENGE_ACTIVE_DAYS days.
+    """
+
+    def __init__(self):
+        self.active_key = "players:active"
+        self.level_key = "players:level"
+        self.active_window = settings.DAILY_CHALLENGE_ACTIVE_DAYS * 86400
+        self.page_size = 500
+        self._task: Optional[asyncio.Task] = None
+
+    async def record_active(self, player_id: str, player_level: int):
+        """Remember a player for tomorrow's precompute batch"""
+        client = redis_service.client
+        if not client:
+            return
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zadd(self.active_key, {player_id: time.time()})
+            pipe.hset(self.level_key, player_id, player_level)
+            await pipe.execute()
+
+    async def get_challenges(self, player_id: str, player_level: int) -> List[Dict[str, Any]]:
+        """
+        Today's challenges for a player, with stored progress
+
+        The stored set is kept until it expires at the UTC rollover; only
+        the day's first request (when precompute has not written it) uses
+        player_level to generate and store it. A later level, which comes
+        from the client, neither rerolls the set nor resets its progress.
+        """
+        stored = await quest_store.get_daily_challenges(player_id)
+        if stored:
+            return stored
+
+        challenges = await quest_service.generate_daily_challenges(player_level, player_id)
+        await quest_store.set_daily_challenges(player_id, challenges, self._next_rollover())
+        return [c.model_dump(mode="json") for c in challenges]
+
+    async def prune_inactive(self, cutoff: float) -> int:
+        """Forget players last active before cutoff, in the active set and the level hash"""
+        client = redis_service.client
+        removed = 0
+        while True:
+            players = await client.zrangebyscore(self.active_key, "-inf", cutoff, start=0, num=self.page_size)
+            if not players:
+                break
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zrem(self.active_key, *players)
+                pipe.hdel(self.level_key, *players)
+                await pipe.execute()
+            removed += len(players)
+        return removed
+
+    async def precompute(self, day: Optional[date] = None) -> int:
+        """
+        Write the day's challenges for all recently active players
+
+        Returns the number of players whose challenges were written.
+        """
+        client = redis_service.client
+        if not client:
+            return 0
+
+        day = day or datetime.now(timezone.utc).date()
+        cutoff = time.time() - self.active_window
+        await self.prune_inactive(cutoff)
+
+        expires_at = self._next_rollover(day)
+        written = 0
+        offset = 0
+        while True:
+            players = await client.zrangebyscore(
+                self.active_key, cutoff, "+inf", start=offset, num=self.page_size
+            )
+            if not players:
+                break
+            offset += len(players)
+
+            levels = await client.hmget(self.level_key, players)
+            results = await asyncio.gather(*[
+                self._precompute_player(player_id, int(level or 1), day, expires_at)
+                for player_id, level in zip(players, levels)
+            ])
+            written += sum(results)
+
+        logger.info(f"Precomputed daily challenges for {written} players ({day.isoformat()})")
+        return written
+
+    async def _precompute_player(
+        self,
+        player_id: str,
+        player_level: int,
+        day: date,
+        expires_at: datetime
+    ) -> bool:
+        # A set already stored is today's (it expires at the rollover) and may have progress
+        if await quest_store.get_daily_challenge_ids(player_id):
+            return False
+        challenges = await quest_service.generate_daily_challenges(player_level, player_id, day)
+        await quest_store.set_daily_challenges(player_id, challenges, expires_at)
+        return True
+
+    def _next_rollover(self, day: Optional[date] = None) -> datetime:
+        day = day or datetime.now(timezone.utc).date()
+        return datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1)
+
+    async def _run(self):
+        while True:
+            try:
+                day = datetime.now(timezone.utc).date()
+                # Only one worker builds each day's batch
+                lock_key = f"daily_challenges:precomputed:{day.isoformat()}"
+                if await redis_service.client.set(lock_key, "1", nx=True, ex=2 * 86400):
+                    await self.precompute(day)
+            except Exception as e:
+                logger.error(f"Daily challenge precompute failed: {e}")
+
+            wait = (self._next_rollover() - datetime.now(timezone.utc)).total_seconds()
+            await asyncio.sleep(max(1.0, wait + 5))
+
+    def start(self):
+        """Start the rollover precompute loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the rollover precompute loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+daily_challenge_scheduler = DailyChallengeScheduler()
@@ -0,0 +1,179 @@
+"""
+Egg Incubation Service - Counts incubation steps off-chain and settles them in batches
+"""
+import time
+import logging
+from typing import List, Dict, Any, Optional
+
+from redis.exceptions import WatchError
+
+from config import settings
+from services.chain_indexer import chain_index_store
+from services.settlement_batches import SettlementBatcher
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_STEPS = 10  # egg.move REQUIRED_INCUBATION_STEPS
+STEPS_PER_BATTLE_WIN = 1  # egg.move STEPS_PER_BATTLE_WIN
+CHAIN_FIELDS = ("incubation_steps",)
+
+
+class EggIncubationService(SettlementBatcher):
+    """
+    Off-chain incubation progress per Egg NFT
+
+    Steps from battles are counted in Redis instead of one add_battle_steps
+    transaction per egg per battle. Pending steps are settled as batched
+    egg::increment_incubation calls on the settlement schedule, or right
+    away once an egg is within EGG_INCUBATION_FLUSH_THRESHOLD steps of
+    hatching so the player is not kept waiting to hatch it.
+    """
+
+    kind = "incubation"
+    prefix = "egg_incubation"
+
+    def __init__(self):
+        super().__init__(
+            settings.EGG_INCUBATION_FLUSH_INTERVAL,
+            settings.EGG_INCUBATION_BATCH_TTL,
+            settings.EGG_INCUBATION_MAX_CALLS
+        )
+        self.flush_threshold = settings.EGG_INCUBATION_FLUSH_THRESHOLD
+        self.state_ttl = 30 * 86400
+
+    def _egg_key(self, egg_id: str) -> str:
+        return f"egg_incubation:egg:{egg_id}"
+
+    def _initial_state(self, egg: Dict[str, Any]) -> Dict[str, Any]:
+        """Tracking state for an egg seen for the first time, from its chain state"""
+        return {
+            "owner": egg["owner"],
+            "chain_steps": egg["incubation_steps"],
+            "required_steps": egg.get("required_steps", REQUIRED_STEPS),
+            "pending_steps": 0,
+            "tracked_steps": 0,
+            "tracking_since": int(time.time()),
+        }
+
+    async def load_egg(self, egg_id: str, owner: str) -> Dict[str, Any]:
+        """
+        The Egg NFT owner holds, from the chain index (or the node)
+
+        Raises UnknownNftError if the egg is not on chain and NftOwnershipError
+        if owner does not hold it.
+        """
+        return await self.load_owned_nft(egg_id, "egg", owner, CHAIN_FIELDS)
+
+    async def add_steps(
+        self,
+        egg_id: str,
+        owner: str,
+        steps: int = STEPS_PER_BATTLE_WIN,
+        egg: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Count incubation steps for an egg owned by owner
+
+        Checks ownership with load_egg unless egg (its result) is passed.
+        Steps beyond required_steps are dropped, as on chain. Returns the
+        egg's progress; settles immediately when the egg is close to hatching.
+        """
+        if egg is None:
+            egg = await self.load_egg(egg_id, owner)
+        client = self._client()
+        key = self._egg_key(egg_id)
+        if not await client.exists(key):
+            initial = self._initial_state(egg)
+            async with client.pipeline(transaction=True) as pipe:
+                for field, value in initial.items():
+                    pipe.hsetnx(key, field, value)
+                await pipe.execute()
+
+        while True:
+            async with client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    state = await pipe.hgetall(key)
+                    chain_steps = int(state["chain_steps"])
+                    pending = int(state["pending_steps"])
+                    room = max(0, int(state["required_steps"]) - chain_steps - pending)
+                    added = min(steps, room)
+
+                    pipe.multi()
+                    pipe.hset(key, "owner", owner)
+                    if added:
+                        pipe.hincrby(key, "pending_steps", added)
+                        pipe.hincrby(key, "tracked_steps", added)
+                        self.mark_dirty(pipe, owner, egg_id)
+                    pipe.expire(key, self.state_ttl)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        state.update(owner=owner, pending_steps=pending + added, tracked_steps=int(state["tracked_steps"]) + added)
+        progress = self._progress(egg_id, state)
+        if added and progress["steps"] >= progress["required_steps"] - self.flush_threshold:
+            await self.settle_owner(owner)
+        return progress
+
+    def _progress(self, egg_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        chain_steps = int(state["chain_steps"])
+        required = int(state["required_steps"])
+        steps = min(required, chain_steps + int(state["pending_steps"]))
+        remaining = required - steps
+
+        # Predict hatch time from the egg's own step rate since tracking began
+        elapsed = time.time() - int(state["tracking_since"])
+        rate = int(state["tracked_steps"]) / elapsed if elapsed > 0 else 0
+        if remaining == 0:
+            eta = 0
+        else:
+            eta = round(remaining / rate) if rate else None
+        return {
+            "egg_id": egg_id,
+            "owner": state.get("owner"),
+            "steps": steps,
+            "required_steps": required,
+            "chain_steps": chain_steps,
+            "pending_steps": int(state["pending_steps"]),
+            "remaining_steps": remaining,
+            "ready_to_hatch": remaining == 0,
+            "hatchable_on_chain": chain_steps >= required,
+            "estimated_seconds_to_ready": eta,
+        }
+
+    async def get_progress(self, egg_id: str) -> Optional[Dict[str, Any]]:
+        """An egg's incubation progress (off-chain tracking, else the indexed chain state)"""
+        client = self._client()
+        state = await client.hgetall(self._egg_key(egg_id))
+        if state:
+            return self._progress(egg_id, state)
+        egg = await chain_index_store.get_nft(egg_id)
+        if egg is None or egg["kind"] != "egg" or "incubation_steps" not in egg:
+            return None
+        return self._progress(egg_id, self._initial_state(egg))
+
+    async def build_calls(self, owner: str, object_ids: List[str]):
+        """One egg::increment_incubation call per egg with pending steps"""
+        client = self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            for egg_id in object_ids:
+                pipe.hget(self._egg_key(egg_id), "pending_steps")
+            pending = await pipe.execute()
+
+        target = f"{settings.ONECHAIN_PACKAGE_ID}::egg::increment_incubation"
+        steps = {egg_id: int(p) for egg_id, p in zip(object_ids, pending) if p and int(p) > 0}
+        calls = [{"target": target, "arguments": [egg_id, count]} for egg_id, count in steps.items()]
+        return calls, steps
+
+    async def on_confirmed(self, batch: Dict[str, Any]):
+        async with self._client().pipeline(transaction=False) as pipe:
+            for egg_id, steps in batch["pending"].items():
+                pipe.hincrby(self._egg_key(egg_id), "pending_steps", -steps)
+                pipe.hincrby(self._egg_key(egg_id), "chain_steps", steps)
+            await pipe.execute()
+
+
+# Global instance
+egg_incubation_service = EggIncubationService()
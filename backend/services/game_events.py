@@ -0,0 +1,64 @@
+"""
+Game Events Service - Publishes battle and capture outcomes to a Redis Stream
+"""
+import time
+import logging
+from typing import Any, Dict
+
+from config import settings
+from models.quest import ObjectiveType
+from services.redis_service import redis_service
+
+logger = logging.getLogger(__name__)
+
+
+class GameEventService:
+    """
+    Appends gameplay outcome events to a capped Redis Stream
+
+    Each downstream subsystem (quest progress, ...) reads the stream through
+    its own consumer group, so publishers never wait on them.
+    """
+
+    def __init__(self):
+        self.stream_key = "events:gameplay"
+        self.maxlen = settings.GAME_EVENTS_STREAM_MAXLEN
+
+    async def publish(
+        self,
+        player_id: str,
+        action: ObjectiveType,
+        increment: int = 1,
+        **details: Any
+    ):
+        """
+        Publish an outcome event; failures are logged and never raised
+
+        Args:
+            player_id: Player the outcome belongs to
+            action: Quest objective type the outcome counts towards
+            increment: Progress amount
+            details: Extra context (levels, XP, species...) for consumers
+        """
+        client = redis_service.client
+        if not client:
+            return
+
+        fields: Dict[str, Any] = {
+            "player_id": player_id,
+            "action": action.value,
+            "increment": increment,
+            "ts": int(time.time() * 1000),
+        }
+        for name, value in details.items():
+            if value is not None:
+                fields[name] = value if isinstance(value, (str, int, float)) else str(value)
+
+        try:
+            await client.xadd(self.stream_key, fields, maxlen=self.maxlen, approximate=True)
+        except Exception as e:
+            logger.warning(f"Failed to publish {action.value} event for {player_id}: {e}")
+
+
+# Global instance
+game_event_service = GameEventService()
@@ -1,44 +1,68 @@
 """
 Gemini AI Service - Handles AI-powered text generation with rate limiting and error handling
 """
-import google.generativeai as genai
 from config import settings
-from typing import List, Dict, Any, Optional
+from services.micro_batcher import MicroBatcher
+from services.metrics import AI_FALLBACKS, RATE_LIMITER_WAIT, RATE_LIMITER_WAITING, upstream_timer
+from services.tracing import tracer, thread_timed
+from services.log_pipeline import sampled
+from models.quest import QuestDraft
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional, Type
 import asyncio
 import time
 import json
 import logging
 from functools import wraps
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class RateLimiter:
     """Simple rate limiter for API calls"""
-    def __init__(self, max_calls: int = 60, time_window: int = 60):
+    def __init__(self, max_calls: int = 60, time_window: int = 60, name: str = "gemini"):
         self.max_calls = max_calls
         self.time_window = time_window
+        self.name = name
         self.calls = []
     
     async def acquire(self):
         """Wait if rate limit is exceeded"""
-        now = time.time()
-        # Remove old calls outside the time window
-        self.calls = [call_time for call_time in self.calls if now - call_time < self.time_window]
-        
-        if len(self.calls) >= self.max_calls:
-            # Calculate wait time
-            oldest_call = min(self.calls)
-            wait_time = self.time_window - (now - oldest_call)
-            if wait_time > 0:
-                logger.warning(f"Rate limit reached. Waiting {wait_time:.2f} seconds...")
+        started = time.perf_counter()
+        started_ns = time.time_ns()
+        waiting = False
+        try:
+            while True:
+                now = time.time()
+                # Remove old calls outside the time window
+                self.calls = [call_time for call_time in self.calls if now - call_time < self.time_window]
+                if len(self.calls) < self.max_calls:
+                    break
+                
+                # Calculate wait time
+                oldest_call = min(self.calls)
+                wait_time = self.time_window - (now - oldest_call)
+                if wait_time <= 0:
+                    break
+                if not waiting:
+                    waiting = True
+                    RATE_LIMITER_WAITING.inc(self.name)
+                logger.info("Rate limit reached, waiting", extra=sampled(limiter=self.name, wait_seconds=round(wait_time, 2)))
                 await asyncio.sleep(wait_time)
-                return await self.acquire()
+        finally:
+            if waiting:
+                RATE_LIMITER_WAITING.dec(self.name)
+                tracer.record("rate_limiter.wait", started_ns, limiter=self.name)
+            RATE_LIMITER_WAIT.observe(time.perf_counter() - started, self.name)
         
         self.calls.append(now)
 
+    def available(self) -> int:
+        """Number of calls that can be made right now without waiting"""
+        now = time.time()
+        recent = sum(1 for call_time in self.calls if now - call_time < self.time_window)
+        return max(0, self.max_calls - recent)
+
 
 def handle_gemini_errors(fallback_text: str = ""):
     """Decorator for handling Gemini API errors with fallback"""
@@ -49,6 +73,7 @@ def handle_gemini_errors(fallback_text: str = ""):
                 return await func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Gemini API error in {func.__name__}: {str(e)}")
+                AI_FALLBACKS.inc(func.__name__)
                 # Return fallback text or generate simple fallback
                 if fallback_text:
                     return fallback_text
@@ -74,23 +99,103 @@ async def generate_fallback(func_name: str, args: tuple, kwargs: dict) -> str:
     return "Something exciting happened!"
 
 
+def response_schema_for(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Convert a Pydantic model's JSON schema into the subset Gemini's response_schema accepts
+
+    Enum refs are inlined, Optional fields become nullable and validation-only
+    keywords (min/max, lengths) are dropped; the model itself still enforces them.
+    """
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            node = defs[node["$ref"].split("/")[-1]]
+        if "anyOf" in node:
+            options = [option for option in node["anyOf"] if option.get("type") != "null"]
+            converted = convert(options[0])
+            converted["nullable"] = True
+            return converted
+
+        converted = {k: v for k, v in node.items() if k in ("type", "format", "description", "enum")}
+        if "items" in node:
+            converted["items"] = convert(node["items"])
+        if "properties" in node:
+            converted["properties"] = {name: convert(prop) for name, prop in node["properties"].items()}
+            converted["required"] = node.get("required", [])
+        return converted
+
+    return convert(schema)
+
+
+QUEST_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": response_schema_for(QuestDraft),
+}
+
+FALLBACK_QUEST = {
+    "title": "Training Challenge",
+    "description": "Battle and train your Pokémon to become stronger! Prove your skills as a trainer.",
+    "objective_type": "battle",
+    "objective_target": 3,
+    "reward_type": "tokens",
+    "reward_amount": 300
+}
+
+
 class GeminiService:
     def __init__(self):
-        # Configure Gemini API
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(
-            settings.GEMINI_MODEL,
-            generation_config={
-                "temperature": 0.9,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 200,
-            }
+        # The SDK takes ~0.5s to import: the model is created on first use
+        self._model = None
+        # Rate limiter: GEMINI_RATE_LIMIT_PER_MINUTE requests per minute
+        self.rate_limiter = RateLimiter(max_calls=settings.GEMINI_RATE_LIMIT_PER_MINUTE, time_window=60)
+        # Quest generation outcomes, to see how much quota goes to unusable output
+        self.quest_metrics = {
+            "requested": 0,
+            "valid": 0,
+            "repaired": 0,
+            "parse_failures": 0,
+            "api_errors": 0,
+        }
+        # Encounter/hatching texts requested close together share one call
+        self.narrative_batcher = MicroBatcher(
+            self._generate_narrative_batch,
+            max_items=settings.GEMINI_BATCH_MAX_ITEMS,
+            max_wait=settings.GEMINI_BATCH_WINDOW_MS / 1000
         )
-        # Rate limiter: 60 requests per minute
-        self.rate_limiter = RateLimiter(max_calls=60, time_window=60)
         logger.info(f"✅ Gemini Service initialized with model: {settings.GEMINI_MODEL}")
 
+    @property
+    def model(self):
+        """The Gemini GenerativeModel, importing and configuring the SDK on first access"""
+        if self._model is None:
+            import google.generativeai as genai
+
+            if settings.GEMINI_API_ENDPOINT:
+                genai.configure(
+                    api_key=settings.GEMINI_API_KEY,
+                    transport="rest",
+                    client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT}
+                )
+            else:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+            self._model = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                generation_config={
+                    "temperature": 0.9,
+                    "top_p": 0.95,
+                    "top_k": 40,
+                    "max_output_tokens": 200,
+                }
+            )
+        return self._model
+
+    async def _generate(self, *args, **kwargs):
+        """model.generate_content in a worker thread, timed and traced as a Gemini upstream call"""
+        with upstream_timer("gemini"), tracer.span("gemini.generate_content", kind="client") as span:
+            return await asyncio.to_thread(thread_timed(span, self.model.generate_content), *args, **kwargs)
+
     @handle_gemini_errors()
     async def generate_encounter_text(
         self,
@@ -101,8 +206,6 @@ class GeminiService:
         """
         Generate encounter description text with AI
         """
-        await self.rate_limiter.acquire()
-        
         prompt = f"""You are a Pokémon game narrator. Generate an exciting encounter description.
 
 Pokémon: {pokemon_name}
@@ -114,10 +217,15 @@ Focus on the Pokémon's appearance, behavior, or the environment.
 
 Example: "A wild Pikachu appeared! The electric mouse Pokémon crackles with energy, its cheeks sparking with electricity!"
 """
+        task = (
+            f"Encounter with a wild {pokemon_name} (Types: {', '.join(pokemon_types)}, Level: {pokemon_level}). "
+            "Write exactly 2 exciting, immersive sentences about the Pokémon's appearance, behavior, or the environment."
+        )
         
-        response = await asyncio.to_thread(self.model.generate_content, prompt)
-        text = response.text.strip()
-        logger.info(f"Generated encounter text for {pokemon_name}")
+        text = await self.narrative_batcher.submit({"prompt": prompt, "task": task})
+        if not text:
+            return f"A wild {pokemon_name} appeared!"
+        logger.info("Generated encounter text", extra=sampled(pokemon=pokemon_name))
         return text
 
     @handle_gemini_errors()
@@ -159,9 +267,9 @@ Examples:
 - "The attack barely scratches the opponent's defenses!"
 """
         
-        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        response = await self._generate(prompt)
         text = response.text.strip()
-        logger.info(f"Generated battle commentary: {attacker} vs {defender}")
+        logger.info("Generated battle commentary", extra=sampled(attacker=attacker, defender=defender))
         return text
 
     async def generate_commentary(self, prompt: str) -> str:
@@ -177,9 +285,9 @@ Generate exactly 1 sentence of exciting, dynamic commentary.
 Be creative and vary your style.
 """
             
-            response = await asyncio.to_thread(self.model.generate_content, full_prompt)
+            response = await self._generate(full_prompt)
             text = response.text.strip()
-            logger.info(f"Generated commentary from prompt")
+            logger.info("Generated commentary from prompt", extra=sampled())
             return text
         except Exception as e:
             logger.error(f"Error generating commentary: {str(e)}")
@@ -222,13 +330,13 @@ Select the best move considering:
 Respond with ONLY the move name, nothing else.
 """
             
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            response = await self._generate(prompt)
             selected_move_name = response.text.strip().strip('"\'').strip('.')
             
             # Find the move in available moves
             for move in available_moves:
                 if move['name'].lower() == selected_move_name.lower():
-                    logger.info(f"AI selected move: {move['name']}")
+                    logger.info("AI selected move", extra=sampled(move=move["name"]))
                     reasoning = f"Selected {move['name']} for strategic advantage"
                     return move, reasoning
             
@@ -282,23 +390,23 @@ Respond with ONLY the move name, nothing else.
         
         return best_move
 
-    @handle_gemini_errors()
     async def generate_quest(
         self,
         player_team: List[Dict[str, Any]],
         player_level: int
-    ) -> Dict[str, Any]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Generate personalized quest based on player's team and progress
+
+        Uses schema-constrained JSON output validated against QuestDraft, with
+        a single repair retry. Returns None if no valid quest could be produced.
         """
-        await self.rate_limiter.acquire()
-        
         team_summary = f"{len(player_team)} Pokémon"
         if player_team:
             team_types = set()
             for pokemon in player_team:
                 team_types.update(pokemon.get('types', []))
-            team_summary += f" (Types: {', '.join(team_types)})"
+            team_summary += f" (Types: {', '.join(sorted(team_types))})"
         
         prompt = f"""Generate a personalized Pokémon quest for a player.
 
@@ -306,49 +414,63 @@ Player Level: {player_level}
 Team: {team_summary}
 
 Create an engaging quest with:
-1. Title: Short, exciting (max 5 words)
-2. Description: 2-3 sentences explaining the quest story
-3. Objective Type: Choose ONE from [battle, capture, hatch, trade]
-4. Objective Target: A number between 1-5
-5. Reward Type: Choose ONE from [tokens, pokemon, egg]
-6. Reward Amount: If tokens, amount between 100-1000. If pokemon, a pokemon_id (1-151). If egg, set to null.
-
-Respond in this EXACT JSON format:
-{{
-  "title": "Quest Title Here",
-  "description": "Quest description here.",
-  "objective_type": "battle",
-  "objective_target": 3,
-  "reward_type": "tokens",
-  "reward_amount": 500
-}}
+1. title: Short, exciting (max 5 words)
+2. description: 2-3 sentences explaining the quest story
+3. objective_type: Choose ONE from [battle, capture, hatch, trade]
+4. objective_target: A number between 1-5
+5. reward_type: Choose ONE from [tokens, pokemon, egg]
+6. reward_amount: If tokens, amount between 100-1000. If pokemon, a pokemon_id (1-151). If egg, set to null.
 """
-        
-        response = await asyncio.to_thread(self.model.generate_content, prompt)
-        text = response.text.strip()
-        
-        # Extract JSON from response
+        self.quest_metrics["requested"] += 1
         try:
-            # Remove markdown code blocks if present
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0].strip()
-            
-            quest_data = json.loads(text)
-            logger.info(f"Generated quest: {quest_data.get('title')}")
-            return quest_data
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse quest JSON: {str(e)}")
-            # Return fallback quest
-            return {
-                "title": "Training Challenge",
-                "description": "Battle and train your Pokémon to become stronger! Prove your skills as a trainer.",
-                "objective_type": "battle",
-                "objective_target": 3,
-                "reward_type": "tokens",
-                "reward_amount": 300
-            }
+            await self.rate_limiter.acquire()
+            response = await self._generate(prompt, generation_config=QUEST_GENERATION_CONFIG)
+            text = response.text
+            try:
+                draft = QuestDraft.model_validate_json(text)
+            except ValidationError as e:
+                self.quest_metrics["parse_failures"] += 1
+                logger.warning(f"Invalid quest JSON, retrying with repair prompt: {str(e)}")
+                draft = await self._repair_quest(prompt, text, e)
+        except Exception as e:
+            self.quest_metrics["api_errors"] += 1
+            logger.error(f"Gemini API error in generate_quest: {str(e)}")
+            return None
+
+        if draft is None:
+            return None
+
+        self.quest_metrics["valid"] += 1
+        logger.info("Generated quest", extra=sampled(title=draft.title))
+        return draft.model_dump(mode="json")
+
+    async def _repair_quest(
+        self,
+        prompt: str,
+        invalid_text: str,
+        error: ValidationError
+    ) -> Optional[QuestDraft]:
+        """Ask the model once to correct an invalid quest; None if still invalid"""
+        repair_prompt = f"""{prompt}
+Your previous response was not valid:
+{invalid_text}
+
+Validation errors:
+{error}
+
+Return the corrected quest JSON only.
+"""
+        await self.rate_limiter.acquire()
+        response = await self._generate(repair_prompt, generation_config=QUEST_GENERATION_CONFIG)
+        try:
+            draft = QuestDraft.model_validate_json(response.text)
+        except ValidationError as e:
+            self.quest_metrics["parse_failures"] += 1
+            logger.error(f"Quest repair failed: {str(e)}")
+            return None
+
+        self.quest_metrics["repaired"] += 1
+        return draft
 
     @handle_gemini_errors()
     async def generate_hatching_text(
@@ -359,8 +481,6 @@ Respond in this EXACT JSON format:
         """
         Generate exciting egg hatching reveal text
         """
-        await self.rate_limiter.acquire()
-        
         prompt = f"""You are a Pokémon game narrator. Generate an exciting egg hatching reveal.
 
 Pokémon: {pokemon_name}
@@ -372,19 +492,73 @@ Second sentence: Reveal the Pokémon with a distinctive characteristic.
 
 Example: "The egg begins to glow with an intense light! A Charmander emerges, its tail flame burning bright with determination!"
 """
+        task = (
+            f"Egg hatching that reveals {pokemon_name} (Types: {', '.join(pokemon_types)}). "
+            "Write exactly 2 sentences: first the egg beginning to hatch, then the Pokémon's reveal with a distinctive characteristic."
+        )
         
-        response = await asyncio.to_thread(self.model.generate_content, prompt)
-        text = response.text.strip()
-        logger.info(f"Generated hatching text for {pokemon_name}")
+        text = await self.narrative_batcher.submit({"prompt": prompt, "task": task})
+        if not text:
+            return f"The egg hatched! It's a {pokemon_name}!"
+        logger.info("Generated hatching text", extra=sampled(pokemon=pokemon_name))
         return text
 
+    async def _generate_narrative_batch(self, items: List[Dict[str, str]]) -> List[Optional[str]]:
+        """
+        Generate several narrative texts with a single Gemini call
+
+        Returns one text per item, or None for items the response did not cover
+        so callers can fall back individually.
+        """
+        await self.rate_limiter.acquire()
+
+        if len(items) == 1:
+            response = await self._generate(items[0]["prompt"])
+            return [response.text.strip()]
+
+        tasks = "\n".join(f"{i}. {item['task']}" for i, item in enumerate(items, 1))
+        prompt = f"""You are a Pokémon game narrator. Complete each numbered task below.
+
+{tasks}
+
+Respond with a JSON array of exactly {len(items)} strings, where string N is the text for task N.
+"""
+        response = await self._generate(
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "max_output_tokens": 120 * len(items),
+            }
+        )
+        texts = self._parse_narrative_batch(response.text, len(items))
+        logger.info("Generated narrative batch", extra=sampled(generated=sum(1 for t in texts if t), items=len(items)))
+        return texts
+
+    def _parse_narrative_batch(self, text: str, count: int) -> List[Optional[str]]:
+        """Parse a JSON array of texts, leaving unusable entries as None"""
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse narrative batch JSON: {str(e)}")
+            return [None] * count
+
+        if not isinstance(data, list):
+            return [None] * count
+
+        texts: List[Optional[str]] = []
+        for index in range(count):
+            entry = data[index] if index < len(data) else None
+            texts.append(entry.strip() if isinstance(entry, str) and entry.strip() else None)
+        return texts
+
     @handle_gemini_errors()
     async def generate_trainer_dialogue(
         self,
         player_message: str,
         trainer_personality: str,
         conversation_history: List[Dict[str, str]],
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        history_summary: str = ""
     ) -> str:
         """
         Generate AI trainer dialogue response based on personality and context
@@ -392,8 +566,9 @@ Example: "The egg begins to glow with an intense light! A Charmander emerges, it
         Args:
             player_message: The player's message to the trainer
             trainer_personality: One of 'friendly', 'competitive', 'mysterious'
-            conversation_history: List of previous messages [{"role": "player"|"trainer", "message": "..."}]
+            conversation_history: Token-budgeted turns [{"role": "user"|"assistant", "content": "..."}]
             context: Optional context like battle state, player team, etc.
+            history_summary: Rolling summary of turns older than conversation_history
         
         Returns:
             AI-generated trainer response
@@ -422,11 +597,11 @@ Example: "The egg begins to glow with an intense light! A Charmander emerges, it
         
         # Build conversation context
         history_text = ""
-        if conversation_history:
-            recent_history = conversation_history[-5:]  # Last 5 messages for context
-            for msg in recent_history:
-                role = "Player" if msg['role'] == 'player' else "You"
-                history_text += f"{role}: {msg['message']}\n"
+        if history_summary:
+            history_text += f"[Earlier in this conversation:\n{history_summary}]\n"
+        for msg in conversation_history:
+            role = "Player" if msg['role'] == 'user' else "You"
+            history_text += f"{role}: {msg['content']}\n"
         
         # Add game context if provided
         context_text = ""
@@ -451,9 +626,9 @@ Respond as the trainer in character. Be natural, engaging, and stay in character
 Keep your response under 3 sentences.
 """
         
-        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        response = await self._generate(prompt)
         text = response.text.strip()
-        logger.info(f"Generated {trainer_personality} trainer dialogue")
+        logger.info("Generated trainer dialogue", extra=sampled(personality=trainer_personality))
         return text
 
 
@@ -0,0 +1,309 @@
+"""
+Leaderboard Service - Redis sorted-set rankings for XP, wins and captures
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import settings
+from services.redis_service import redis_service
+from services.pokemon_service import pokemon_service
+from services.matchmaking_service import LEASE_SCRIPT
+from services.stream_consumer import StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("xp", "wins", "captures")
+# PokéAPI type names; type boards exist only for these
+POKEMON_TYPES = frozenset((
+    "normal", "fire", "water", "grass", "electric", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+))
+
+
+class LeaderboardUnavailableError(RuntimeError):
+    """Raised when rankings are requested without a Redis connection"""
+
+
+class LeaderboardService:
+    """
+    Global, weekly and per-Pokémon-type rankings kept as Redis ZSETs
+
+    Scores are only ever incremented (ZINCRBY), and every read is a ZSET
+    rank/range query, so updates and lookups are O(log n) in the number
+    of ranked players. Periodic snapshots are taken by one worker at a time
+    (the holder of a Redis lease), which checks every lease_tick whether
+    the last snapshot, on any worker, is snapshot_interval old.
+    """
+
+    def __init__(self):
+        self.boards_key = "leaderboard:boards"
+        self.weekly_ttl = 5 * 7 * 86400  # Keep a few past weeks around
+        self.snapshot_size = settings.LEADERBOARD_SNAPSHOT_SIZE
+        self.snapshot_interval = settings.LEADERBOARD_SNAPSHOT_INTERVAL
+        self.snapshot_history = 24
+        self.snapshot_at_key = "leaderboard:snapshot_at"
+        self.lease_key = "leaderboard:snapshotter"
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_tick = min(60, self.snapshot_interval)
+        self.lease_ms = max(5000, self.lease_tick * 3000)
+        self._script_client = None
+        self._lease_script = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _client(self):
+        client = redis_service.client
+        if not client:
+            raise LeaderboardUnavailableError("Leaderboards require Redis")
+        if self._script_client is not client:
+            self._script_client = client
+            self._lease_script = client.register_script(LEASE_SCRIPT)
+        return client
+
+    def board_key(
+        self,
+        board: str,
+        metric: str,
+        pokemon_type: Optional[str] = None,
+        week: Optional[str] = None
+    ) -> str:
+        """
+        Redis key for a board
+
+        Args:
+            board: "global", "weekly" or "type"
+            metric: One of METRICS
+            pokemon_type: One of POKEMON_TYPES, required for "type" boards
+            week: ISO week like "2025-W07" for weekly boards (defaults to current)
+
+        Raises ValueError for anything else, so request values never make up
+        arbitrary key names.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if board == "global":
+            return f"leaderboard:global:{metric}"
+        if board == "weekly":
+            if week is not None and not self.valid_week(week):
+                raise ValueError(f"Invalid ISO week: {week}")
+            return f"leaderboard:weekly:{week or self.current_week()}:{metric}"
+        if board == "type" and pokemon_type:
+            if pokemon_type.lower() not in POKEMON_TYPES:
+                raise ValueError(f"Unknown Pokémon type: {pokemon_type}")
+            return f"leaderboard:type:{pokemon_type.lower()}:{metric}"
+        raise ValueError(f"Unknown leaderboard: {board}")
+
+    def valid_week(self, week: str) -> bool:
+        """Whether week is an existing ISO week in the 2025-W07 form"""
+        year, sep, number = week.partition("-W")
+        if not sep or len(year) != 4 or len(number) != 2 or not (year + number).isdigit():
+            return False
+        try:
+            date.fromisocalendar(int(year), int(number), 1)
+        except ValueError:
+            return False
+        return True
+
+    def current_week(self) -> str:
+        year, week, _ = datetime.now(timezone.utc).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    async def add_scores(self, increments: Dict[Tuple[str, str], float]):
+        """
+        Apply score increments in one pipeline
+
+        Args:
+            increments: {(board key, player_id): amount}
+        """
+        client = self._client()
+        weekly_keys = {key for key, _ in increments if key.startswith("leaderboard:weekly:")}
+        async with client.pipeline(transaction=False) as pipe:
+            for (key, player_id), amount in increments.items():
+                pipe.zincrby(key, amount, player_id)
+            for key in weekly_keys:
+                pipe.expire(key, self.weekly_ttl)
+            pipe.sadd(self.boards_key, *{key for key, _ in increments})
+            await pipe.execute()
+
+    async def get_page(self, key: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """One page of a board, highest score first"""
+        client = self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(key, offset, offset + limit - 1, withscores=True)
+            pipe.zcard(key)
+            entries, total = await pipe.execute()
+        return {
+            "total": total,
+            "offset": offset,
+            "entries": self._format(entries, offset),
+            "next_offset": offset + limit if offset + limit < total else None,
+        }
+
+    async def get_player(self, key: str, player_id: str, radius: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        A player's rank and score, plus `radius` neighbours above and below
+
+        Returns None if the player is not on the board.
+        """
+        client = self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(key, player_id)
+            pipe.zscore(key, player_id)
+            rank, score = await pipe.execute()
+        if rank is None:
+            return None
+
+        result = {"player_id": player_id, "rank": rank + 1, "score": score}
+        if radius > 0:
+            start = max(0, rank - radius)
+            entries = await client.zrevrange(key, start, rank + radius, withscores=True)
+            result["around"] = self._format(entries, start)
+        return result
+
+    def _format(self, entries: List[Tuple[str, float]], start: int) -> List[Dict[str, Any]]:
+        return [
+            {"rank": start + i + 1, "player_id": player_id, "score": score}
+            for i, (player_id, score) in enumerate(entries)
+        ]
+
+    async def snapshot(self) -> int:
+        """Store the top entries of every known board; returns boards snapshotted"""
+        client = self._client()
+        keys = await client.smembers(self.boards_key)
+        taken_at = int(time.time())
+        count = 0
+        for key in keys:
+            if not await client.exists(key):
+                await client.srem(self.boards_key, key)
+                continue
+            entries = await client.zrevrange(key, 0, self.snapshot_size - 1, withscores=True)
+            snapshot = json.dumps({"taken_at": taken_at, "entries": self._format(entries, 0)})
+            snapshot_key = f"leaderboard:snapshot:{key.split(':', 1)[1]}"
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.lpush(snapshot_key, snapshot)
+                pipe.ltrim(snapshot_key, 0, self.snapshot_history - 1)
+                await pipe.execute()
+            count += 1
+        await client.set(self.snapshot_at_key, taken_at)
+        return count
+
+    async def get_snapshots(self, key: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """Most recent snapshots of a board, newest first"""
+        client = self._client()
+        snapshot_key = f"leaderboard:snapshot:{key.split(':', 1)[1]}"
+        return [json.loads(raw) for raw in await client.lrange(snapshot_key, 0, limit - 1)]
+
+    async def hold_lease(self) -> bool:
+        """Take or renew the snapshot lease; True while this worker holds it"""
+        self._client()
+        return bool(await self._lease_script(keys=[self.lease_key], args=[self.worker_id, self.lease_ms]))
+
+    async def snapshot_due(self) -> bool:
+        """True once snapshot_interval has passed since the last snapshot"""
+        taken_at = await self._client().get(self.snapshot_at_key)
+        return taken_at is None or time.time() - int(taken_at) >= self.snapshot_interval
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_tick)
+            try:
+                if await self.hold_lease() and await self.snapshot_due():
+                    count = await self.snapshot()
+                    logger.info(f"Snapshotted {count} leaderboards")
+            except Exception as e:
+                logger.error(f"Leaderboard snapshot failed: {e}")
+
+    def start(self):
+        """Start periodic leaderboard snapshots"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self):
+        """Stop periodic leaderboard snapshots"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class LeaderboardWorker(StreamConsumer):
+    """
+    Turns battle and capture events into leaderboard score increments
+
+    Battle events add XP and a win; capture events add a capture. Each goes
+    to the global, current weekly and per-type boards. Delivery is
+    at-least-once, so a crash between scoring and acknowledging can count
+    an event twice.
+    """
+
+    group = "leaderboard"
+
+    async def handle_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        increments: Dict[Tuple[str, str], float] = defaultdict(float)
+        species_types = await self._species_types(entries)
+        for _, fields in entries:
+            player_id = fields.get("player_id")
+            if not player_id:
+                continue
+
+            if fields.get("action") == "battle":
+                scores = {"xp": float(fields.get("xp", 0)), "wins": 1.0}
+            elif fields.get("action") == "capture":
+                scores = {"captures": 1.0}
+            else:
+                continue
+
+            types = self._event_types(fields, species_types)
+            for metric, amount in scores.items():
+                if not amount:
+                    continue
+                increments[(leaderboard_service.board_key("global", metric), player_id)] += amount
+                increments[(leaderboard_service.board_key("weekly", metric), player_id)] += amount
+                for pokemon_type in types:
+                    key = leaderboard_service.board_key("type", metric, pokemon_type)
+                    increments[(key, player_id)] += amount
+
+        if increments:
+            await leaderboard_service.add_scores(increments)
+        return [entry_id for entry_id, _ in entries]
+
+    async def _species_types(self, entries: List[Tuple[str, Dict[str, str]]]) -> Dict[str, List[str]]:
+        """Types of every species the batch needs looked up, fetched concurrently once per species"""
+        species = list({
+            fields["pokemon_id"] for _, fields in entries
+            if not fields.get("types") and fields.get("pokemon_id", "").isdigit()
+        })
+        results = await asyncio.gather(
+            *[pokemon_service.get_pokemon(int(pokemon_id)) for pokemon_id in species],
+            return_exceptions=True
+        )
+        types = {}
+        for pokemon_id, result in zip(species, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not resolve types for Pokémon {pokemon_id}: {result}")
+                continue
+            types[pokemon_id] = result.types
+        return types
+
+    def _event_types(self, fields: Dict[str, str], species_types: Dict[str, List[str]]) -> List[str]:
+        """Known Pokémon types an event counts towards (sent by the client or looked up by species)"""
+        if fields.get("types"):
+            types = fields["types"].split(",")
+        else:
+            types = species_types.get(fields.get("pokemon_id", ""), [])
+        return [t.lower() for t in types if t.lower() in POKEMON_TYPES]
+
+
+# Global instances
+leaderboard_service = LeaderboardService()
+leaderboard_worker = LeaderboardWorker()
@@ -0,0 +1,202 @@
+"""
+Log Pipeline - Queue-backed structured logging, so log I/O never runs on the event loop
+
+Loggers hand records to a bounded in-memory queue; one listener thread
+formats them (JSON Lines by default) and writes them to stdout. When the
+queue is full the record is dropped and counted in log_records_dropped_total
+rather than making the caller wait.
+
+High-volume info events opt into sampling by passing extra=sampled(...):
+
+    logger.info("Generated battle commentary", extra=sampled(attacker=attacker))
+
+Only LOG_SAMPLE_RATE of them are kept (LOG_SAMPLE_RATES overrides per
+module), and uvicorn's access lines are sampled the same way; every other
+record, and anything at WARNING or above, is always written. Keys passed in
+extra become top-level fields of the JSON line.
+"""
+import atexit
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+import orjson
+
+from config import settings
+from services.metrics import metrics
+from services.tracing import tracer
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full", ("logger",)
+)
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+# Not written: the sampling flag and uvicorn's ANSI-coloured copy of msg
+_HIDDEN_FIELDS = {"sample", "color_message"}
+_PIPELINE_FIELDS = {"sample_rate", "trace_id", "span_id"}
+
+# uvicorn configures these itself; they are rerouted through the root logger
+_SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+# One line per request, so sampled like sampled() events
+_SAMPLED_LOGGERS = {"uvicorn.access"}
+
+
+def sampled(**fields: Any) -> Dict[str, Any]:
+    """extra= for a high-volume info event that may be sampled out"""
+    fields["sample"] = True
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields, trace ids and exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in _HIDDEN_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [
+            f"{key}={value}" for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRIBUTES and key not in _HIDDEN_FIELDS and key not in _PIPELINE_FIELDS
+        ]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops sampled-out records and attaches the current trace, in the caller
+
+    Records flagged with sampled() and uvicorn's access lines are kept at
+    the rate for their logger: the longest matching LOG_SAMPLE_RATES prefix
+    ("services" covers "services.gemini_service"), else LOG_SAMPLE_RATE.
+    """
+
+    def __init__(self, default_rate: float, module_rates: Dict[str, float]):
+        super().__init__()
+        self.default_rate = default_rate
+        self.module_rates = module_rates
+        self._rates: Dict[str, float] = {}
+
+    def sample_rate(self, name: str) -> float:
+        rate = self._rates.get(name)
+        if rate is None:
+            rate = self.default_rate
+            for module in sorted(self.module_rates, key=len):
+                if name == module or name.startswith(module + "."):
+                    rate = self.module_rates[module]
+            self._rates[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and (getattr(record, "sample", False) or record.name in _SAMPLED_LOGGERS):
+            rate = self.sample_rate(record.name)
+            if rate < 1:
+                if random.random() >= rate:
+                    return False
+                record.sample_rate = rate
+        span = tracer.current_span()
+        if span.recording:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread, dropping them when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve what depends on the caller's state; formatting happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(record.name)
+
+
+class LogPipeline:
+    """Root logger configuration plus the listener thread that does the writing"""
+
+    def __init__(self):
+        self.listener: Optional[QueueListener] = None
+        self.configured = False
+
+    def _formatter(self) -> logging.Formatter:
+        return TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter()
+
+    def setup(self, queued: Optional[bool] = None):
+        """
+        Route all logging through the pipeline; safe to call more than once
+
+        queued=False writes synchronously from the caller (for runtimes that
+        freeze the process between requests, where a background thread may
+        not get to flush); by default LOG_ASYNC decides.
+        """
+        if self.configured:
+            return
+        queued = settings.LOG_ASYNC if queued is None else queued
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(self._formatter())
+        if queued:
+            handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+            self.listener = QueueListener(handler.queue, output)
+            self.listener.start()
+            atexit.register(self.stop)
+        else:
+            handler = output
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE, settings.log_sample_rates_map))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        for name in _SERVER_LOGGERS:
+            server_logger = logging.getLogger(name)
+            server_logger.handlers.clear()
+            server_logger.propagate = True
+        for name, level in settings.log_levels_map.items():
+            logging.getLogger(name).setLevel(level.upper())
+        self.configured = True
+
+    def stop(self):
+        """Flush what is queued and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+# Global instance
+log_pipeline = LogPipeline()
@@ -0,0 +1,265 @@
+"""
+Marketplace Index - Order book of active listings built from indexed marketplace calls
+"""
+import asyncio
+import base64
+import json
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.chain_indexer import chain_index_store, ChainIndexStore
+from services.pokemon_service import pokemon_service
+
+logger = logging.getLogger(__name__)
+
+LISTING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    nft_id TEXT PRIMARY KEY,
+    nft_type TEXT NOT NULL,
+    seller TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    species_id INTEGER,
+    level INTEGER,
+    rarity TEXT,
+    data TEXT NOT NULL,
+    listed_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_price ON listings (price, nft_id);
+CREATE INDEX IF NOT EXISTS listings_species_price ON listings (species_id, price, nft_id);
+CREATE INDEX IF NOT EXISTS listings_newest ON listings (listed_at, nft_id);
+CREATE TABLE IF NOT EXISTS floor_prices (
+    species_id INTEGER PRIMARY KEY,
+    floor_price INTEGER NOT NULL,
+    listing_count INTEGER NOT NULL
+);
+"""
+
+# Prices are u64 on chain, SQLite integers signed 64-bit: listings above this are not indexed
+MAX_INDEXED_PRICE = 2 ** 63 - 1
+
+LIST_FUNCTIONS = {"list_pokemon": "pokemon", "list_egg": "egg"}
+CLOSE_FUNCTIONS = {"buy_pokemon", "buy_egg", "cancel_listing_pokemon", "cancel_listing_egg"}
+
+SORTS = {
+    "price_asc": ("price", "ASC"),
+    "price_desc": ("price", "DESC"),
+    "newest": ("listed_at", "DESC"),
+}
+
+
+def _add_listing(conn: sqlite3.Connection, event: Dict[str, Any], nft_type: str, nft_id: str, price: int):
+    row = conn.execute("SELECT data FROM nfts WHERE object_id = ?", (nft_id,)).fetchone()
+    data = json.loads(row[0]) if row else {"id": nft_id}
+    species_id = data.get("species_id") if nft_type == "pokemon" else None
+    rarity = pokemon_service.determine_rarity(species_id).value if species_id else None
+
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO listings
+            (nft_id, nft_type, seller, price, species_id, level, rarity, data, listed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (nft_id, nft_type, event["sender"], price, species_id, data.get("level"), rarity,
+         json.dumps(data), event["timestamp_ms"])
+    )
+    if species_id is not None:
+        conn.execute(
+            """
+            INSERT INTO floor_prices (species_id, floor_price, listing_count) VALUES (?, ?, 1)
+            ON CONFLICT (species_id) DO UPDATE SET
+                floor_price = MIN(floor_price, excluded.floor_price),
+                listing_count = listing_count + 1
+            """,
+            (species_id, price)
+        )
+
+
+def _remove_listing(conn: sqlite3.Connection, nft_id: str):
+    row = conn.execute("SELECT species_id, price FROM listings WHERE nft_id = ?", (nft_id,)).fetchone()
+    if row is None:
+        return
+    conn.execute("DELETE FROM listings WHERE nft_id = ?", (nft_id,))
+
+    species_id, price = row
+    if species_id is None:
+        return
+    floor = conn.execute(
+        "SELECT floor_price, listing_count FROM floor_prices WHERE species_id = ?", (species_id,)
+    ).fetchone()
+    if floor is None or floor[1] <= 1:
+        conn.execute("DELETE FROM floor_prices WHERE species_id = ?", (species_id,))
+    elif price <= floor[0]:
+        # The floor listing left: the next one is a single index seek away
+        next_floor = conn.execute(
+            "SELECT MIN(price) FROM listings WHERE species_id = ?", (species_id,)
+        ).fetchone()[0]
+        conn.execute(
+            "UPDATE floor_prices SET floor_price = ?, listing_count = listing_count - 1 WHERE species_id = ?",
+            (next_floor, species_id)
+        )
+    else:
+        conn.execute(
+            "UPDATE floor_prices SET listing_count = listing_count - 1 WHERE species_id = ?", (species_id,)
+        )
+
+
+def apply_marketplace_calls(conn: sqlite3.Connection, event: Dict[str, Any]):
+    """Index handler: open listings on list_*, close them on buy_*/cancel_*"""
+    for call in event["calls"]:
+        if call["module"] != "marketplace":
+            continue
+        function, args = call["function"], call["args"]
+        if function in LIST_FUNCTIONS and len(args) >= 3:
+            price = int(args[2])
+            if price > MAX_INDEXED_PRICE:
+                logger.warning(f"Not indexing listing of {args[1]} in {event['digest']}: price {price} is out of range")
+                continue
+            _add_listing(conn, event, LIST_FUNCTIONS[function], args[1], price)
+        elif function in CLOSE_FUNCTIONS and len(args) >= 2:
+            _remove_listing(conn, args[1])
+
+
+def _encode_cursor(sort_value: Any, nft_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, nft_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> List[Any]:
+    try:
+        sort_value, nft_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(sort_value, int) or not 0 <= sort_value <= MAX_INDEXED_PRICE:
+        raise ValueError("Invalid cursor")
+    return [sort_value, nft_id]
+
+
+class MarketplaceIndex:
+    """
+    Active marketplace listings and per-species floor prices
+
+    Kept in the chain index database and updated in the same SQLite
+    transaction as the marketplace calls that change them. Floor prices are
+    maintained incrementally; only removing the floor listing of a species
+    needs a (indexed) lookup of the next cheapest one.
+    """
+
+    def __init__(self, store: ChainIndexStore):
+        self.store = store
+        store.register(LISTING_SCHEMA, apply_marketplace_calls)
+
+    async def search(
+        self,
+        nft_type: Optional[str] = None,
+        species_id: Optional[int] = None,
+        rarity: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_level: Optional[int] = None,
+        max_level: Optional[int] = None,
+        sort: str = "price_asc",
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        One page of listings matching the filters
+
+        Pagination is keyset-based: pass next_cursor from the previous page.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        column, direction = SORTS[sort]
+
+        clauses, params = [], []
+        for sql, value in (
+            ("nft_type = ?", nft_type),
+            ("species_id = ?", species_id),
+            ("rarity = ?", rarity),
+            ("price >= ?", min_price),
+            ("price <= ?", max_price),
+            ("level >= ?", min_level),
+            ("level <= ?", max_level),
+        ):
+            if value is not None:
+                clauses.append(sql)
+                params.append(value)
+        if cursor:
+            op = ">" if direction == "ASC" else "<"
+            clauses.append(f"({column}, nft_id) {op} (?, ?)")
+            params.extend(_decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = await self.store.query(
+            f"""
+            SELECT nft_id, nft_type, seller, price, species_id, level, rarity, data, listed_at
+            FROM listings {where}
+            ORDER BY {column} {direction}, nft_id {direction}
+            LIMIT ?
+            """,
+            tuple(params) + (limit + 1,)
+        )
+
+        listings = [
+            {
+                "nft_id": row["nft_id"],
+                "nft_type": row["nft_type"],
+                "seller": row["seller"],
+                "price": row["price"],
+                "species_id": row["species_id"],
+                "level": row["level"],
+                "rarity": row["rarity"],
+                "listed_at": row["listed_at"],
+                "nft": json.loads(row["data"]),
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = _encode_cursor(last[column], last["nft_id"])
+        return {"listings": listings, "next_cursor": next_cursor}
+
+    async def floor_prices(self, species_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cheapest listing price and listing count per species"""
+        sql = "SELECT species_id, floor_price, listing_count FROM floor_prices"
+        params: tuple = ()
+        if species_id is not None:
+            sql += " WHERE species_id = ?"
+            params = (species_id,)
+        rows = await self.store.query(sql + " ORDER BY species_id", params)
+        return [dict(row) for row in rows]
+
+    def rebuild_sync(self) -> int:
+        """Recreate listings from the already indexed marketplace calls; returns open listings"""
+        conn = self.store._conn()
+        with self.store._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM listings")
+                conn.execute("DELETE FROM floor_prices")
+                for row in conn.execute(
+                    "SELECT digest, timestamp_ms, sender, calls FROM transactions ORDER BY timestamp_ms, rowid"
+                ).fetchall():
+                    apply_marketplace_calls(conn, {
+                        "digest": row["digest"],
+                        "timestamp_ms": row["timestamp_ms"],
+                        "sender": row["sender"],
+                        "calls": json.loads(row["calls"]),
+                    })
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    async def ensure_built(self):
+        """Backfill listings for transactions indexed before this read model existed"""
+        listings = await self.store.query("SELECT 1 FROM listings LIMIT 1")
+        escrowed = await self.store.query("SELECT 1 FROM nfts WHERE listed = 1 LIMIT 1")
+        if escrowed and not listings:
+            count = await asyncio.to_thread(self.rebuild_sync)
+            logger.info(f"Rebuilt marketplace index with {count} open listings")
+
+
+# Global instance
+marketplace_index = MarketplaceIndex(chain_index_store)
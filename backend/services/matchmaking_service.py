@@ -0,0 +1,388 @@
+"""
+Matchmaking Service - Pairs queued players for PvP battles by level
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import settings
+from models.battle import MatchTicket, PvPBattleState
+from services.redis_service import redis_service
+from services.log_pipeline import sampled
+
+logger = logging.getLogger(__name__)
+
+# Finds the oldest acceptable opponent for a queued player and pairs them.
+# KEYS[1]: levels hash, KEYS[2]: tickets hash, KEYS[3]: matches hash,
+# KEYS[4]: the player's own bucket queue, KEYS[5..]: other bucket queues, nearest first
+# ARGV[1]: player ID, ARGV[2]: now (ms), ARGV[3]: base window, ARGV[4]: window step,
+# ARGV[5]: widen interval (ms), ARGV[6]: max window, ARGV[7]: battle ID,
+# ARGV[8]: candidates scanned per bucket, ARGV[9..]: level gap to each bucket in KEYS[4..]
+# Returns {} when no opponent is in range, else {opponent, player ticket, opponent ticket}.
+MATCH_SCRIPT = """
+local player = ARGV[1]
+local raw_level = redis.call('HGET', KEYS[1], player)
+local enqueued = redis.call('ZSCORE', KEYS[4], player)
+if not raw_level or not enqueued then
+  return {}
+end
+local level = tonumber(raw_level)
+local now = tonumber(ARGV[2])
+local base, step, interval, max_window = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+local function window(since)
+  return math.min(max_window, base + step * math.floor((now - since) / interval))
+end
+local own_window = window(tonumber(enqueued))
+for i = 4, #KEYS do
+  if tonumber(ARGV[5 + i]) <= max_window then
+    local candidates = redis.call('ZRANGE', KEYS[i], 0, tonumber(ARGV[8]) - 1, 'WITHSCORES')
+    for j = 1, #candidates, 2 do
+      local other = candidates[j]
+      if other ~= player then
+        local other_level = tonumber(redis.call('HGET', KEYS[1], other))
+        local allowed = math.max(own_window, window(tonumber(candidates[j + 1])))
+        if other_level and math.abs(other_level - level) <= allowed then
+          redis.call('ZREM', KEYS[4], player)
+          redis.call('ZREM', KEYS[i], other)
+          redis.call('HDEL', KEYS[1], player, other)
+          local tickets = redis.call('HMGET', KEYS[2], player, other)
+          redis.call('HDEL', KEYS[2], player, other)
+          local match = cjson.encode({battle_id = ARGV[7], player_ids = {player, other}, matched_at = now})
+          redis.call('HSET', KEYS[3], player, match, other, match)
+          return {other, tickets[1], tickets[2]}
+        end
+      end
+    end
+  end
+end
+return {}
+"""
+
+
+# Takes or renews the background matcher lease; returns 1 while this worker holds it.
+# KEYS[1]: lease key, ARGV[1]: worker ID, ARGV[2]: lease (ms)
+LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return 1
+end
+return 0
+"""
+
+
+class MatchmakingUnavailableError(RuntimeError):
+    """Raised when matchmaking is requested without a Redis connection"""
+
+
+class MatchmakingService:
+    """
+    Level-bucketed PvP queues in Redis
+
+    Each bucket is a sorted set of waiting players scored by enqueue time.
+    A player may be paired with anyone whose level is within the larger of
+    the two players' windows; windows start narrow and widen the longer a
+    player waits. Pairing runs as one Lua script, so a player can never be
+    matched twice. Players are matched on enqueue and on status polls, and
+    a background loop keeps re-trying waiting players as their windows grow.
+    That loop runs on one worker at a time (the holder of a Redis lease) and
+    skips buckets with no arrivals in reach since it last swept them, until
+    a widen interval has passed. All keys share the {mm} hash tag so the
+    scripts work on Redis Cluster.
+    """
+
+    def __init__(self):
+        self.levels_key = "matchmaking:{mm}:levels"
+        self.tickets_key = "matchmaking:{mm}:tickets"
+        self.matches_key = "matchmaking:{mm}:matches"
+        self.arrivals_key = "matchmaking:{mm}:arrivals"  # bucket -> arrival counter
+        self.lease_key = "matchmaking:{mm}:matcher"
+        self.bucket_size = settings.MATCHMAKING_BUCKET_SIZE
+        self.base_window = settings.MATCHMAKING_BASE_WINDOW
+        self.window_step = settings.MATCHMAKING_WINDOW_STEP
+        self.widen_interval_ms = settings.MATCHMAKING_WIDEN_INTERVAL * 1000
+        self.max_window = settings.MATCHMAKING_MAX_WINDOW
+        self.tick_interval = settings.MATCHMAKING_TICK_MS / 1000
+        self.ticket_ttl_ms = settings.MATCHMAKING_TICKET_TTL * 1000
+        self.session_ttl = settings.BATTLE_SESSION_TTL
+        self.scan_limit = 50  # Oldest candidates checked per bucket
+        self.bucket_count = 100 // self.bucket_size + 1
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_ms = max(5000, settings.MATCHMAKING_TICK_MS * 10)
+        # Buckets whose players a player in each bucket may be paired with
+        self._reach = {
+            bucket: sorted({
+                other
+                for level in range(bucket * self.bucket_size, (bucket + 1) * self.bucket_size)
+                for other, _ in self._search_buckets(level)
+            })
+            for bucket in range(self.bucket_count)
+        }
+        # bucket -> (arrival counters of its reach, ms) at its last sweep
+        self._swept: Dict[int, Tuple[tuple, float]] = {}
+        self._script_client = None
+        self._match_script = None
+        self._lease_script = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _client(self):
+        client = redis_service.client
+        if not client:
+            raise MatchmakingUnavailableError("Matchmaking requires Redis")
+        if self._script_client is not client:
+            self._script_client = client
+            self._match_script = client.register_script(MATCH_SCRIPT)
+            self._lease_script = client.register_script(LEASE_SCRIPT)
+        return client
+
+    def _queue_key(self, bucket: int) -> str:
+        return f"matchmaking:{{mm}}:queue:{bucket}"
+
+    def _session_key(self, battle_id: str) -> str:
+        return f"battle_session:{battle_id}"
+
+    def bucket_for(self, level: int) -> int:
+        return level // self.bucket_size
+
+    def window_for(self, waited_ms: float) -> int:
+        """Allowed level gap after waiting waited_ms"""
+        widened = self.window_step * int(waited_ms // self.widen_interval_ms)
+        return min(self.max_window, self.base_window + widened)
+
+    def _search_buckets(self, level: int) -> List[tuple]:
+        """(bucket, level gap to nearest level in it) within max_window, nearest first"""
+        own = self.bucket_for(level)
+        buckets = []
+        for bucket in range(self.bucket_count):
+            low = bucket * self.bucket_size
+            high = low + self.bucket_size - 1
+            gap = 0 if low <= level <= high else min(abs(level - low), abs(level - high))
+            if gap <= self.max_window:
+                buckets.append((gap, bucket != own, bucket))
+        return [(bucket, gap) for gap, _, bucket in sorted(buckets)]
+
+    async def enqueue(self, ticket: MatchTicket) -> Dict[str, Any]:
+        """Queue a player (replacing any earlier ticket) and try to pair them right away"""
+        client = self._client()
+        previous = await client.hget(self.levels_key, ticket.player_id)
+        now_ms = int(time.time() * 1000)
+
+        async with client.pipeline(transaction=True) as pipe:
+            if previous is not None:
+                pipe.zrem(self._queue_key(self.bucket_for(int(previous))), ticket.player_id)
+            pipe.hdel(self.matches_key, ticket.player_id)
+            pipe.hset(self.levels_key, ticket.player_id, ticket.level)
+            pipe.hset(self.tickets_key, ticket.player_id, ticket.model_dump_json())
+            pipe.zadd(self._queue_key(self.bucket_for(ticket.level)), {ticket.player_id: now_ms})
+            pipe.hincrby(self.arrivals_key, self.bucket_for(ticket.level), 1)
+            await pipe.execute()
+
+        match = await self.try_match(ticket.player_id, ticket.level)
+        if match:
+            return {"status": "matched", **match}
+        return {"status": "queued", "window": self.base_window, "waited_seconds": 0}
+
+    async def try_match(self, player_id: str, level: int) -> Optional[Dict[str, Any]]:
+        """Pair a queued player with an opponent in range; returns the match or None"""
+        self._client()
+        buckets = self._search_buckets(level)
+        battle_id = str(uuid.uuid4())
+        result = await self._match_script(
+            keys=[self.levels_key, self.tickets_key, self.matches_key]
+            + [self._queue_key(bucket) for bucket, _ in buckets],
+            args=[
+                player_id,
+                int(time.time() * 1000),
+                self.base_window,
+                self.window_step,
+                self.widen_interval_ms,
+                self.max_window,
+                battle_id,
+                self.scan_limit,
+            ] + [gap for _, gap in buckets]
+        )
+        if not result:
+            return None
+
+        opponent, player_ticket, opponent_ticket = result
+        session = await self._create_session(
+            battle_id,
+            MatchTicket.model_validate_json(player_ticket),
+            MatchTicket.model_validate_json(opponent_ticket)
+        )
+        logger.info("Matched players", extra=sampled(player_id=player_id, opponent=opponent, battle_id=battle_id))
+        return {"battle_id": battle_id, "opponent": opponent, "session": session.model_dump()}
+
+    async def _create_session(
+        self,
+        battle_id: str,
+        player: MatchTicket,
+        opponent: MatchTicket
+    ) -> PvPBattleState:
+        """Hand a new pair off to a battle session stored in Redis"""
+        session = PvPBattleState(
+            battle_id=battle_id,
+            player_ids=[player.player_id, opponent.player_id],
+            player_pokemon=player.pokemon,
+            opponent_pokemon=opponent.pokemon,
+            player_hp=player.pokemon.get("stats", {}).get("hp", 100),
+            opponent_hp=opponent.pokemon.get("stats", {}).get("hp", 100),
+            turn=0,
+            created_at=int(time.time())
+        )
+        await self._client().set(
+            self._session_key(battle_id), session.model_dump_json(), ex=self.session_ttl
+        )
+        return session
+
+    async def get_session(self, battle_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client().get(self._session_key(battle_id))
+        return json.loads(raw) if raw else None
+
+    async def get_status(self, player_id: str) -> Dict[str, Any]:
+        """
+        A player's matchmaking status; also retries pairing with the widened window
+
+        Status is "matched" (with battle_id, opponent and session),
+        "queued" or "not_queued".
+        """
+        client = self._client()
+        raw_match = await client.hget(self.matches_key, player_id)
+        if raw_match:
+            match = json.loads(raw_match)
+            opponent = next(p for p in match["player_ids"] if p != player_id)
+            return {
+                "status": "matched",
+                "battle_id": match["battle_id"],
+                "opponent": opponent,
+                "session": await self.get_session(match["battle_id"]),
+            }
+
+        level = await client.hget(self.levels_key, player_id)
+        if level is None:
+            return {"status": "not_queued"}
+
+        match = await self.try_match(player_id, int(level))
+        if match:
+            return {"status": "matched", **match}
+
+        enqueued = await client.zscore(self._queue_key(self.bucket_for(int(level))), player_id)
+        waited_ms = time.time() * 1000 - (enqueued or 0)
+        return {
+            "status": "queued",
+            "window": self.window_for(waited_ms),
+            "waited_seconds": round(waited_ms / 1000, 1),
+        }
+
+    async def cancel(self, player_id: str) -> bool:
+        """Leave the queue; returns False if the player was not queued"""
+        client = self._client()
+        level = await client.hget(self.levels_key, player_id)
+        if level is None:
+            return False
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._queue_key(self.bucket_for(int(level))), player_id)
+            pipe.hdel(self.levels_key, player_id)
+            pipe.hdel(self.tickets_key, player_id)
+            await pipe.execute()
+        return True
+
+    async def match_waiting(self) -> int:
+        """
+        Retry waiting players, oldest first, and drop expired tickets
+
+        A bucket is skipped when no player arrived in any bucket in its reach
+        since its last sweep (leaving or being matched never makes a new pair
+        possible) and less than a widen interval has passed, so the windows
+        have not grown by a step. Returns the number of pairs made.
+        """
+        client = self._client()
+        now_ms = time.time() * 1000
+        cutoff = now_ms - self.ticket_ttl_ms
+        arrivals = await client.hgetall(self.arrivals_key)
+        matched = 0
+        for bucket in range(self.bucket_count):
+            key = self._queue_key(bucket)
+            expired = await client.zrangebyscore(key, "-inf", cutoff)
+            if expired:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.zrem(key, *expired)
+                    pipe.hdel(self.levels_key, *expired)
+                    pipe.hdel(self.tickets_key, *expired)
+                    await pipe.execute()
+
+            seen = tuple(arrivals.get(str(other), "0") for other in self._reach[bucket])
+            last = self._swept.get(bucket)
+            if last and last[0] == seen and now_ms - last[1] < self.widen_interval_ms:
+                continue
+            self._swept[bucket] = (seen, now_ms)
+
+            waiting = await client.zrange(key, 0, self.scan_limit - 1)
+            if not waiting:
+                continue
+            levels = await client.hmget(self.levels_key, waiting)
+            for player_id, level in zip(waiting, levels):
+                if level is not None and await self.try_match(player_id, int(level)):
+                    matched += 1
+        return matched
+
+    async def hold_lease(self) -> bool:
+        """Take or renew the background matcher lease; True while this worker holds it"""
+        self._client()
+        held = bool(await self._lease_script(keys=[self.lease_key], args=[self.worker_id, self.lease_ms]))
+        if not held:
+            # Another worker sweeps; start from scratch if the lease comes back here
+            self._swept.clear()
+        return held
+
+    async def expire_matches(self) -> int:
+        """Forget match notifications older than the battle session TTL"""
+        client = self._client()
+        cutoff = (time.time() - self.session_ttl) * 1000
+        stale = [
+            player_id
+            for player_id, raw in (await client.hgetall(self.matches_key)).items()
+            if json.loads(raw)["matched_at"] < cutoff
+        ]
+        if stale:
+            await client.hdel(self.matches_key, *stale)
+        return len(stale)
+
+    async def _matcher_loop(self):
+        ticks = 0
+        while True:
+            try:
+                if await self.hold_lease():
+                    await self.match_waiting()
+                    ticks += 1
+                    if ticks * self.tick_interval >= 60:
+                        await self.expire_matches()
+                        ticks = 0
+            except Exception as e:
+                logger.error(f"Matchmaking tick failed: {e}")
+            await asyncio.sleep(self.tick_interval)
+
+    def start(self):
+        """Start the background matcher"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._matcher_loop())
+
+    async def stop(self):
+        """Stop the background matcher"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+matchmaking_service = MatchmakingService()
@@ -0,0 +1,345 @@
+"""
+Metrics Service - In-process Prometheus counters, gauges and histograms served at /metrics
+"""
+import asyncio
+import json
+import os
+import secrets
+import time
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream calls and routes: 5ms .. 30s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Rate limiter waits: no wait .. a full 60s window
+WAIT_BUCKETS = (0.001, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# 'worker="<pid>"' once multiprocess export is enabled, so workers' series never collide
+_worker_label = ""
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [_worker_label] if _worker_label else []
+    pairs.extend(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    """
+    Base class for a metric family
+
+    Label values are passed positionally in labelnames order. Updates are
+    plain dict operations on the event loop thread, so recording costs
+    about as much as the dict lookup.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines of the family, without the HELP/TYPE header"""
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        """The family in the text format; extra are sample lines from other workers"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        lines.extend(extra)
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = '"+Inf"' if bound == float("inf") else f'"{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, 'le=' + le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def metrics_token_valid(token: Optional[str]) -> bool:
+    """True if token is the configured METRICS_TOKEN (/metrics is off while it is unset)"""
+    return bool(settings.METRICS_TOKEN) and bool(token) and secrets.compare_digest(token, settings.METRICS_TOKEN)
+
+
+class MetricsRegistry:
+    """
+    All metric families of this process, rendered in the Prometheus text format
+
+    Each uvicorn worker has its own registry. With a multiprocess directory
+    set, every worker publishes its samples there as <pid>.json every
+    publish_interval seconds, labelled worker="<pid>", and render_all merges
+    the snapshots of all live workers, so any worker's /metrics answers for
+    the whole server.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self.worker = ""
+        self.multiproc_dir: Optional[str] = None
+        self.publish_interval = settings.METRICS_PUBLISH_INTERVAL
+        self._publish_task: Optional[asyncio.Task] = None
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, others: Iterable[Dict[str, List[str]]] = ()) -> str:
+        """This worker's families, plus the published samples of other workers"""
+        others = list(others)
+        return "\n".join(
+            metric.render(line for snapshot in others for line in snapshot.get(name, ()))
+            for name, metric in self._metrics.items()
+        ) + "\n"
+
+    def enable_multiprocess(self, directory: str):
+        """Label this worker's series with its pid and share them through directory"""
+        global _worker_label
+        os.makedirs(directory, exist_ok=True)
+        self.worker = str(os.getpid())
+        self.multiproc_dir = directory
+        _worker_label = f'worker="{self.worker}"'
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.multiproc_dir, f"{self.worker}.json")
+
+    def _write_snapshot(self, samples: Dict[str, List[str]]):
+        path = self._snapshot_path()
+        with open(path + ".tmp", "w") as f:
+            json.dump(samples, f)
+        os.replace(path + ".tmp", path)
+
+    def _read_snapshots(self) -> List[Dict[str, List[str]]]:
+        # Workers that stopped publishing (exited or crashed) are left out
+        own = f"{self.worker}.json"
+        cutoff = time.time() - 3 * self.publish_interval
+        snapshots = []
+        for name in os.listdir(self.multiproc_dir):
+            if not name.endswith(".json") or name == own:
+                continue
+            path = os.path.join(self.multiproc_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    continue
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    async def publish(self):
+        """Write this worker's samples for the other workers to serve"""
+        # Sampled on the loop, where the metrics are updated; the file is written off it
+        samples = {name: metric.samples() for name, metric in self._metrics.items()}
+        await asyncio.to_thread(self._write_snapshot, samples)
+
+    async def render_all(self) -> str:
+        """Every live worker's metrics (just this worker's without multiprocess export)"""
+        if not self.multiproc_dir:
+            return self.render()
+        return self.render(await asyncio.to_thread(self._read_snapshots))
+
+    async def _publish_loop(self):
+        while True:
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.error(f"Metrics publish failed: {e}")
+            await asyncio.sleep(self.publish_interval)
+
+    def start(self):
+        """Start publishing this worker's samples (multiprocess export only)"""
+        if self.multiproc_dir and self._publish_task is None:
+            self._publish_task = asyncio.create_task(self._publish_loop())
+
+    async def stop(self):
+        """Stop publishing and withdraw this worker's snapshot"""
+        if self._publish_task:
+            self._publish_task.cancel()
+            try:
+                await self._publish_task
+            except asyncio.CancelledError:
+                pass
+            self._publish_task = None
+            try:
+                os.remove(self._snapshot_path())
+            except OSError:
+                pass
+
+
+# Global instance
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit, miss, coalesced)", ("cache", "result")
+)
+UPSTREAM_DURATION = metrics.histogram(
+    "upstream_request_duration_seconds", "Upstream call latency by provider and outcome", ("provider", "outcome")
+)
+RATE_LIMITER_WAITING = metrics.gauge(
+    "rate_limiter_waiting", "Callers currently waiting for a rate limiter slot", ("limiter",)
+)
+RATE_LIMITER_WAIT = metrics.histogram(
+    "rate_limiter_wait_seconds", "Time spent waiting for a rate limiter slot", ("limiter",), WAIT_BUCKETS
+)
+AI_FALLBACKS = metrics.counter(
+    "ai_fallbacks_total", "Gemini calls answered with fallback text after an error", ("function",)
+)
+
+
+class upstream_timer:
+    """
+    Time an upstream call into UPSTREAM_DURATION
+
+        with upstream_timer("pokeapi"):
+            response = await client.get(url)
+    """
+
+    __slots__ = ("provider", "started")
+
+    def __init__(self, provider: str):
+        self.provider = provider
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "ok" if exc_type is None else "error"
+        UPSTREAM_DURATION.observe(time.perf_counter() - self.started, self.provider, outcome)
+        return False
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording REQUEST_DURATION per route template
+
+    Labelled with the matched route's path ("/api/pokemon/{pokemon_id}"),
+    never the raw URL, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status)
+            )
+
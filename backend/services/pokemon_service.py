@@ -1,14 +1,22 @@
 """
 Pokémon Service - Handles fetching and caching Pokémon data from PokéAPI
 """
-import httpx
+import logging
+import os
+import time
+import hashlib
 import random
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+import orjson
 from models.pokemon import PokemonData, PokemonStats, Rarity
 from services.redis_service import redis_service
+from services.metrics import CACHE_REQUESTS, upstream_timer
+from services.tracing import tracer
 from config import settings
 import json
 
+logger = logging.getLogger(__name__)
+
 
 class PokemonService:
     def __init__(self):
@@ -36,24 +44,90 @@ class PokemonService:
                             78, 80, 82, 83, 85, 87, 89, 91, 93, 95, 97, 99, 101, 103, 105, 
                             106, 107, 108, 110, 112, 113, 114, 115, 117, 119, 121, 122, 124, 
                             125, 126, 127, 128, 132, 134, 135, 136, 137, 139, 141, 143, 148, 149]
+        
+        # In-process tier (serverless profile); entries are shared, treat them as read-only
+        self._local: Optional[Dict[int, PokemonData]] = None
+        self._snapshot_path: Optional[str] = None
+        # Pooled PokéAPI client (server profile); None means a client per fetch
+        self._client = None
+        # Response bodies serialized once per species: id -> (expires_at, JSON bytes, ETag)
+        self._json_cache: Dict[int, Tuple[float, bytes, str]] = {}
+
+    def use_local_cache(self, snapshot_path: Optional[str] = None):
+        """
+        Keep Pokémon in process memory instead of Redis
+
+        The cache is seeded from a snapshot file (see write_snapshot) on first
+        use, so a fresh serverless instance rarely has to call PokéAPI.
+        """
+        self._local = {}
+        self._snapshot_path = snapshot_path
+
+    def _load_snapshot(self):
+        path, self._snapshot_path = self._snapshot_path, None
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path) as f:
+                for item in json.load(f):
+                    self._local[item["id"]] = PokemonData(**item)
+        except Exception as e:
+            logger.warning("Pokémon snapshot load failed", extra={"path": path, "error": str(e)})
+
+    async def write_snapshot(self, path: str, pokemon_ids: Optional[List[int]] = None) -> int:
+        """Fetch Pokémon (default: Generation 1) and save them as a snapshot file"""
+        pokemon = []
+        for pokemon_id in pokemon_ids or range(1, 152):
+            pokemon.append((await self.get_pokemon(pokemon_id)).model_dump(mode="json"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(pokemon, f)
+        return len(pokemon)
+
+    async def open_client(self, max_connections: int):
+        """Share one keep-alive connection pool for PokéAPI fetches"""
+        import httpx
+        
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=15.0
+        )
+
+    async def close_client(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def get_pokemon(self, pokemon_id: int) -> PokemonData:
         """
-        Get Pokémon data by ID, with Redis caching
+        Get Pokémon data by ID, with in-process or Redis caching
         """
+        if self._local is not None:
+            if self._snapshot_path:
+                self._load_snapshot()
+            cached = self._local.get(pokemon_id)
+            if cached:
+                CACHE_REQUESTS.inc("pokemon_local", "hit")
+                return cached
+            CACHE_REQUESTS.inc("pokemon_local", "miss")
+        
         # Check cache first (if Redis is available)
         cache_key = f"pokemon:{pokemon_id}"
         try:
             cached_data = await redis_service.get(cache_key)
             if cached_data:
+                CACHE_REQUESTS.inc("pokemon_redis", "hit")
                 if isinstance(cached_data, str):
-                    return PokemonData(**json.loads(cached_data))
-                return PokemonData(**cached_data)
+                    cached_data = json.loads(cached_data)
+                return self._trusted(cached_data)
+            CACHE_REQUESTS.inc("pokemon_redis", "miss")
         except Exception as e:
-            print(f"Redis cache read failed: {e}")
+            logger.warning("Redis cache read failed", extra={"pokemon_id": pokemon_id, "error": str(e)})
         
         # Fetch from PokéAPI
         pokemon_data = await self._fetch_from_pokeapi(pokemon_id)
+        if self._local is not None:
+            self._local[pokemon_id] = pokemon_data
         
         # Cache the result (if Redis is available)
         try:
@@ -63,66 +137,143 @@ class PokemonService:
                 ttl=self.cache_ttl
             )
         except Exception as e:
-            print(f"Redis cache write failed: {e}")
+            logger.warning("Redis cache write failed", extra={"pokemon_id": pokemon_id, "error": str(e)})
         
         return pokemon_data
 
+    def _trusted(self, data: Dict) -> PokemonData:
+        """Rebuild a PokemonData that was validated before it was cached, skipping validation"""
+        return PokemonData.model_construct(**{
+            **data,
+            "stats": PokemonStats.model_construct(**data["stats"]),
+            "rarity": Rarity(data["rarity"]),
+        })
+
+    async def get_pokemon_json(self, pokemon_id: int) -> Tuple[bytes, str]:
+        """
+        Pokémon data by ID as ready-to-send JSON bytes, with its strong ETag
+
+        Serialized once per species and kept in process for POKEMON_CACHE_TTL,
+        so repeat responses skip model validation and encoding entirely.
+        """
+        entry = self._json_cache.get(pokemon_id)
+        if entry and entry[0] > time.monotonic():
+            CACHE_REQUESTS.inc("pokemon_body", "hit")
+            return entry[1], entry[2]
+        CACHE_REQUESTS.inc("pokemon_body", "miss")
+        
+        pokemon = await self.get_pokemon(pokemon_id)
+        body = orjson.dumps(pokemon.model_dump(mode="json"))
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._json_cache[pokemon_id] = (time.monotonic() + self.cache_ttl, body, etag)
+        return body, etag
+
+    def cached_etag(self, pokemon_id: int) -> Optional[str]:
+        """ETag of a species body already serialized in this process, without any lookup"""
+        entry = self._json_cache.get(pokemon_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[2]
+        return None
+
+    def _list_etag(self, etags: List[str]) -> str:
+        # A list body is fully determined by its members' bodies, so hash their ETags
+        return f'"{hashlib.sha256(",".join(etags).encode()).hexdigest()[:32]}"'
+
+    def cached_list_etag(self, pokemon_ids: List[int]) -> Optional[str]:
+        """ETag of a list body when every member is already serialized in this process"""
+        etags = [self.cached_etag(pokemon_id) for pokemon_id in pokemon_ids]
+        if None in etags:
+            return None
+        return self._list_etag(etags)
+
+    async def get_list_json(self, pokemon_ids: List[int], key: str) -> Tuple[bytes, Optional[str]]:
+        """
+        {key: [...]} as JSON bytes built from the per-species bodies, with its ETag
+
+        Species that fail to fetch are left out and the ETag is None, so a
+        partial body is never cached; raises if none of them could be fetched.
+        """
+        bodies, etags = [], []
+        error = None
+        for pokemon_id in pokemon_ids:
+            try:
+                body, etag = await self.get_pokemon_json(pokemon_id)
+            except Exception as e:
+                logger.warning("Error fetching Pokémon", extra={"pokemon_id": pokemon_id, "error": str(e)})
+                error = e
+                continue
+            bodies.append(body)
+            etags.append(etag)
+        if error is not None and not bodies:
+            raise error
+        body = b'{"' + key.encode() + b'":[' + b",".join(bodies) + b"]}"
+        return body, self._list_etag(etags) if error is None else None
+
     async def _fetch_from_pokeapi(self, pokemon_id: int) -> PokemonData:
         """
         Fetch Pokémon data from PokéAPI
         """
-        async with httpx.AsyncClient() as client:
-            # Fetch Pokémon data
-            response = await client.get(f"{self.base_url}/pokemon/{pokemon_id}")
-            response.raise_for_status()
-            data = response.json()
+        with upstream_timer("pokeapi"), tracer.span("pokeapi.fetch", kind="client", pokemon_id=pokemon_id):
+            if self._client is not None:
+                return await self._fetch_with(self._client, pokemon_id)
             
-            # Fetch species data for additional info
-            species_response = await client.get(data['species']['url'])
-            species_response.raise_for_status()
-            species_data = species_response.json()
+            import httpx  # Deferred: only cache misses need it
             
-            # Extract stats
-            stats = PokemonStats(
-                hp=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'hp'),
-                attack=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'attack'),
-                defense=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'defense'),
-                speed=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'speed')
-            )
-            
-            # Extract types
-            types = [t['type']['name'] for t in data['types']]
-            
-            # Get sprites (both static and animated)
-            sprites_data = data['sprites']
-            
-            # Try to get animated sprite first (GIF), fallback to static
-            sprite = (
-                sprites_data.get('versions', {}).get('generation-v', {}).get('black-white', {}).get('animated', {}).get('front_default') or
-                sprites_data.get('front_default') or
-                sprites_data.get('other', {}).get('official-artwork', {}).get('front_default')
-            )
-            
-            # Get back sprite for battles (also try animated)
-            back_sprite = (
-                sprites_data.get('versions', {}).get('generation-v', {}).get('black-white', {}).get('animated', {}).get('back_default') or
-                sprites_data.get('back_default')
-            )
-            
-            # Determine rarity
-            rarity = self._determine_rarity(pokemon_id)
-            
-            return PokemonData(
-                id=pokemon_id,
-                name=data['name'].capitalize(),
-                types=types,
-                stats=stats,
-                sprite=sprite,
-                back_sprite=back_sprite,
-                rarity=rarity
-            )
+            async with httpx.AsyncClient() as client:
+                return await self._fetch_with(client, pokemon_id)
+
+    async def _fetch_with(self, client, pokemon_id: int) -> PokemonData:
+        # Fetch Pokémon data
+        response = await client.get(f"{self.base_url}/pokemon/{pokemon_id}")
+        response.raise_for_status()
+        data = response.json()
+        
+        # Fetch species data for additional info
+        species_response = await client.get(data['species']['url'])
+        species_response.raise_for_status()
+        species_data = species_response.json()
+        
+        # Extract stats
+        stats = PokemonStats(
+            hp=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'hp'),
+            attack=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'attack'),
+            defense=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'defense'),
+            speed=next(s['base_stat'] for s in data['stats'] if s['stat']['name'] == 'speed')
+        )
+        
+        # Extract types
+        types = [t['type']['name'] for t in data['types']]
+        
+        # Get sprites (both static and animated)
+        sprites_data = data['sprites']
+        
+        # Try to get animated sprite first (GIF), fallback to static
+        sprite = (
+            sprites_data.get('versions', {}).get('generation-v', {}).get('black-white', {}).get('animated', {}).get('front_default') or
+            sprites_data.get('front_default') or
+            sprites_data.get('other', {}).get('official-artwork', {}).get('front_default')
+        )
+        
+        # Get back sprite for battles (also try animated)
+        back_sprite = (
+            sprites_data.get('versions', {}).get('generation-v', {}).get('black-white', {}).get('animated', {}).get('back_default') or
+            sprites_data.get('back_default')
+        )
+        
+        # Determine rarity
+        rarity = self.determine_rarity(pokemon_id)
+        
+        return PokemonData(
+            id=pokemon_id,
+            name=data['name'].capitalize(),
+            types=types,
+            stats=stats,
+            sprite=sprite,
+            back_sprite=back_sprite,
+            rarity=rarity
+        )
 
-    def _determine_rarity(self, pokemon_id: int) -> Rarity:
+    def determine_rarity(self, pokemon_id: int) -> Rarity:
         """
         Determine Pokémon rarity based on ID
         """
@@ -140,15 +291,18 @@ class PokemonService:
         Get a random Pokémon with optional rarity filter
         Uses weighted random selection if no rarity specified
         """
+        return await self.get_pokemon(self.random_pokemon_id(rarity))
+
+    def random_pokemon_id(self, rarity: Optional[Rarity] = None) -> int:
+        """
+        Pick a random Pokémon ID with optional rarity filter
+        Uses weighted random selection if no rarity specified
+        """
         if rarity:
             # Get random Pokémon of specific rarity
-            pokemon_id = self._get_random_id_by_rarity(rarity)
-        else:
-            # Weighted random selection
-            rarity = self._weighted_random_rarity()
-            pokemon_id = self._get_random_id_by_rarity(rarity)
-        
-        return await self.get_pokemon(pokemon_id)
+            return self._get_random_id_by_rarity(rarity)
+        # Weighted random selection
+        return self._get_random_id_by_rarity(self._weighted_random_rarity())
 
     def _weighted_random_rarity(self) -> Rarity:
         """
@@ -198,7 +352,7 @@ class PokemonService:
                 pokemon = await self.get_pokemon(starter_id)
                 starters.append(pokemon)
             except Exception as e:
-                print(f"Error fetching starter {starter_id}: {e}")
+                logger.warning("Error fetching starter", extra={"pokemon_id": starter_id, "error": str(e)})
                 continue
         
         return starters
@@ -208,7 +362,7 @@ class PokemonService:
         Pre-fetch and cache all Generation 1 Pokémon (1-151)
         Called on startup to warm up the cache
         """
-        print("🔄 Pre-fetching Generation 1 Pokémon...")
+        logger.info("🔄 Pre-fetching Generation 1 Pokémon...")
         success_count = 0
         
         for pokemon_id in range(1, 152):
@@ -216,11 +370,11 @@ class PokemonService:
                 await self.get_pokemon(pokemon_id)
                 success_count += 1
                 if success_count % 10 == 0:
-                    print(f"   Cached {success_count}/151 Pokémon...")
+                    logger.info(f"Cached {success_count}/151 Pokémon...")
             except Exception as e:
-                print(f"   Failed to cache Pokémon {pokemon_id}: {e}")
+                logger.warning("Failed to cache Pokémon", extra={"pokemon_id": pokemon_id, "error": str(e)})
         
-        print(f"✅ Pre-fetched {success_count}/151 Pokémon")
+        logger.info(f"✅ Pre-fetched {success_count}/151 Pokémon")
 
     async def calculate_capture_rate(
         self, 
@@ -256,3 +410,17 @@ class PokemonService:
 
 # Global instance
 pokemon_service = PokemonService()
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Write the Pokémon snapshot the serverless profile starts from")
+    parser.add_argument("path", nargs="?", default=settings.POKEMON_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    from services.log_pipeline import log_pipeline
+
+    log_pipeline.setup(queued=False)
+    print(f"Wrote {asyncio.run(pokemon_service.write_snapshot(args.path))} Pokémon to {args.path}")
@@ -0,0 +1,245 @@
+"""
+Profiler Service - Low-overhead stack sampling of the live worker, exported for speedscope or flamegraph.pl
+"""
+import asyncio
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+Frame = Tuple[str, str, int]  # (qualified name, file, first line)
+
+FORMATS = ("speedscope", "collapsed")
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """True if token is the configured ADMIN_API_TOKEN (admin access is off while it is unset)"""
+    return bool(settings.ADMIN_API_TOKEN) and bool(token) and secrets.compare_digest(token, settings.ADMIN_API_TOKEN)
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread
+
+    Every interval the sampler reads the target thread's current frame
+    (sys._current_frames) and counts the stack. Nothing is installed in the
+    profiled code, so the cost is one stack walk per sample, independent of
+    how many calls the code makes. With a task, only samples taken while
+    that asyncio task is running on the loop are kept.
+    """
+
+    # The sampler thread only runs when the busy thread hands over the GIL,
+    # every sys.getswitchinterval() (5ms by default): shorten that while sampling
+    _active = 0
+    _saved_switch_interval = 0.0
+    _switch_lock = threading.Lock()
+
+    def __init__(
+        self,
+        thread_id: int,
+        interval: float,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        task: Optional[asyncio.Task] = None
+    ):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.loop = loop
+        self.task = task
+        self.stacks: Counter = Counter()
+        self.started = 0.0
+        self.stopped = 0.0
+        self._codes: Dict[Any, Frame] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _frame(self, code) -> Frame:
+        frame = self._codes.get(code)
+        if frame is None:
+            frame = self._codes[code] = (code.co_qualname, code.co_filename, code.co_firstlineno)
+        return frame
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.task is not None and asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+
+    def start(self):
+        with StackSampler._switch_lock:
+            if StackSampler._active == 0:
+                StackSampler._saved_switch_interval = sys.getswitchinterval()
+            StackSampler._active += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+        with StackSampler._switch_lock:
+            StackSampler._active -= 1
+            if StackSampler._active == 0:
+                sys.setswitchinterval(StackSampler._saved_switch_interval)
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+
+def to_speedscope(sampler: StackSampler, name: str) -> Dict[str, Any]:
+    """The samples as a speedscope sampled profile (https://www.speedscope.app)"""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[Dict[str, Any]] = []
+    samples, weights = [], []
+    for stack, count in sampler.stacks.most_common():
+        indices = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            indices.append(frame_index[frame])
+        samples.append(indices)
+        weights.append(round(count * sampler.interval, 6))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "pokechain-profiler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 6),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def to_collapsed(sampler: StackSampler) -> str:
+    """The samples as collapsed stacks, the input format of flamegraph.pl and inferno"""
+    lines = []
+    for stack, count in sampler.stacks.most_common():
+        names = (f"{frame[0]} ({frame[1]}:{frame[2]})".replace(";", ":") for frame in stack)
+        lines.append(f"{';'.join(names)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class ProfilerUnavailableError(RuntimeError):
+    """Raised when a worker-wide profile is requested while another one is running"""
+
+
+class ProfilerService:
+    """
+    On-demand sampling of the event loop thread of this worker process
+
+    profile_for samples the whole worker while it keeps serving traffic.
+    Single requests are profiled by ProfilerMiddleware; their profiles are
+    kept in memory (the most recent PROFILER_KEEP_REQUESTS) under an id
+    returned in the X-Profile-Id response header.
+    """
+
+    def __init__(self):
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.request_interval = settings.PROFILER_REQUEST_INTERVAL_MS / 1000
+        self.max_seconds = settings.PROFILER_MAX_SECONDS
+        self._running = False
+        self._request_profiles: "OrderedDict[str, Tuple[str, StackSampler]]" = OrderedDict()
+
+    async def profile_for(self, seconds: float) -> Tuple[str, StackSampler]:
+        """Sample the event loop thread for the given number of seconds"""
+        if self._running:
+            raise ProfilerUnavailableError("A profile is already running on this worker")
+        seconds = min(max(seconds, self.interval), self.max_seconds)
+        self._running = True
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+            self._running = False
+        return f"worker {seconds:g}s", sampler
+
+    def start_request(self) -> StackSampler:
+        """Sampler for the calling request's task only"""
+        sampler = StackSampler(
+            threading.get_ident(), self.request_interval, asyncio.get_running_loop(), asyncio.current_task()
+        )
+        sampler.start()
+        return sampler
+
+    def save_request(self, profile_id: str, name: str, sampler: StackSampler):
+        self._request_profiles[profile_id] = (name, sampler)
+        while len(self._request_profiles) > settings.PROFILER_KEEP_REQUESTS:
+            self._request_profiles.popitem(last=False)
+
+    def get_request_profile(self, profile_id: str) -> Optional[Tuple[str, StackSampler]]:
+        return self._request_profiles.get(profile_id)
+
+    def render(self, name: str, sampler: StackSampler, fmt: str):
+        """speedscope JSON (dict) or collapsed stacks (str)"""
+        if fmt == "collapsed":
+            return to_collapsed(sampler)
+        return to_speedscope(sampler, name)
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling single requests
+
+    A request with "X-Profile: 1" and a valid X-Admin-Token is sampled
+    while its task runs; the response carries X-Profile-Id, to fetch the
+    profile from /api/admin/profile/{id}. Other requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1" or not admin_token_valid(
+            headers.get(b"x-admin-token", b"").decode("latin-1")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = profiler_service.start_request()
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            profiler_service.save_request(profile_id, f"{scope['method']} {scope['path']}", sampler)
+
+
+# Global instance
+profiler_service = ProfilerService()
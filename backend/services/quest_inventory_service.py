@@ -0,0 +1,216 @@
+"""
+Quest Inventory Service - Pre-generates quests per (level band, team types) bucket in Redis
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import logging
+from typing import List, Dict, Any, Optional
+
+from config import settings
+from services.redis_service import redis_service
+from services.gemini_service import gemini_service
+from services.matchmaking_service import LEASE_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+
+class QuestInventoryService:
+    """
+    Keeps a pool of AI-generated quest drafts per bucket
+
+    Quests only depend on the player's level band and team types, so drafts
+    are shared by every player in a bucket. Each player has a seen-set so
+    nobody is handed the same draft twice; misses fall back to live generation.
+    The refill loop runs on one worker at a time (the holder of a Redis
+    lease), so the Gemini quota reserve is measured against a single
+    refiller's limiter rather than spent once per worker.
+    """
+
+    def __init__(self):
+        self.band_size = settings.QUEST_INVENTORY_LEVEL_BAND
+        self.pool_size = settings.QUEST_INVENTORY_POOL_SIZE
+        self.refill_interval = settings.QUEST_INVENTORY_REFILL_INTERVAL
+        self.quota_reserve = settings.QUEST_INVENTORY_QUOTA_RESERVE
+        self.demand_window = settings.QUEST_INVENTORY_DEMAND_WINDOW
+        self.seen_ttl = 30 * 86400  # 30 days
+        self.lease_key = "quest_inventory:refiller"
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_ms = max(5000, self.refill_interval * 3000)
+        self._script_client = None
+        self._lease_script = None
+        self._refill_task: Optional[asyncio.Task] = None
+
+    def bucket_for(self, player_team: List[Dict[str, Any]], player_level: int) -> str:
+        """Bucket key for a player: level band plus sorted team types"""
+        band = (max(1, player_level) - 1) // self.band_size
+        types = sorted({t.lower() for pokemon in player_team for t in pokemon.get('types', [])})
+        return f"{band}:{'-'.join(types) or 'none'}"
+
+    async def take(self, bucket: str, player_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Hand out a pre-generated draft the player has not seen yet
+
+        Returns None on a miss (empty pool, everything seen, or no Redis).
+        """
+        client = redis_service.client
+        if not client:
+            return None
+
+        try:
+            await client.zadd("quest_inventory:demand", {bucket: time.time()})
+            pool = await client.lrange(f"quest_inventory:pool:{bucket}", 0, -1)
+            drafts = [json.loads(raw) for raw in pool]
+
+            if drafts and player_id:
+                seen_key = f"quest_inventory:seen:{player_id}"
+                seen = await client.smismember(seen_key, [d["draft_id"] for d in drafts])
+                drafts = [d for d, was_seen in zip(drafts, seen) if not was_seen]
+
+            if not drafts:
+                await client.hincrby("quest_inventory:misses", bucket, 1)
+                return None
+
+            draft = drafts[0]
+            if player_id:
+                await self.mark_seen(player_id, draft["draft_id"])
+            return draft
+        except Exception as e:
+            logger.warning(f"Quest inventory read failed for {bucket}: {e}")
+            return None
+
+    async def add(self, bucket: str, quest_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a generated quest to a bucket's pool, evicting the oldest past pool_size"""
+        draft = {**quest_data, "draft_id": str(uuid.uuid4())}
+        client = redis_service.client
+        if not client:
+            return draft
+
+        key = f"quest_inventory:pool:{bucket}"
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.lpush(key, json.dumps(draft))
+                pipe.ltrim(key, 0, self.pool_size - 1)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Quest inventory write failed for {bucket}: {e}")
+        return draft
+
+    async def mark_seen(self, player_id: str, draft_id: str):
+        """Record that a player has been handed a draft"""
+        client = redis_service.client
+        if not client:
+            return
+
+        seen_key = f"quest_inventory:seen:{player_id}"
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.sadd(seen_key, draft_id)
+                pipe.expire(seen_key, self.seen_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Quest inventory seen-set write failed for {player_id}: {e}")
+
+    async def refill_once(self) -> int:
+        """
+        Generate drafts for recently requested buckets while quota allows
+
+        Buckets with misses come first, then the emptiest pools. Stops early
+        if this worker loses the refill lease. Returns the number of drafts
+        generated.
+        """
+        client = redis_service.client
+        if not client:
+            return 0
+
+        since = time.time() - self.demand_window
+        await client.zremrangebyscore("quest_inventory:demand", "-inf", since)
+        buckets = await client.zrange("quest_inventory:demand", 0, -1)
+        if not buckets:
+            return 0
+
+        misses = await client.hgetall("quest_inventory:misses")
+        async with client.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.llen(f"quest_inventory:pool:{bucket}")
+            sizes = await pipe.execute()
+
+        # Drafts wanted per bucket; buckets with misses need fresh drafts even when full
+        candidates = sorted(
+            (-int(misses.get(bucket, 0)), size, bucket) for bucket, size in zip(buckets, sizes)
+        )
+        needs = {}
+        for missed, size, bucket in candidates:
+            wanted = max(self.pool_size - size, 1 if missed else 0)
+            if wanted > 0:
+                needs[bucket] = wanted
+
+        # Round-robin so every bucket gets something before any bucket is full
+        generated = 0
+        while needs:
+            for bucket in list(needs):
+                if gemini_service.rate_limiter.available() <= self.quota_reserve or not await self.hold_lease():
+                    needs.clear()
+                    break
+                quest_data = await gemini_service.generate_quest(*self._sample_request(bucket))
+                if quest_data is None:
+                    del needs[bucket]
+                    continue
+                await self.add(bucket, quest_data)
+                await client.hdel("quest_inventory:misses", bucket)
+                generated += 1
+                needs[bucket] -= 1
+                if needs[bucket] <= 0:
+                    del needs[bucket]
+
+        if generated:
+            logger.info(f"Quest inventory refilled {generated} drafts")
+        return generated
+
+    def _sample_request(self, bucket: str):
+        """Representative (player_team, player_level) for generating a bucket's quests"""
+        band, types = bucket.split(":", 1)
+        team = [] if types == "none" else [{"types": [t]} for t in types.split("-")]
+        level = int(band) * self.band_size + (self.band_size + 1) // 2
+        return team, level
+
+    async def hold_lease(self) -> bool:
+        """Take or renew the refill lease; True while this worker holds it"""
+        client = redis_service.client
+        if not client:
+            return False
+        if self._script_client is not client:
+            self._script_client = client
+            self._lease_script = client.register_script(LEASE_SCRIPT)
+        return bool(await self._lease_script(keys=[self.lease_key], args=[self.worker_id, self.lease_ms]))
+
+    async def _refill_loop(self):
+        while True:
+            try:
+                if await self.hold_lease():
+                    await self.refill_once()
+            except Exception as e:
+                logger.error(f"Quest inventory refill failed: {e}")
+            await asyncio.sleep(self.refill_interval)
+
+    def start(self):
+        """Start the background refill loop"""
+        if self._refill_task is None:
+            self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Stop the background refill loop"""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+
+# Global instance
+quest_inventory_service = QuestInventoryService()
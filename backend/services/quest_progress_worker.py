@@ -0,0 +1,58 @@
+"""
+Quest Progress Worker - Folds gameplay events from the Redis Stream into stored quest progress
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from models.quest import ObjectiveType
+from services.quest_store import quest_store
+from services.stream_consumer import StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+
+class QuestProgressWorker(StreamConsumer):
+    """
+    Applies battle/capture events to every matching active quest and daily challenge
+
+    Events are grouped per (player, action) so each pair costs one store
+    update per batch. Entries are acknowledged only after their progress is
+    stored, so anything in flight when a worker dies is picked up again; the
+    store skips entry IDs it has already applied, so a redelivered entry is
+    never counted twice.
+    """
+
+    group = "quest-progress"
+
+    async def handle_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        grouped: Dict[Tuple[str, str], List[Tuple[str, int]]] = defaultdict(list)
+        malformed: List[str] = []
+        for entry_id, fields in entries:
+            try:
+                key = (fields["player_id"], ObjectiveType(fields["action"]).value)
+                grouped[key].append((entry_id, int(fields.get("increment", 1))))
+            except (KeyError, ValueError):
+                malformed.append(entry_id)
+
+        keys = list(grouped)
+        results = await asyncio.gather(
+            *[
+                quest_store.apply_progress(player_id, ObjectiveType(action), entries=grouped[(player_id, action)])
+                for player_id, action in keys
+            ],
+            return_exceptions=True
+        )
+
+        ack_ids = list(malformed)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to apply {key[1]} progress for {key[0]}: {result}")
+                continue
+            ack_ids.extend(entry_id for entry_id, _ in grouped[key])
+        return ack_ids
+
+
+# Global instance
+quest_progress_worker = QuestProgressWorker()
@@ -2,7 +2,8 @@
 Quest Service - Handles quest generation, tracking, and daily challenges
 """
 import uuid
-from datetime import datetime, timedelta
+import hashlib
+from datetime import datetime, timedelta, timezone, date
 from typing import List, Dict, Any, Optional
 import logging
 import random
@@ -17,11 +18,15 @@ from models.quest import (
     QuestGenerationRequest
 )
 from services.gemini_service import gemini_service
+from services.quest_inventory_service import quest_inventory_service
+from services.log_pipeline import sampled
+from config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Namespace for deterministic daily challenge IDs
+DAILY_CHALLENGE_NAMESPACE = uuid.UUID("5c0f5a43-3d1e-4f7b-9a8e-2b6f0e7d9c11")
+
 
 class QuestService:
     """Service for managing quests and daily challenges"""
@@ -32,60 +37,75 @@ class QuestService:
     async def generate_quest(
         self,
         player_team: List[Dict[str, Any]],
-        player_level: int = 1
+        player_level: int = 1,
+        player_id: Optional[str] = None
     ) -> Quest:
         """
-        Generate a personalized quest using Gemini AI
+        Generate a personalized quest, served from the pre-generated inventory when possible
         
         Args:
             player_team: List of player's Pokémon
             player_level: Player's current level
+            player_id: Optional player ID, used to avoid repeating quests
             
         Returns:
             Quest object with AI-generated content
         """
         try:
-            # Use Gemini to generate quest
-            quest_data = await gemini_service.generate_quest(player_team, player_level)
-            
-            # Create quest ID
-            quest_id = str(uuid.uuid4())
-            
-            # Parse objective
-            objective = QuestObjective(
-                type=ObjectiveType(quest_data.get('objective_type', 'battle')),
-                target=quest_data.get('objective_target', 3),
-                current=0,
-                description=quest_data.get('description', '')
-            )
-            
-            # Parse reward
-            reward_type = RewardType(quest_data.get('reward_type', 'tokens'))
-            reward = QuestReward(
-                type=reward_type,
-                amount=quest_data.get('reward_amount') if reward_type == RewardType.TOKENS else None,
-                pokemon_id=quest_data.get('reward_amount') if reward_type == RewardType.POKEMON else None
-            )
-            
-            # Quest expires in 7 days
-            expires_at = datetime.now() + timedelta(days=7)
-            
-            quest = Quest(
-                id=quest_id,
-                title=quest_data.get('title', 'Training Challenge'),
-                description=quest_data.get('description', 'Complete this quest to earn rewards!'),
-                objectives=[objective],
-                rewards=reward,
-                expires_at=expires_at
-            )
-            
-            logger.info(f"Generated quest: {quest.title} (ID: {quest_id})")
-            return quest
+            bucket = quest_inventory_service.bucket_for(player_team, player_level)
+            quest_data = await quest_inventory_service.take(bucket, player_id)
+
+            if quest_data is None:
+                # Inventory miss: generate live and share the result with the bucket
+                quest_data = await gemini_service.generate_quest(player_team, player_level)
+                if quest_data is None:
+                    return self._create_fallback_quest()
+                draft = await quest_inventory_service.add(bucket, quest_data)
+                if player_id:
+                    await quest_inventory_service.mark_seen(player_id, draft["draft_id"])
+
+            return self._quest_from_draft(quest_data)
             
         except Exception as e:
             logger.error(f"Error generating quest: {str(e)}")
             # Return fallback quest
             return self._create_fallback_quest()
+
+    def _quest_from_draft(self, quest_data: Dict[str, Any]) -> Quest:
+        """Build a new Quest instance from a flat AI quest draft"""
+        # Create quest ID
+        quest_id = str(uuid.uuid4())
+        
+        # Parse objective
+        objective = QuestObjective(
+            type=ObjectiveType(quest_data.get('objective_type', 'battle')),
+            target=quest_data.get('objective_target', 3),
+            current=0,
+            description=quest_data.get('description', '')
+        )
+        
+        # Parse reward
+        reward_type = RewardType(quest_data.get('reward_type', 'tokens'))
+        reward = QuestReward(
+            type=reward_type,
+            amount=quest_data.get('reward_amount') if reward_type == RewardType.TOKENS else None,
+            pokemon_id=quest_data.get('reward_amount') if reward_type == RewardType.POKEMON else None
+        )
+        
+        # Quest expires in 7 days
+        expires_at = datetime.now() + timedelta(days=7)
+        
+        quest = Quest(
+            id=quest_id,
+            title=quest_data.get('title', 'Training Challenge'),
+            description=quest_data.get('description', 'Complete this quest to earn rewards!'),
+            objectives=[objective],
+            rewards=reward,
+            expires_at=expires_at
+        )
+        
+        logger.info("Generated quest", extra=sampled(title=quest.title, quest_id=quest_id))
+        return quest
     
     def _create_fallback_quest(self) -> Quest:
         """Create a simple fallback quest when AI generation fails"""
@@ -116,17 +136,28 @@ class QuestService:
     
     async def generate_daily_challenges(
         self,
-        player_level: int = 1
+        player_level: int = 1,
+        player_id: Optional[str] = None,
+        day: Optional[date] = None
     ) -> List[DailyChallenge]:
         """
         Generate 3 daily challenges with varying difficulty
         
+        The set is derived deterministically from (player, UTC date, level band),
+        so every worker returns the same challenges and IDs for the whole day.
+        
         Args:
             player_level: Player's current level
+            player_id: Player the challenges are for (anonymous if omitted)
+            day: UTC date (defaults to today)
             
         Returns:
             List of 3 daily challenges
         """
+        day = day or datetime.now(timezone.utc).date()
+        band = (max(1, player_level) - 1) // settings.QUEST_INVENTORY_LEVEL_BAND
+        seed_key = f"{player_id or ''}:{day.isoformat()}:{band}"
+        rng = random.Random(int.from_bytes(hashlib.sha256(seed_key.encode()).digest()[:8], "big"))
         challenges = []
         
         # Challenge templates based on difficulty
@@ -182,12 +213,12 @@ class QuestService:
         ]
         
         # Select one from each difficulty
-        easy = random.choice(easy_challenges)
-        medium = random.choice(medium_challenges)
-        hard = random.choice(hard_challenges)
+        easy = rng.choice(easy_challenges)
+        medium = rng.choice(medium_challenges)
+        hard = rng.choice(hard_challenges)
         
-        for challenge_data in [easy, medium, hard]:
-            challenge_id = str(uuid.uuid4())
+        for slot, challenge_data in enumerate([easy, medium, hard]):
+            challenge_id = str(uuid.uuid5(DAILY_CHALLENGE_NAMESPACE, f"{seed_key}:{slot}"))
             
             reward = QuestReward(
                 type=RewardType.TOKENS,
@@ -197,6 +228,7 @@ class QuestService:
             challenge = DailyChallenge(
                 id=challenge_id,
                 description=challenge_data['description'],
+                type=challenge_data['type'],
                 progress=0,
                 target=challenge_data['target'],
                 reward=reward
@@ -239,7 +271,7 @@ class QuestService:
         for objective in quest.objectives:
             if objective.type == action_type and objective.current < objective.target:
                 objective.current = min(objective.current + increment, objective.target)
-                logger.info(f"Quest {quest.id} progress: {objective.current}/{objective.target}")
+                logger.info("Quest progress", extra=sampled(quest_id=quest.id, current=objective.current, target=objective.target))
         
         return quest
     
@@ -259,7 +291,7 @@ class QuestService:
             Updated challenge
         """
         challenge.progress = min(challenge.progress + increment, challenge.target)
-        logger.info(f"Challenge {challenge.id} progress: {challenge.progress}/{challenge.target}")
+        logger.info("Challenge progress", extra=sampled(challenge_id=challenge.id, progress=challenge.progress, target=challenge.target))
         return challenge
     
     def is_challenge_completed(self, challenge: DailyChallenge) -> bool:
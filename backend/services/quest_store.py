@@ -0,0 +1,309 @@
+"""
+Quest Store - Redis-backed active quests and daily challenges with server-side progress
+"""
+import asyncio
+import json
+import time
+import logging
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import settings
+from models.quest import Quest, DailyChallenge, ObjectiveType
+from services.redis_service import redis_service
+from services.log_pipeline import sampled
+
+logger = logging.getLogger(__name__)
+
+# Folds one action into every matching item of a player's hash, in place.
+# KEYS[1]: player's quests or challenges hash
+# KEYS[2] (optional): sorted set of stream entry IDs already applied to it
+# ARGV[1]: action type, ARGV[2]: increment, ARGV[3]: "quest" or "challenge"
+# With KEYS[2]: ARGV[4]: prune IDs scored below (ms), ARGV[5]: set TTL (s),
+# ARGV[6..]: entry ID, increment pairs; ARGV[2] is ignored and only entries
+# not applied before count, so redelivered stream entries are not counted twice
+PROGRESS_SCRIPT = """
+local action = ARGV[1]
+local increment = tonumber(ARGV[2])
+if KEYS[2] then
+  redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[4])
+  increment = 0
+  for i = 6, #ARGV, 2 do
+    local entry_ms = tonumber(string.match(ARGV[i], '^%d+'))
+    if redis.call('ZADD', KEYS[2], 'NX', entry_ms, ARGV[i]) == 1 then
+      increment = increment + tonumber(ARGV[i + 1])
+    end
+  end
+  redis.call('EXPIRE', KEYS[2], ARGV[5])
+  if increment == 0 then
+    return {}
+  end
+end
+local updated = {}
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+  local item = cjson.decode(entries[i + 1])
+  local changed = false
+  if ARGV[3] == 'quest' then
+    for _, objective in ipairs(item['objectives']) do
+      if objective['type'] == action and objective['current'] < objective['target'] then
+        objective['current'] = math.min(objective['current'] + increment, objective['target'])
+        changed = true
+      end
+    end
+  elseif item['type'] == action and item['progress'] < item['target'] then
+    item['progress'] = math.min(item['progress'] + increment, item['target'])
+    changed = true
+  end
+  if changed then
+    local encoded = cjson.encode(item)
+    redis.call('HSET', KEYS[1], entries[i], encoded)
+    table.insert(updated, encoded)
+  end
+end
+return updated
+"""
+
+# Moves a finished quest from the active hash to the completed hash.
+# KEYS[1]: active quests hash, KEYS[2]: completed quests hash
+# ARGV[1]: quest ID
+COMPLETE_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+  local done = redis.call('HGET', KEYS[2], ARGV[1])
+  if done then
+    return {'already_completed', done}
+  end
+  return {'not_found', ''}
+end
+local quest = cjson.decode(raw)
+for _, objective in ipairs(quest['objectives']) do
+  if objective['current'] < objective['target'] then
+    return {'incomplete', raw}
+  end
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], raw)
+return {'completed', raw}
+"""
+
+
+class QuestStoreUnavailableError(RuntimeError):
+    """Raised when quest persistence is requested without a Redis connection"""
+
+
+class QuestStore:
+    """
+    Stores each player's active quests and daily challenges in Redis hashes
+
+    Expiry is tracked in one sorted set scored by expires_at, with members of
+    the form "<hash key>|<item id>", and cleared by a background reaper.
+    Progress updates run as a Lua script over the player's hash, so they cost
+    O(active quests) and never send whole quests between client and server.
+    """
+
+    def __init__(self):
+        self.expiry_key = "quest_store:expiry"
+        self.completed_ttl = 30 * 86400  # 30 days
+        self.applied_window = 86400  # How long applied stream entry IDs are remembered
+        self.reaper_interval = settings.QUEST_REAPER_INTERVAL
+        self._script_client = None
+        self._progress_script = None
+        self._complete_script = None
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    def _quests_key(self, player_id: str) -> str:
+        return f"quest_store:{{{player_id}}}:quests"
+
+    def _challenges_key(self, player_id: str) -> str:
+        return f"quest_store:{{{player_id}}}:challenges"
+
+    def _completed_key(self, player_id: str) -> str:
+        return f"quest_store:{{{player_id}}}:completed"
+
+    def _applied_key(self, items_key: str) -> str:
+        return f"{items_key}:applied"
+
+    def _client(self):
+        client = redis_service.client
+        if not client:
+            raise QuestStoreUnavailableError("Quest persistence requires Redis")
+        if self._script_client is not client:
+            self._script_client = client
+            self._progress_script = client.register_script(PROGRESS_SCRIPT)
+            self._complete_script = client.register_script(COMPLETE_SCRIPT)
+        return client
+
+    async def add_quest(self, player_id: str, quest: Quest):
+        """Store a new active quest for a player"""
+        client = self._client()
+        key = self._quests_key(player_id)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, quest.id, quest.model_dump_json())
+            pipe.zadd(self.expiry_key, {f"{key}|{quest.id}": quest.expires_at.timestamp()})
+            await pipe.execute()
+
+    async def get_active_quests(self, player_id: str) -> List[Dict[str, Any]]:
+        client = self._client()
+        entries = await client.hvals(self._quests_key(player_id))
+        return [json.loads(raw) for raw in entries]
+
+    async def set_daily_challenges(
+        self,
+        player_id: str,
+        challenges: List[DailyChallenge],
+        expires_at: datetime
+    ):
+        """
+        Replace a player's daily challenges; they all expire together
+
+        The hash itself also expires at expires_at, so a stored set is
+        always the current one even before the reaper has run.
+        """
+        client = self._client()
+        key = self._challenges_key(player_id)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if challenges:
+                pipe.hset(key, mapping={c.id: c.model_dump_json() for c in challenges})
+                pipe.expireat(key, expires_at)
+                pipe.zadd(
+                    self.expiry_key,
+                    {f"{key}|{c.id}": expires_at.timestamp() for c in challenges}
+                )
+            await pipe.execute()
+
+    async def get_daily_challenges(self, player_id: str) -> List[Dict[str, Any]]:
+        client = self._client()
+        entries = await client.hvals(self._challenges_key(player_id))
+        return [json.loads(raw) for raw in entries]
+
+    async def get_daily_challenge_ids(self, player_id: str) -> List[str]:
+        client = self._client()
+        return await client.hkeys(self._challenges_key(player_id))
+
+    async def apply_progress(
+        self,
+        player_id: str,
+        action_type: ObjectiveType,
+        increment: int = 1,
+        quests: bool = True,
+        challenges: bool = True,
+        entries: Optional[List[Tuple[str, int]]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Add progress for one action to every matching active quest and/or challenge
+
+        entries are the (stream entry ID, increment) pairs being applied, in
+        place of increment: each entry counts at most once per quest/challenge
+        hash within applied_window, so redelivered entries are skipped.
+        Returns only the items that changed, each with a "completed" flag.
+        """
+        self._client()
+        result = {"quests": [], "challenges": []}
+
+        def run(items_key: str, kind: str):
+            if entries is None:
+                return self._progress_script(keys=[items_key], args=[action_type.value, increment, kind])
+            cutoff_ms = int((time.time() - self.applied_window) * 1000)
+            args = [action_type.value, 0, kind, cutoff_ms, self.applied_window]
+            for entry_id, entry_increment in entries:
+                args.extend((entry_id, entry_increment))
+            return self._progress_script(keys=[items_key, self._applied_key(items_key)], args=args)
+
+        if quests:
+            updated = await run(self._quests_key(player_id), "quest")
+            for raw in updated:
+                quest = json.loads(raw)
+                quest["completed"] = all(o["current"] >= o["target"] for o in quest["objectives"])
+                result["quests"].append(quest)
+
+        if challenges:
+            updated = await run(self._challenges_key(player_id), "challenge")
+            for raw in updated:
+                challenge = json.loads(raw)
+                challenge["completed"] = challenge["progress"] >= challenge["target"]
+                result["challenges"].append(challenge)
+
+        if result["quests"] or result["challenges"]:
+            logger.info("Progress recorded", extra=sampled(
+                player_id=player_id,
+                action=action_type.value,
+                increment=increment if entries is None else sum(i for _, i in entries),
+                quests=len(result["quests"]),
+                challenges=len(result["challenges"])
+            ))
+        return result
+
+    async def complete_quest(self, player_id: str, quest_id: str) -> Dict[str, Any]:
+        """
+        Complete a quest whose objectives are all met
+
+        Returns {"status": ..., "quest": ...} where status is one of
+        "completed", "already_completed", "incomplete" or "not_found".
+        """
+        client = self._client()
+        quests_key = self._quests_key(player_id)
+        completed_key = self._completed_key(player_id)
+        status, raw = await self._complete_script(
+            keys=[quests_key, completed_key],
+            args=[quest_id]
+        )
+
+        if status == "completed":
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.zrem(self.expiry_key, f"{quests_key}|{quest_id}")
+                pipe.expire(completed_key, self.completed_ttl)
+                await pipe.execute()
+
+        return {"status": status, "quest": json.loads(raw) if raw else None}
+
+    async def reap_expired(self, batch_size: int = 500) -> int:
+        """Remove expired quests and challenges; returns how many were removed"""
+        client = self._client()
+        removed = 0
+        now = time.time()
+        while True:
+            members = await client.zrangebyscore(self.expiry_key, "-inf", now, start=0, num=batch_size)
+            if not members:
+                break
+            async with client.pipeline(transaction=False) as pipe:
+                for member in members:
+                    key, item_id = member.rsplit("|", 1)
+                    pipe.hdel(key, item_id)
+                pipe.zrem(self.expiry_key, *members)
+                await pipe.execute()
+            removed += len(members)
+            if len(members) < batch_size:
+                break
+
+        if removed:
+            logger.info(f"Reaped {removed} expired quests and challenges")
+        return removed
+
+    async def _reaper_loop(self):
+        while True:
+            try:
+                await self.reap_expired()
+            except Exception as e:
+                logger.error(f"Quest reaper failed: {e}")
+            await asyncio.sleep(self.reaper_interval)
+
+    def start(self):
+        """Start the background expiry reaper"""
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._reaper_loop())
+
+    async def stop(self):
+        """Stop the background expiry reaper"""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+
+# Global instance
+quest_store = QuestStore()
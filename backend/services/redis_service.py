@@ -2,22 +2,26 @@ import redis.asyncio as redis
 import json
 from typing import Optional, Any
 from config import settings
+from services.tracing import tracer
 
 
 class RedisService:
     def __init__(self):
         self.client: Optional[redis.Redis] = None
     
-    async def connect(self):
-        """Connect to Redis"""
-        self.client = redis.Redis(
+    async def connect(self, max_connections: Optional[int] = None):
+        """Connect to Redis, optionally capping the connection pool"""
+        client = redis.Redis(
             host=settings.REDIS_HOST,
             port=settings.REDIS_PORT,
             db=settings.REDIS_DB,
             password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
             decode_responses=True,
+            max_connections=max_connections,
         )
-        await self.client.ping()
+        await client.ping()
+        # Only expose the client once it is reachable, so callers can check `client`
+        self.client = client
     
     async def close(self):
         """Close Redis connection"""
@@ -28,7 +32,8 @@ class RedisService:
         """Check if Redis is connected"""
         try:
             if self.client:
-                await self.client.ping()
+                with tracer.span("redis.PING", kind="client"):
+                    await self.client.ping()
                 return True
         except:
             pass
@@ -39,7 +44,9 @@ class RedisService:
         if not self.client:
             return None
         
-        value = await self.client.get(key)
+        with tracer.span("redis.GET", kind="client", key=key) as span:
+            value = await self.client.get(key)
+            span.set_attribute("hit", value is not None)
         if value:
             try:
                 return json.loads(value)
@@ -55,21 +62,24 @@ class RedisService:
         if isinstance(value, (dict, list)):
             value = json.dumps(value)
         
-        if ttl:
-            await self.client.setex(key, ttl, value)
-        else:
-            await self.client.set(key, value)
+        with tracer.span("redis.SET", kind="client", key=key):
+            if ttl:
+                await self.client.setex(key, ttl, value)
+            else:
+                await self.client.set(key, value)
     
     async def delete(self, key: str):
         """Delete key from Redis"""
         if self.client:
-            await self.client.delete(key)
+            with tracer.span("redis.DEL", kind="client", key=key):
+                await self.client.delete(key)
     
     async def exists(self, key: str) -> bool:
         """Check if key exists in Redis"""
         if not self.client:
             return False
-        return await self.client.exists(key) > 0
+        with tracer.span("redis.EXISTS", kind="client", key=key):
+            return await self.client.exists(key) > 0
 
 
 # Global Redis service instance
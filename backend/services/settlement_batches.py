@@ -0,0 +1,316 @@
+"""
+Settlement Batches - Per-owner batched transactions for state accumulated off-chain
+"""
+import asyncio
+import json
+import time
+import uuid
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+
+from services.redis_service import redis_service
+from services.sui_rpc import sui_rpc, SuiRpcError
+from services.chain_indexer import chain_index_store, nft_from_object, normalize_record
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("pending", "submitted")
+# The node's error for a digest it has never executed
+TX_NOT_FOUND = "Could not find the referenced transaction"
+
+
+class SettlementUnavailableError(RuntimeError):
+    """Raised when off-chain accumulation is used without a Redis connection"""
+
+
+class UnknownNftError(LookupError):
+    """Raised when an NFT is neither in the chain index nor on chain"""
+
+
+class NftOwnershipError(PermissionError):
+    """Raised when an NFT is not owned by the player acting on it (or is listed for sale)"""
+
+
+class SettlementBatcher(ABC):
+    """
+    Base class for services that settle off-chain changes in batches
+
+    Subclasses mark objects dirty per owner and implement build_calls (the
+    Move calls for a set of dirty objects) and on_confirmed. Each owner has
+    at most one open batch: one programmable transaction that the owner's
+    wallet signs and executes, then reports the digest of.
+
+    Batch status: pending (built, waiting for the wallet) -> submitted
+    (digest reported) -> confirmed | failed | rejected | expired. A digest
+    only confirms a batch if its transaction was sent by the batch's owner
+    with exactly the batch's Move calls; otherwise the batch is rejected, as
+    it is when the node has no transaction with that digest once
+    not_found_grace seconds have passed since it was reported. A batch the
+    wallet never executes expires after batch_ttl, and so does a submitted
+    batch whose transaction could not be checked within batch_ttl of being
+    reported. Objects in a failed, rejected or expired batch are marked
+    dirty again.
+    """
+
+    kind = ""  # Short name shown on batches, e.g. "xp"
+    prefix = ""  # Redis key prefix
+
+    def __init__(self, interval: int, batch_ttl: int, max_calls: int):
+        self.interval = interval
+        self.batch_ttl = batch_ttl
+        self.max_calls = max_calls
+        self.not_found_grace = 60  # Seconds a reported digest may take to reach the node
+        self.dirty_owners_key = f"{self.prefix}:dirty_owners"
+        self.open_owners_key = f"{self.prefix}:open_owners"
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def build_calls(
+        self,
+        owner: str,
+        object_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Move calls settling the objects, and the pending amount each call settles"""
+
+    @abstractmethod
+    async def on_confirmed(self, batch: Dict[str, Any]):
+        """Apply a confirmed batch's settled amounts to the off-chain state"""
+
+    def _client(self):
+        client = redis_service.client
+        if not client:
+            raise SettlementUnavailableError(f"{self.kind} settlement requires Redis")
+        return client
+
+    def _dirty_key(self, owner: str) -> str:
+        return f"{self.prefix}:dirty:{owner}"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.prefix}:batch:{batch_id}"
+
+    def _owner_batches_key(self, owner: str) -> str:
+        return f"{self.prefix}:batches:{owner}"
+
+    def _digest_key(self, digest: str) -> str:
+        return f"{self.prefix}:digest:{digest}"
+
+    async def load_nft(self, object_id: str, kind: str, fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """
+        Owner and fields of a Pokémon or Egg NFT, from the chain index or else the node
+
+        Raises UnknownNftError when neither has the NFT with all of fields,
+        so off-chain state is never seeded from made-up values.
+        """
+        nft = await chain_index_store.get_nft(object_id)
+        if nft is None or nft["kind"] != kind or not all(field in nft for field in fields):
+            nft = nft_from_object(await sui_rpc.get_object(object_id))
+        if nft is None or nft["kind"] != kind or not all(field in nft for field in fields):
+            raise UnknownNftError(f"{kind.capitalize()} {object_id} not found on chain")
+        return nft
+
+    async def load_owned_nft(self, object_id: str, kind: str, owner: str, fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """load_nft, raising NftOwnershipError unless owner holds the NFT (not listed for sale)"""
+        nft = await self.load_nft(object_id, kind, fields)
+        if nft["owner"] != owner or nft["listed"]:
+            raise NftOwnershipError(f"{kind.capitalize()} {object_id} is not owned by {owner}")
+        return nft
+
+    def mark_dirty(self, pipe, owner: str, object_id: str):
+        """Queue an object for the owner's next batch (call inside a pipeline)"""
+        pipe.sadd(self._dirty_key(owner), object_id)
+        pipe.sadd(self.dirty_owners_key, owner)
+
+    async def build_batch(self, owner: str) -> Optional[Dict[str, Any]]:
+        """
+        Turn an owner's dirty objects into one settlement batch
+
+        Returns None if nothing is dirty or the owner already has an open batch.
+        """
+        client = self._client()
+        if await self._open_batch(owner):
+            return None
+
+        object_ids = sorted(await client.smembers(self._dirty_key(owner)))[:self.max_calls]
+        calls, pending = await self.build_calls(owner, object_ids) if object_ids else ([], {})
+        if not calls:
+            async with client.pipeline(transaction=False) as pipe:
+                if object_ids:
+                    pipe.srem(self._dirty_key(owner), *object_ids)
+                pipe.srem(self.dirty_owners_key, owner)
+                await pipe.execute()
+            return None
+
+        batch_id = str(uuid.uuid4())
+        batch = {
+            "batch_id": batch_id,
+            "kind": self.kind,
+            "owner": owner,
+            "status": "pending",
+            "created_at": int(time.time()),
+            "transaction": {"kind": "ProgrammableTransaction", "sender": owner, "calls": calls},
+            "pending": pending,
+            "digest": None,
+        }
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(self._batch_key(batch_id), json.dumps(batch), ex=self.batch_ttl * 24)
+            pipe.lpush(self._owner_batches_key(owner), batch_id)
+            pipe.ltrim(self._owner_batches_key(owner), 0, 49)
+            pipe.srem(self._dirty_key(owner), *object_ids)
+            pipe.sadd(self.open_owners_key, owner)
+            await pipe.execute()
+        if await client.scard(self._dirty_key(owner)) == 0:
+            await client.srem(self.dirty_owners_key, owner)
+
+        logger.info(f"Built {self.kind} settlement batch {batch_id} for {owner} with {len(calls)} calls")
+        return batch
+
+    async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client().get(self._batch_key(batch_id))
+        return json.loads(raw) if raw else None
+
+    async def _save_batch(self, batch: Dict[str, Any]):
+        await self._client().set(self._batch_key(batch["batch_id"]), json.dumps(batch), ex=self.batch_ttl * 24)
+
+    async def get_batches(self, owner: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """An owner's most recent settlement batches, newest first"""
+        client = self._client()
+        batch_ids = await client.lrange(self._owner_batches_key(owner), 0, limit - 1)
+        batches = [await self.get_batch(batch_id) for batch_id in batch_ids]
+        return [b for b in batches if b]
+
+    async def _open_batch(self, owner: str) -> Optional[Dict[str, Any]]:
+        for batch in await self.get_batches(owner, limit=3):
+            if batch["status"] in OPEN_STATUSES:
+                if batch["status"] == "pending" and time.time() - batch["created_at"] > self.batch_ttl:
+                    await self._reopen(batch, "expired")
+                    continue
+                return batch
+        return None
+
+    async def _reopen(self, batch: Dict[str, Any], status: str):
+        """Close a batch unsettled and mark its objects dirty again"""
+        batch["status"] = status
+        await self._save_batch(batch)
+        client = self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.srem(self.open_owners_key, batch["owner"])
+            for object_id in batch["pending"]:
+                self.mark_dirty(pipe, batch["owner"], object_id)
+            await pipe.execute()
+
+    async def mark_submitted(self, batch_id: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Record the digest of the executed batch transaction"""
+        batch = await self.get_batch(batch_id)
+        if batch is None:
+            return None
+        if batch["status"] == "pending":
+            batch["status"] = "submitted"
+            batch["digest"] = digest
+            batch["submitted_at"] = int(time.time())
+            await self._save_batch(batch)
+        return batch
+
+    def _mismatch(self, batch: Dict[str, Any], tx: Dict[str, Any]) -> Optional[str]:
+        """Why tx is not the batch's transaction, or None if it is"""
+        event = normalize_record({"tx": tx})
+        if event["sender"] != batch["owner"]:
+            return f"transaction was sent by {event['sender']}, not {batch['owner']}"
+        calls = [
+            {"target": f"{call['package']}::{call['module']}::{call['function']}", "arguments": call["args"]}
+            for call in event["calls"]
+        ]
+        if calls != batch["transaction"]["calls"]:
+            return "transaction does not execute the batch's calls"
+        return None
+
+    async def check_submitted(self, batch: Dict[str, Any]) -> str:
+        """Confirm, fail or reject a submitted batch from its on-chain transaction"""
+        submitted_for = time.time() - batch.get("submitted_at", batch["created_at"])
+        tx = None
+        try:
+            tx = await sui_rpc.call("sui_getTransactionBlock", [batch["digest"], {"showInput": True, "showEffects": True}])
+        except Exception as e:
+            if isinstance(e, SuiRpcError) and TX_NOT_FOUND in str(e) and submitted_for > self.not_found_grace:
+                return await self._reject(batch, "transaction not found")
+            logger.warning(f"Could not check {self.kind} settlement {batch['batch_id']}: {e}")
+
+        outcome = tx.get("effects", {}).get("status", {}).get("status") if tx else None
+        if outcome == "success":
+            problem = self._mismatch(batch, tx)
+            if problem is None:
+                # One transaction settles one batch, even if a later batch has identical calls
+                client = self._client()
+                key = self._digest_key(batch["digest"])
+                claimed = await client.set(key, batch["batch_id"], nx=True, ex=self.batch_ttl * 24)
+                if not claimed and await client.get(key) != batch["batch_id"]:
+                    problem = "transaction already settled another batch"
+            if problem:
+                return await self._reject(batch, problem)
+            batch["status"] = "confirmed"
+            await self._save_batch(batch)
+            await self._client().srem(self.open_owners_key, batch["owner"])
+            await self.on_confirmed(batch)
+        elif outcome == "failure":
+            await self._reopen(batch, "failed")
+        elif submitted_for > self.batch_ttl:
+            # Never confirmed either way: settle the objects in a new batch
+            logger.warning(f"Expired {self.kind} settlement {batch['batch_id']} ({batch['digest']}): not confirmed in time")
+            await self._reopen(batch, "expired")
+        return batch["status"]
+
+    async def _reject(self, batch: Dict[str, Any], problem: str) -> str:
+        logger.warning(f"Rejected {self.kind} settlement {batch['batch_id']} ({batch['digest']}): {problem}")
+        batch["error"] = problem
+        await self._reopen(batch, "rejected")
+        return batch["status"]
+
+    async def settle_owner(self, owner: str) -> Dict[str, int]:
+        """Check the owner's open batch and build a new one if anything is dirty"""
+        client = self._client()
+        built = checked = 0
+        open_batch = await self._open_batch(owner)
+        if open_batch is None:
+            await client.srem(self.open_owners_key, owner)
+        elif open_batch["status"] == "submitted":
+            await self.check_submitted(open_batch)
+            checked = 1
+        if await client.sismember(self.dirty_owners_key, owner) and await self.build_batch(owner):
+            built = 1
+        return {"built": built, "checked": checked}
+
+    async def settle_once(self) -> Dict[str, int]:
+        """Check submitted batches and build new ones for every dirty owner"""
+        client = self._client()
+        totals = {"built": 0, "checked": 0}
+        for owner in await client.sunion(self.open_owners_key, self.dirty_owners_key):
+            result = await self.settle_owner(owner)
+            totals["built"] += result["built"]
+            totals["checked"] += result["checked"]
+        return totals
+
+    async def _settlement_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await self.settle_once()
+                if result["built"] or result["checked"]:
+                    logger.info(f"{self.kind} settlement: {result}")
+            except Exception as e:
+                logger.error(f"{self.kind} settlement failed: {e}")
+
+    def start(self):
+        """Start periodic settlement batching"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._settlement_loop())
+
+    async def stop(self):
+        """Stop periodic settlement batching"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,127 @@
+"""
+Stream Consumer - Base class for consumer-group workers on the gameplay event stream
+"""
+import asyncio
+import os
+import socket
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from services.redis_service import redis_service
+from services.game_events import game_event_service
+
+logger = logging.getLogger(__name__)
+
+
+class StreamConsumer(ABC):
+    """
+    Reads the gameplay event stream in batches through a named consumer group
+
+    Subclasses implement handle_batch and return the entry IDs that were
+    processed; only those are acknowledged. Unacknowledged entries stay
+    pending and are replayed on the next start, or claimed by another
+    consumer once they have been idle for claim_idle_ms.
+    """
+
+    group = "default"
+
+    def __init__(self):
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = settings.GAME_EVENTS_BATCH_SIZE
+        self.block_ms = settings.GAME_EVENTS_BLOCK_MS
+        self.claim_idle_ms = 60000
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def handle_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        """Process entries and return the IDs that can be acknowledged"""
+
+    async def ensure_group(self):
+        """Create the consumer group (and stream) if missing"""
+        try:
+            await redis_service.client.xgroup_create(
+                game_event_service.stream_key, self.group, id="0", mkstream=True
+            )
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def process_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> int:
+        """Handle a batch and acknowledge what was processed; returns the ack count"""
+        if not entries:
+            return 0
+        ack_ids = await self.handle_batch(entries)
+        if ack_ids:
+            await redis_service.client.xack(game_event_service.stream_key, self.group, *ack_ids)
+        return len(ack_ids)
+
+    async def _read(self, stream_id: str, block: Optional[int] = None):
+        response = await redis_service.client.xreadgroup(
+            self.group,
+            self.consumer,
+            {game_event_service.stream_key: stream_id},
+            count=self.batch_size,
+            block=block
+        )
+        return response[0][1] if response else []
+
+    async def recover_pending(self):
+        """Reprocess this consumer's unacknowledged entries and claim abandoned ones"""
+        last_id = "0"
+        while True:
+            entries = await self._read(last_id)
+            if not entries:
+                break
+            await self.process_batch(entries)
+            # Entries that failed again stay pending; move past them
+            last_id = entries[-1][0]
+
+        _, claimed, *_ = await redis_service.client.xautoclaim(
+            game_event_service.stream_key,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            count=self.batch_size
+        )
+        if claimed:
+            await self.process_batch(claimed)
+
+    async def _run(self):
+        needs_recovery = True
+        idle_loops = 0
+        while True:
+            try:
+                if needs_recovery:
+                    await self.ensure_group()
+                    await self.recover_pending()
+                    needs_recovery = False
+
+                entries = await self._read(">", block=self.block_ms)
+                await self.process_batch(entries)
+                idle_loops = 0 if entries else idle_loops + 1
+                if idle_loops >= 60:
+                    # Periodically pick up work from crashed consumers
+                    needs_recovery = True
+                    idle_loops = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.group} consumer error: {e}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        """Start consuming the gameplay event stream"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop consuming; unacknowledged entries stay pending for the next start"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
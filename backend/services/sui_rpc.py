@@ -0,0 +1,109 @@
+"""
+Sui RPC Client - Minimal JSON-RPC client for the OneChain (Sui) full node
+"""
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from config import settings
+from services.metrics import upstream_timer
+from services.tracing import tracer
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Full nodes reject larger requests (QUERY_MAX_RESULT_LIMIT / MAX_MULTI_GET_OBJECTS)
+MAX_PAGE_SIZE = 50
+MAX_MULTI_GET_OBJECTS = 50
+
+
+class SuiRpcError(RuntimeError):
+    """Raised when the node returns a JSON-RPC error"""
+
+
+class SuiRpcClient:
+    """
+    JSON-RPC 2.0 client over one pooled httpx connection
+
+    Pass a custom httpx transport (e.g. httpx.ASGITransport) to talk to a
+    local chain stand-in instead of a real node.
+    """
+
+    def __init__(self, url: str, transport: Optional["httpx.AsyncBaseTransport"] = None, timeout: float = 15.0):
+        self.url = url
+        self.transport = transport
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx  # Deferred until the first call, off the import path
+            
+            self._client = httpx.AsyncClient(transport=self.transport, timeout=self.timeout)
+        return self._client
+
+    def use_transport(self, transport: Optional["httpx.AsyncBaseTransport"], url: Optional[str] = None):
+        """Route later calls through another transport, e.g. the local chain stand-in"""
+        self.transport = transport
+        if url:
+            self.url = url
+        self._client = None
+
+    async def call(self, method: str, params: List[Any]) -> Any:
+        """Call a JSON-RPC method and return its result"""
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        with upstream_timer("onechain"), tracer.span(f"onechain.{method}", kind="client"):
+            response = await self._http().post(self.url, json=payload)
+            response.raise_for_status()
+            body = response.json()
+        if body.get("error"):
+            raise SuiRpcError(f"{method}: {body['error'].get('message', body['error'])}")
+        return body["result"]
+
+    async def query_transaction_blocks(
+        self,
+        query: Dict[str, Any],
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """One ascending page of transaction blocks matching query"""
+        return await self.call("suix_queryTransactionBlocks", [query, cursor, min(limit, MAX_PAGE_SIZE), False])
+
+    async def get_object(self, object_id: str) -> Dict[str, Any]:
+        """Current content and owner of one object"""
+        return await self.call("sui_getObject", [object_id, {"showContent": True, "showOwner": True, "showType": True}])
+
+    async def multi_get_objects(self, object_ids: List[str]) -> List[Dict[str, Any]]:
+        """Current content and owner of several objects, in requests of at most MAX_MULTI_GET_OBJECTS"""
+        results = []
+        for start in range(0, len(object_ids), MAX_MULTI_GET_OBJECTS):
+            results.extend(await self.call(
+                "sui_multiGetObjects",
+                [object_ids[start:start + MAX_MULTI_GET_OBJECTS], {"showContent": True, "showOwner": True, "showType": True}]
+            ))
+        return results
+
+    async def try_multi_get_past_objects(self, refs: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Objects at given versions ([{"objectId", "version"}]), e.g. ones since
+        wrapped; each result has status "VersionFound" and the object in details
+        """
+        results = []
+        for start in range(0, len(refs), MAX_MULTI_GET_OBJECTS):
+            results.extend(await self.call(
+                "sui_tryMultiGetPastObjects",
+                [refs[start:start + MAX_MULTI_GET_OBJECTS], {"showContent": True, "showOwner": True, "showType": True}]
+            ))
+        return results
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+sui_rpc = SuiRpcClient(settings.ONECHAIN_RPC_URL)
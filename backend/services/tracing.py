@@ -0,0 +1,443 @@
+"""
+Tracing Service - OpenTelemetry-style spans with sampling and file/console export
+"""
+import ipaddress
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TRACES_DROPPED = metrics.counter(
+    "traces_dropped_total", "Finished traces dropped because the trace export queue was full"
+)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class _Trace:
+    """Spans of one sampled trace, exported together when the root span ends"""
+
+    __slots__ = ("trace_id", "root", "spans", "exported")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.root: Optional["Span"] = None
+        self.spans: List["Span"] = []
+        self.exported = False
+
+
+class Span:
+    """
+    One timed operation in a trace
+
+    Field names follow the OpenTelemetry data model (trace_id, span_id,
+    parent_span_id, kind, attributes, status) so exported spans can be
+    converted to OTLP without guessing.
+    """
+
+    __slots__ = (
+        "trace", "span_id", "parent_span_id", "name", "kind", "attributes",
+        "start_ns", "end_ns", "status", "_token"
+    )
+    recording = True
+
+    def __init__(self, trace: _Trace, name: str, kind: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+        self._token = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["exception_type"] = exc_type.__name__
+            self.attributes["exception_message"] = str(exc)[:200]
+        self.end()
+        return False
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NonRecordingSpan:
+    """Stand-in outside sampled traces: every operation is a no-op"""
+
+    __slots__ = ()
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+
+def format_trace(spans: List[Dict[str, Any]]) -> str:
+    """A trace's spans as an indented tree, children in start order"""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda s: s["start_time_unix_nano"]):
+        parent = span["parent_span_id"] if span["parent_span_id"] in span_ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines = []
+
+    def walk(parent: Optional[str], depth: int):
+        for span in children.get(parent, []):
+            attributes = " ".join(f"{k}={v}" for k, v in span["attributes"].items())
+            error = " ERROR" if span["status"] == "error" else ""
+            lines.append(f"{'  ' * depth}{span['name']} {span['duration_ms']:.1f}ms{error} {attributes}".rstrip())
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 1)
+    return f"trace {spans[0]['trace_id']}\n" + "\n".join(lines)
+
+
+class ConsoleSpanExporter:
+    """Prints each finished trace as a tree on stderr"""
+
+    def export(self, spans: List[Dict[str, Any]]):
+        print(format_trace(spans), file=sys.stderr, flush=True)
+
+    def close(self):
+        pass
+
+
+class FileSpanExporter:
+    """Appends spans to a JSON Lines file, one span per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(lines)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class QueuedSpanExporter:
+    """
+    Hands finished traces to a writer thread, so export I/O never runs on the event loop
+
+    Like the log pipeline, the queue is bounded: when it is full the trace
+    is dropped and counted in traces_dropped_total rather than waited for.
+    """
+
+    def __init__(self, exporter, max_queue: int):
+        self.exporter = exporter
+        self.queue: queue.Queue = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def _run(self):
+        while True:
+            spans = self.queue.get()
+            if spans is None:
+                return
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                logger.warning("Trace export failed", extra={"error": str(e)})
+
+    def close(self):
+        """Write what is queued, stop the writer thread and close the exporter"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join(timeout=5)
+        self.exporter.close()
+
+
+def _exporter(name: str, path: str):
+    if name == "file":
+        exporter = FileSpanExporter(path)
+    elif name == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Unknown trace exporter: {name}")
+    return QueuedSpanExporter(exporter, settings.TRACE_QUEUE_SIZE)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Tracer:
+    """
+    Creates spans inside sampled traces
+
+    Traces start at the request (see TracingMiddleware), which makes the
+    sampling decision: TRACE_SAMPLE_RATE of requests. An incoming
+    traceparent's trace ID is always continued, but its sampled flag is only
+    honoured from TRACE_TRUSTED_SOURCES, so clients cannot force sampling.
+    Spans opened outside a sampled trace, e.g. by background workers, are
+    non-recording no-ops.
+    """
+
+    def __init__(self):
+        self.sample_rate = settings.TRACE_SAMPLE_RATE
+        self.trusted_networks = [
+            ipaddress.ip_network(source, strict=False) for source in settings.trace_trusted_sources_list
+        ]
+        self._exporter = None
+
+    @property
+    def exporter(self):
+        if self._exporter is None:
+            self._exporter = _exporter(settings.TRACE_EXPORTER, settings.TRACE_FILE_PATH)
+        return self._exporter
+
+    def configure(self, sample_rate: Optional[float] = None, exporter=None):
+        """Override the sampling rate or exporter (e.g. for benchmarks)"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if exporter is not None:
+            self._exporter = exporter
+
+    def trusts(self, host: Optional[str]) -> bool:
+        """Whether a traceparent from this client address may decide sampling"""
+        if not host or not self.trusted_networks:
+            return False
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_networks)
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: Optional[str] = None,
+        kind: str = "server",
+        trusted: bool = False,
+        **attributes
+    ):
+        """
+        Root span for a request, or NON_RECORDING_SPAN if it is not sampled
+
+        The traceparent's sampled flag decides only when trusted; otherwise
+        the trace is sampled at sample_rate like any other request.
+        """
+        parent = parse_traceparent(traceparent)
+        if parent:
+            trace_id, parent_span_id, parent_sampled = parent
+        else:
+            trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+        if parent and trusted:
+            sampled = parent_sampled
+        else:
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return NON_RECORDING_SPAN
+        trace = _Trace(trace_id)
+        trace.root = Span(trace, name, kind, parent_span_id, attributes)
+        return trace.root
+
+    def span(self, name: str, kind: str = "internal", **attributes):
+        """
+        Child span of the current span, for use as a context manager
+
+            with tracer.span("redis.GET", db_system="redis"):
+                ...
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return NON_RECORDING_SPAN
+        return Span(parent.trace, name, kind, parent.span_id, attributes)
+
+    def record(self, name: str, start_ns: int, kind: str = "internal", **attributes):
+        """Add an already finished span (start_ns until now) under the current span"""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = Span(parent.trace, name, kind, parent.span_id, attributes)
+        span.start_ns = start_ns
+        span.end()
+
+    def current_span(self):
+        return _current_span.get() or NON_RECORDING_SPAN
+
+    def _finish(self, span: Span):
+        trace = span.trace
+        if trace.exported:
+            # Outlived its trace (e.g. a task the request spawned): export on its own
+            self._export([span])
+            return
+        trace.spans.append(span)
+        if span is trace.root:
+            trace.exported = True
+            self._export(trace.spans)
+
+    def _export(self, spans: List[Span]):
+        try:
+            self.exporter.export([span.to_dict() for span in spans])
+        except Exception as e:
+            logger.warning("Trace export failed", extra={"error": str(e)})
+
+    def close(self):
+        if self._exporter is not None:
+            self._exporter.close()
+
+
+def thread_timed(span, fn: Callable) -> Callable:
+    """Wrap fn so the span records how long it queued for a worker thread"""
+    if not span.recording:
+        return fn
+    queued = time.perf_counter()
+
+    def run(*args, **kwargs):
+        span.set_attribute("thread_wait_ms", round((time.perf_counter() - queued) * 1000, 3))
+        return fn(*args, **kwargs)
+    return run
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the route-level parent span of each request
+
+    The span is named after the matched route template once routing is done
+    ("GET /api/ai/move"), and sampled traces return a traceparent header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        client = scope.get("client")
+        root = tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            trusted=tracer.trusts(client[0] if client else None),
+            http_method=scope["method"]
+        )
+        if not root.recording:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_traceparent(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http_status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", f"00-{root.trace_id}-{root.span_id}-01".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with root:
+            try:
+                await self.app(scope, receive, send_with_traceparent)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{scope['method']} {route.path}"
+                    root.set_attribute("http_route", route.path)
+
+
+# Global instance
+tracer = Tracer()
+
+
+if __name__ == "__main__":
+    # Print the traces in a file written by the file exporter: python -m services.tracing traces.jsonl
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(sys.argv[1] if len(sys.argv) > 1 else settings.TRACE_FILE_PATH, encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            traces.setdefault(span["trace_id"], []).append(span)
+    for spans in traces.values():
+        print(format_trace(spans))
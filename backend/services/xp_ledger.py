@@ -0,0 +1,204 @@
+"""
+XP Ledger Service - Accumulates battle XP per Pokémon NFT off-chain and settles it in batches
+"""
+import time
+import logging
+from typing import List, Dict, Any, Optional
+
+from redis.exceptions import WatchError
+
+from config import settings
+from services.redis_service import redis_service
+from services.battle_engine import battle_engine
+from services.pokemon_service import pokemon_service
+from services.settlement_batches import SettlementBatcher
+
+logger = logging.getLogger(__name__)
+
+STAT_NAMES = ("hp", "attack", "defense", "speed")
+MAX_LEVEL = 100
+# Pokemon fields the ledger is seeded from; update_stats overwrites all of them
+CHAIN_FIELDS = ("species_id", "level", "experience", "stats")
+
+
+class XpLedgerService(SettlementBatcher):
+    """
+    Off-chain XP, level and stats per Pokémon NFT
+
+    Battles only touch Redis. Settlement periodically turns each owner's
+    changed Pokémon into one programmable transaction of
+    pokemon::update_stats calls. Values are absolute, so a later batch
+    always supersedes an earlier one.
+    """
+
+    kind = "xp"
+    prefix = "xp_ledger"
+
+    def __init__(self):
+        super().__init__(
+            settings.XP_SETTLEMENT_INTERVAL,
+            settings.XP_SETTLEMENT_BATCH_TTL,
+            settings.XP_SETTLEMENT_MAX_CALLS
+        )
+
+    def _nft_key(self, nft_id: str) -> str:
+        return f"xp_ledger:nft:{nft_id}"
+
+    def _chain_state(self, nft: Dict[str, Any]) -> Dict[str, Any]:
+        """Ledger fields of an NFT as it is on chain"""
+        return {
+            "species_id": nft["species_id"],
+            "level": nft["level"],
+            "experience": nft["experience"],
+            **{name: nft["stats"][name] for name in STAT_NAMES},
+        }
+
+    def _settled(self, state: Dict[str, Any], chain_state: Dict[str, Any]) -> bool:
+        """
+        Whether the chain state can replace the ledger's: nothing is pending
+        and the chain has caught up with the last settlement (XP only grows),
+        so changes made on chain since, like an evolution, are picked up
+        """
+        if not state or not int(state.get("species_id", 0)):
+            return True
+        return int(state.get("pending_xp", 0)) <= 0 and int(chain_state["experience"]) >= int(state["experience"])
+
+    async def _grown_stats(self, species_id: int, level: int) -> Optional[Dict[str, int]]:
+        if not species_id:
+            return None
+        try:
+            base = (await pokemon_service.get_pokemon(species_id)).stats
+        except Exception as e:
+            logger.warning(f"Could not load base stats for species {species_id}: {e}")
+            return None
+        return {name: battle_engine.calculate_stat_growth(getattr(base, name), level) for name in STAT_NAMES}
+
+    async def load_pokemon(self, nft_id: str, owner: str) -> Dict[str, Any]:
+        """
+        The Pokémon NFT owner holds, from the chain index (or the node)
+
+        Raises UnknownNftError if it cannot be found and NftOwnershipError
+        if owner does not hold it.
+        """
+        return await self.load_owned_nft(nft_id, "pokemon", owner, CHAIN_FIELDS)
+
+    async def award(
+        self,
+        nft_id: str,
+        owner: str,
+        loser_level: int,
+        nft: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Add the XP for beating a loser_level opponent to an NFT owned by owner
+        and apply any level-ups
+
+        The winner's level and the NFT's state come from the ledger, else the
+        chain index (or the node), never from the battle request; nft is the
+        result of load_pokemon when the caller already has it. Returns the
+        NFT's ledger state plus experience_gained and levels_gained.
+        """
+        if not 1 <= loser_level <= MAX_LEVEL:
+            raise ValueError(f"loser_level must be between 1 and {MAX_LEVEL}")
+        if nft is None:
+            nft = await self.load_pokemon(nft_id, owner)
+        chain_state = self._chain_state(nft)
+        client = self._client()
+        key = self._nft_key(nft_id)
+
+        while True:
+            async with client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    state = await pipe.hgetall(key)
+                    if self._settled(state, chain_state):
+                        state = {**state, **chain_state}
+                    level = int(state["level"])
+                    xp = battle_engine.award_experience(level, loser_level)
+                    experience = int(state["experience"]) + xp
+                    new_level = level
+                    while new_level < MAX_LEVEL and battle_engine.check_level_up(experience, new_level):
+                        new_level += 1
+
+                    updates = {
+                        **{field: state[field] for field in chain_state},
+                        "owner": owner,
+                        "experience": experience,
+                        "updated_at": int(time.time()),
+                    }
+                    if new_level > level:
+                        updates["level"] = new_level
+                        stats = await self._grown_stats(int(state["species_id"]), new_level)
+                        if stats:
+                            updates.update(stats)
+
+                    pipe.multi()
+                    pipe.hset(key, mapping=updates)
+                    pipe.hincrby(key, "pending_xp", xp)
+                    self.mark_dirty(pipe, owner, nft_id)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        return {
+            **self._format({**state, **updates, "pending_xp": int(state.get("pending_xp", 0)) + xp}),
+            "nft_id": nft_id,
+            "experience_gained": xp,
+            "levels_gained": new_level - level,
+        }
+
+    def _format(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "owner": state.get("owner"),
+            "species_id": int(state.get("species_id", 0)),
+            "level": int(state["level"]),
+            "experience": int(state["experience"]),
+            "stats": {name: int(state.get(name, 0)) for name in STAT_NAMES},
+            "pending_xp": int(state.get("pending_xp", 0)),
+        }
+
+    async def get_states(self, nft_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Ledger state for the NFTs that have one"""
+        client = redis_service.client
+        if not client or not nft_ids:
+            return {}
+        async with client.pipeline(transaction=False) as pipe:
+            for nft_id in nft_ids:
+                pipe.hgetall(self._nft_key(nft_id))
+            states = await pipe.execute()
+        return {nft_id: self._format(state) for nft_id, state in zip(nft_ids, states) if state}
+
+    async def build_calls(self, owner: str, object_ids: List[str]):
+        """One pokemon::update_stats call per changed Pokémon, with absolute values"""
+        states = {}
+        for nft_id, state in (await self.get_states(object_ids)).items():
+            # Entries seeded before ledger state came from the chain may hold placeholder zeros
+            if not state["species_id"] or not all(state["stats"].values()):
+                logger.warning(f"Skipping XP settlement for {nft_id}: ledger has no chain state")
+                continue
+            states[nft_id] = state
+        target = f"{settings.ONECHAIN_PACKAGE_ID}::pokemon::update_stats"
+        calls = [
+            {
+                "target": target,
+                "arguments": [
+                    nft_id,
+                    state["experience"],
+                    state["level"],
+                    *(state["stats"][name] for name in STAT_NAMES),
+                ],
+            }
+            for nft_id, state in states.items()
+        ]
+        return calls, {nft_id: state["pending_xp"] for nft_id, state in states.items()}
+
+    async def on_confirmed(self, batch: Dict[str, Any]):
+        async with self._client().pipeline(transaction=False) as pipe:
+            for nft_id, xp in batch["pending"].items():
+                pipe.hincrby(self._nft_key(nft_id), "pending_xp", -xp)
+            await pipe.execute()
+
+
+# Global instance
+xp_ledger = XpLedgerService()
@@ -0,0 +1,78 @@
+"""
+Shared fixtures: the local chain stand-in, a scratch chain index and an in-memory Redis
+"""
+import fakeredis
+import httpx
+import pytest
+
+from config import settings
+from fakes.sui_chain import LocalSuiChain
+from services.chain_indexer import ChainIndexStore, ChainIndexer
+from services.redis_service import redis_service
+from services.sui_rpc import sui_rpc
+
+PACKAGE = settings.ONECHAIN_PACKAGE_ID
+
+
+def created(tx: dict, suffix: str) -> list:
+    """IDs of the objects of a type created by a transaction block"""
+    return [c["objectId"] for c in tx["objectChanges"] if c["type"] == "created" and c["objectType"].endswith(suffix)]
+
+
+@pytest.fixture
+def chain():
+    return LocalSuiChain()
+
+
+@pytest.fixture
+async def rpc(chain):
+    """The global RPC client, routed to the local chain"""
+    url = sui_rpc.url
+    sui_rpc.use_transport(httpx.ASGITransport(app=chain.app), url="http://local-chain/")
+    yield sui_rpc
+    await sui_rpc.close()
+    sui_rpc.use_transport(None, url=url)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A scratch chain index, also used by the settlement services"""
+    store = ChainIndexStore(str(tmp_path / "chain_index.db"))
+    monkeypatch.setattr("services.settlement_batches.chain_index_store", store)
+    monkeypatch.setattr("services.egg_incubation.chain_index_store", store)
+    return store
+
+
+@pytest.fixture
+def indexer(store, rpc, chain):
+    return ChainIndexer(store, rpc, chain.package_id)
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(redis_service, "client", client)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def mint_starter(chain):
+    """mint_starter(owner) -> the new Pokémon's ID"""
+    def mint(owner: str, species_id: int = 4) -> str:
+        tx = chain.execute({"sender": owner, "calls": [
+            {"target": f"{PACKAGE}::pokemon::mint_starter", "arguments": [species_id, "Starter", ["fire"], "0x6"]},
+        ]})
+        return created(tx, "::pokemon::Pokemon")[0]
+    return mint
+
+
+@pytest.fixture
+def breed_egg(chain):
+    """breed_egg(owner) -> the new Egg's ID"""
+    def breed(owner: str) -> str:
+        tx = chain.execute({"sender": owner, "calls": [
+            {"target": f"{PACKAGE}::egg::breed_pokemon", "arguments": [1, 4, [1, 2, 3], "0x6"]},
+        ]})
+        return created(tx, "::egg::Egg")[0]
+    return breed
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from services.auth_service import WalletAuthService
+
+
+async def test_cancelled_lookup_does_not_strand_waiters():
+    service = WalletAuthService()
+    release = asyncio.Event()
+    calls = []
+
+    async def lookup():
+        calls.append(len(calls))
+        await release.wait()
+        return f"uid-{len(calls)}"
+
+    first = asyncio.create_task(service._coalesced("user:0x1", lookup))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(service._coalesced("user:0x1", lookup))
+    await asyncio.sleep(0)
+    assert calls == [0]
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    release.set()
+
+    # The waiter ran its own lookup instead of hanging on the cancelled one
+    assert await asyncio.wait_for(waiter, 1) == "uid-2"
+    assert service._inflight == {}
+
+
+async def test_failed_lookup_is_shared_with_waiters():
+    service = WalletAuthService()
+    release = asyncio.Event()
+
+    async def lookup():
+        await release.wait()
+        raise RuntimeError("Firebase is down")
+
+    tasks = [asyncio.create_task(service._coalesced("user:0x1", lookup)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import battle
+from services.egg_incubation import egg_incubation_service
+from services.game_events import game_event_service
+from services.pokemon_service import pokemon_service
+
+TRAINER = "0x" + "a" * 64
+OTHER = "0x" + "b" * 64
+
+
+@pytest.fixture
+async def client(redis, rpc, store, monkeypatch):
+    async def get_pokemon(species_id):
+        return SimpleNamespace(stats=SimpleNamespace(hp=39, attack=52, defense=43, speed=65))
+    monkeypatch.setattr(pokemon_service, "get_pokemon", get_pokemon)
+
+    app = FastAPI()
+    app.include_router(battle.router, prefix="/api/battle")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_xp_comes_from_the_nft_level(client, redis, mint_starter):
+    # The starter is level 1; a claimed winner_level of 50 would halve the XP
+    response = await client.post("/api/battle/award-xp", params={
+        "winner_level": 50, "loser_level": 1, "player_id": TRAINER, "nft_id": mint_starter(TRAINER),
+    })
+
+    assert response.status_code == 200
+    assert response.json()["experience_gained"] == 50
+    assert response.json()["ledger"]["level"] == 4
+    [(_, event)] = await redis.xrange(game_event_service.stream_key)
+    assert event["xp"] == "50"
+
+
+async def test_levels_are_bounded(client):
+    response = await client.post("/api/battle/award-xp", params={"winner_level": 1, "loser_level": 10000})
+    assert response.status_code == 422
+
+
+async def test_nothing_is_recorded_unless_every_egg_is_owned(client, redis, breed_egg):
+    mine, theirs = breed_egg(TRAINER), breed_egg(OTHER)
+
+    response = await client.post("/api/battle/award-xp", params={
+        "winner_level": 5, "loser_level": 5, "player_id": TRAINER, "egg_ids": [mine, theirs],
+    })
+
+    assert response.status_code == 403
+    assert not await redis.exists(egg_incubation_service._egg_key(mine))
+    assert await egg_incubation_service.get_batches(TRAINER) == []
+    assert await redis.xlen(game_event_service.stream_key) == 0
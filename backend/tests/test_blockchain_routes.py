@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routes import blockchain
+from services.auth_service import InvalidWalletTokenError, wallet_auth_service
+from services.xp_ledger import xp_ledger
+
+TRAINER = "0x" + "7" * 64
+OTHER = "0x" + "8" * 64
+
+
+@pytest.fixture
+def firebase(monkeypatch):
+    """ID tokens of the form "token-<wallet>", without Firebase"""
+    async def ensure_firebase():
+        return True
+
+    async def verify_id_token(token):
+        if not token.startswith("token-"):
+            raise InvalidWalletTokenError("Invalid ID token")
+        return token[len("token-"):]
+
+    monkeypatch.setattr(wallet_auth_service, "ensure_firebase", ensure_firebase)
+    monkeypatch.setattr(wallet_auth_service, "verify_id_token", verify_id_token)
+
+
+@pytest.fixture
+async def client(redis, rpc, store, firebase):
+    app = FastAPI()
+    app.include_router(blockchain.router, prefix="/api/blockchain")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def batch(redis, rpc, store, mint_starter, monkeypatch):
+    """A pending XP settlement batch of TRAINER's"""
+    async def grown_stats(species_id, level):
+        return {"hp": 20, "attack": 20, "defense": 20, "speed": 20}
+    monkeypatch.setattr(xp_ledger, "_grown_stats", grown_stats)
+    await xp_ledger.award(mint_starter(TRAINER), TRAINER, 1)
+    return await xp_ledger.build_batch(TRAINER)
+
+
+async def test_only_the_batch_owner_reports_its_digest(client, batch):
+    url = f"/api/blockchain/settlements/{batch['batch_id']}/submitted"
+
+    assert (await client.post(url, json={"digest": "d"})).status_code == 401
+    response = await client.post(url, json={"digest": "d"}, headers={"Authorization": "Bearer forged"})
+    assert response.status_code == 401
+    response = await client.post(url, json={"digest": "d"}, headers={"Authorization": f"Bearer token-{OTHER}"})
+    assert response.status_code == 403
+    assert (await xp_ledger.get_batch(batch["batch_id"]))["status"] == "pending"
+
+    response = await client.post(url, json={"digest": "d"}, headers={"Authorization": f"Bearer token-{TRAINER}"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "submitted" and response.json()["digest"] == "d"
+
+
+async def test_unknown_batch(client):
+    response = await client.post(
+        "/api/blockchain/settlements/missing/submitted",
+        json={"digest": "d"},
+        headers={"Authorization": f"Bearer token-{TRAINER}"}
+    )
+    assert response.status_code == 404
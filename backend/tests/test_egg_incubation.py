@@ -0,0 +1,91 @@
+import pytest
+
+from services.egg_incubation import egg_incubation_service
+from services.settlement_batches import NftOwnershipError, UnknownNftError
+from tests.conftest import PACKAGE
+
+TRAINER = "0x" + "e" * 64
+OTHER = "0x" + "f" * 64
+
+
+@pytest.fixture
+def incubation(redis, rpc, store):
+    return egg_incubation_service
+
+
+async def execute_batch(chain, incubation, batch):
+    tx = chain.execute({"sender": batch["owner"], "calls": batch["transaction"]["calls"]})
+    await incubation.mark_submitted(batch["batch_id"], tx["digest"])
+    await incubation.settle_once()
+    return await incubation.get_batch(batch["batch_id"])
+
+
+async def test_steps_require_an_egg_held_by_the_player(chain, indexer, incubation, breed_egg, mint_starter):
+    with pytest.raises(UnknownNftError):
+        await incubation.add_steps("0x" + "0" * 64, TRAINER)
+    # A Pokémon is not an egg
+    with pytest.raises(UnknownNftError):
+        await incubation.add_steps(mint_starter(TRAINER), TRAINER)
+
+    egg = breed_egg(TRAINER)
+    with pytest.raises(NftOwnershipError):
+        await incubation.add_steps(egg, OTHER)
+
+    chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::marketplace::list_egg", "arguments": [chain.marketplace_id, egg, 100]},
+    ]})
+    await indexer.sync_once()
+    with pytest.raises(NftOwnershipError):
+        await incubation.add_steps(egg, TRAINER)
+    assert await incubation.get_batches(TRAINER) == []
+
+
+async def test_transferred_egg_counts_for_its_new_owner(chain, incubation, breed_egg):
+    egg = breed_egg(TRAINER)
+    await incubation.add_steps(egg, TRAINER)
+    chain.transfer_objects(TRAINER, [egg], OTHER)
+
+    with pytest.raises(NftOwnershipError):
+        await incubation.add_steps(egg, TRAINER)
+    progress = await incubation.add_steps(egg, OTHER)
+    assert progress["owner"] == OTHER and progress["steps"] == 2
+
+
+async def test_progress_of_an_untracked_egg_comes_from_the_index(indexer, incubation, breed_egg):
+    egg = breed_egg(TRAINER)
+    assert await incubation.get_progress(egg) is None
+
+    await indexer.sync_once()
+    progress = await incubation.get_progress(egg)
+    assert progress["steps"] == 0 and progress["required_steps"] == 10 and progress["pending_steps"] == 0
+
+
+async def test_settles_near_hatching_and_caps_steps(chain, incubation, breed_egg):
+    egg = breed_egg(TRAINER)
+
+    progress = await incubation.add_steps(egg, TRAINER, steps=7)
+    assert progress["steps"] == 7 and await incubation.get_batches(TRAINER) == []
+
+    # Within EGG_INCUBATION_FLUSH_THRESHOLD of hatching: settled right away
+    await incubation.add_steps(egg, TRAINER)
+    batch = (await incubation.get_batches(TRAINER))[0]
+    assert batch["status"] == "pending" and batch["pending"] == {egg: 8}
+
+    # Steps beyond required_steps are dropped, as on chain
+    progress = await incubation.add_steps(egg, TRAINER, steps=5)
+    assert progress["steps"] == 10 and progress["pending_steps"] == 10
+    assert progress["ready_to_hatch"] and not progress["hatchable_on_chain"]
+
+    assert (await execute_batch(chain, incubation, batch))["status"] == "confirmed"
+    # The remaining steps went straight into the next batch
+    rest = (await incubation.get_batches(TRAINER))[0]
+    assert rest["batch_id"] != batch["batch_id"] and rest["pending"] == {egg: 2}
+    assert (await execute_batch(chain, incubation, rest))["status"] == "confirmed"
+
+    progress = await incubation.get_progress(egg)
+    assert progress["chain_steps"] == 10 and progress["pending_steps"] == 0 and progress["hatchable_on_chain"]
+    assert chain.objects[egg]["fields"]["incubation_steps"] == 10
+    hatched = chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::egg::hatch_egg", "arguments": [egg, 4, "Charmander", ["fire"], "0x6"]},
+    ]})
+    assert hatched["effects"]["status"]["status"] == "success"
@@ -0,0 +1,27 @@
+import time
+
+from services.leaderboard_service import LeaderboardService
+
+
+async def test_one_worker_snapshots_per_interval(redis):
+    first, second = LeaderboardService(), LeaderboardService()
+    key = first.board_key("global", "xp")
+    await first.add_scores({(key, "player-1"): 50})
+
+    assert await first.hold_lease()
+    assert not await second.hold_lease()
+
+    assert await first.snapshot_due()
+    assert await first.snapshot() == 1
+    # A snapshot on any worker resets the interval for all of them
+    assert not await first.snapshot_due() and not await second.snapshot_due()
+
+    await redis.set(first.snapshot_at_key, int(time.time()) - first.snapshot_interval)
+    assert await second.snapshot_due()
+    [snapshot] = await second.get_snapshots(key)
+    assert snapshot["entries"][0]["player_id"] == "player-1"
+
+    # The lease passes on once the holder stops renewing it
+    await redis.delete(first.lease_key)
+    assert await second.hold_lease()
+    assert not await first.hold_lease()
@@ -0,0 +1,118 @@
+import pytest
+
+from services.marketplace_index import MarketplaceIndex
+from tests.conftest import PACKAGE
+
+SELLER = "0x" + "5" * 64
+BUYER = "0x" + "b" * 64
+
+
+@pytest.fixture
+def marketplace(store):
+    return MarketplaceIndex(store)
+
+
+def list_pokemon(chain, nft_id: str, price: int, sender: str = SELLER) -> dict:
+    return chain.execute({"sender": sender, "calls": [
+        {"target": f"{PACKAGE}::marketplace::list_pokemon", "arguments": [chain.marketplace_id, nft_id, price]},
+    ]})
+
+
+def cancel_listing(chain, nft_id: str, sender: str = SELLER) -> dict:
+    return chain.execute({"sender": sender, "calls": [
+        {"target": f"{PACKAGE}::marketplace::cancel_listing_pokemon", "arguments": [chain.marketplace_id, nft_id]},
+    ]})
+
+
+async def test_listing_buy_and_floor_prices(chain, indexer, store, marketplace, mint_starter):
+    cheap, pricey = mint_starter(SELLER), mint_starter(SELLER)
+    list_pokemon(chain, cheap, 100)
+    list_pokemon(chain, pricey, 300)
+    await indexer.sync_once()
+
+    page = await marketplace.search()
+    assert [listing["nft_id"] for listing in page["listings"]] == [cheap, pricey]
+    assert page["listings"][0]["species_id"] == 4 and page["listings"][0]["seller"] == SELLER
+    assert await marketplace.floor_prices() == [{"species_id": 4, "floor_price": 100, "listing_count": 2}]
+    assert (await store.get_nft(cheap))["listed"]
+
+    coin = chain.mint_coin(BUYER, 1000)
+    chain.execute({"sender": BUYER, "calls": [
+        {"target": f"{PACKAGE}::marketplace::buy_pokemon", "arguments": [chain.marketplace_id, cheap, coin]},
+    ]})
+    await indexer.sync_once()
+
+    assert [listing["nft_id"] for listing in (await marketplace.search())["listings"]] == [pricey]
+    assert await marketplace.floor_prices(4) == [{"species_id": 4, "floor_price": 300, "listing_count": 1}]
+    bought = await store.get_nft(cheap)
+    assert bought["owner"] == BUYER and not bought["listed"]
+
+
+async def test_keyset_pagination(chain, indexer, marketplace, mint_starter):
+    for price in (500, 100, 400, 200, 300):
+        list_pokemon(chain, mint_starter(SELLER), price)
+    await indexer.sync_once()
+
+    prices, cursor = [], None
+    while True:
+        page = await marketplace.search(sort="price_desc", cursor=cursor, limit=2)
+        prices.extend(listing["price"] for listing in page["listings"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert prices == [500, 400, 300, 200, 100]
+
+    with pytest.raises(ValueError):
+        await marketplace.search(cursor="not-a-cursor")
+
+
+async def test_failed_cancel_keeps_the_listing(chain, indexer, marketplace, mint_starter):
+    nft = mint_starter(SELLER)
+    list_pokemon(chain, nft, 100)
+    # Only the seller may cancel: this aborts on chain
+    failed = cancel_listing(chain, nft, sender=BUYER)
+    assert failed["effects"]["status"]["status"] == "failure"
+    await indexer.sync_once()
+
+    assert [listing["nft_id"] for listing in (await marketplace.search())["listings"]] == [nft]
+    assert await marketplace.floor_prices(4) == [{"species_id": 4, "floor_price": 100, "listing_count": 1}]
+
+
+async def test_zero_price_listing_is_not_indexed(chain, indexer, store, marketplace, mint_starter):
+    nft = mint_starter(SELLER)
+    failed = list_pokemon(chain, nft, 0)
+    assert failed["effects"]["status"]["status"] == "failure"
+    await indexer.sync_once()
+
+    assert (await marketplace.search())["listings"] == []
+    assert await marketplace.floor_prices() == []
+    assert not (await store.get_nft(nft))["listed"]
+
+
+async def test_price_beyond_sqlite_range_is_skipped(chain, indexer, store, marketplace, mint_starter):
+    huge, normal = mint_starter(SELLER), mint_starter(SELLER)
+    list_pokemon(chain, huge, 2 ** 64 - 1)
+    list_pokemon(chain, normal, 100)
+    await indexer.sync_once()
+
+    assert [listing["nft_id"] for listing in (await marketplace.search())["listings"]] == [normal]
+    # The NFT is still escrowed on chain
+    assert (await store.get_nft(huge))["listed"]
+
+    # Closing the unindexed listing is harmless
+    cancel_listing(chain, huge)
+    await indexer.sync_once()
+    assert [listing["nft_id"] for listing in (await marketplace.search())["listings"]] == [normal]
+
+
+async def test_rebuild_matches_incremental_index(chain, indexer, marketplace, mint_starter):
+    nfts = [mint_starter(SELLER) for _ in range(4)]
+    for price, nft in zip((300, 100, 200, 2 ** 64 - 1), nfts):
+        list_pokemon(chain, nft, price)
+    cancel_listing(chain, nfts[1])
+    cancel_listing(chain, nfts[2], sender=BUYER)
+    await indexer.sync_once()
+    incremental = (await marketplace.search(), await marketplace.floor_prices())
+
+    assert marketplace.rebuild_sync() == 2
+    assert (await marketplace.search(), await marketplace.floor_prices()) == incremental
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from models.battle import MatchTicket
+from services.matchmaking_service import MatchmakingService
+
+
+@pytest.fixture
+def matchmaking(redis):
+    return MatchmakingService()
+
+
+async def backdate(redis, service: MatchmakingService, player_id: str, level: int, ms: float):
+    """Pretend a player queued ms earlier than they did"""
+    key = service._queue_key(service.bucket_for(level))
+    await redis.zadd(key, {player_id: await redis.zscore(key, player_id) - ms})
+
+
+async def test_close_levels_are_paired_on_enqueue(matchmaking):
+    queued = await matchmaking.enqueue(MatchTicket(player_id="ash", level=10, pokemon={"stats": {"hp": 39}}))
+    assert queued["status"] == "queued"
+
+    matched = await matchmaking.enqueue(MatchTicket(player_id="gary", level=11))
+    assert matched["status"] == "matched" and matched["opponent"] == "ash"
+    assert matched["session"]["player_ids"] == ["gary", "ash"] and matched["session"]["opponent_hp"] == 39
+
+    status = await matchmaking.get_status("ash")
+    assert status["status"] == "matched" and status["battle_id"] == matched["battle_id"]
+    assert status["session"]["battle_id"] == matched["battle_id"]
+
+
+async def test_a_player_is_matched_only_once(matchmaking):
+    await matchmaking.enqueue(MatchTicket(player_id="a", level=20))
+    await matchmaking.enqueue(MatchTicket(player_id="b", level=20))
+    third = await matchmaking.enqueue(MatchTicket(player_id="c", level=20))
+
+    assert third["status"] == "queued"
+    assert (await matchmaking.get_status("c"))["status"] == "queued"
+
+
+async def test_window_widens_across_buckets(redis, matchmaking):
+    await matchmaking.enqueue(MatchTicket(player_id="low", level=9))
+    assert (await matchmaking.enqueue(MatchTicket(player_id="high", level=15)))["status"] == "queued"
+
+    # Two widen intervals later the gap allowed is 2 + 2 * 2 = 6
+    await backdate(redis, matchmaking, "low", 9, 2 * matchmaking.widen_interval_ms)
+    status = await matchmaking.get_status("high")
+    assert status["status"] == "matched" and status["opponent"] == "low"
+
+
+async def test_requeue_and_cancel(matchmaking):
+    await matchmaking.enqueue(MatchTicket(player_id="ash", level=50))
+    # A new ticket replaces the old one, in its new bucket
+    await matchmaking.enqueue(MatchTicket(player_id="ash", level=80))
+    assert (await matchmaking.enqueue(MatchTicket(player_id="misty", level=50)))["status"] == "queued"
+    assert (await matchmaking.enqueue(MatchTicket(player_id="brock", level=80)))["opponent"] == "ash"
+
+    assert await matchmaking.cancel("misty")
+    assert not await matchmaking.cancel("misty")
+    assert await matchmaking.get_status("misty") == {"status": "not_queued"}
+
+
+async def test_background_sweep_skips_idle_buckets(redis, matchmaking):
+    await matchmaking.enqueue(MatchTicket(player_id="low", level=30))
+    await matchmaking.enqueue(MatchTicket(player_id="high", level=36))
+    assert await matchmaking.match_waiting() == 0
+
+    # Windows have grown, but with no arrivals the buckets are not swept again yet
+    await backdate(redis, matchmaking, "low", 30, 2 * matchmaking.widen_interval_ms)
+    assert await matchmaking.match_waiting() == 0
+
+    # An arrival outside the reach of both buckets changes nothing
+    await matchmaking.enqueue(MatchTicket(player_id="far", level=90))
+    assert await matchmaking.match_waiting() == 0
+    # One in reach (too far to pair with either) makes them worth sweeping again
+    assert (await matchmaking.enqueue(MatchTicket(player_id="mid", level=45)))["status"] == "queued"
+    assert await matchmaking.match_waiting() == 1
+    assert (await matchmaking.get_status("low"))["opponent"] == "high"
+
+
+async def test_sweep_drops_expired_tickets(redis, matchmaking):
+    await matchmaking.enqueue(MatchTicket(player_id="idle", level=5))
+    await backdate(redis, matchmaking, "idle", 5, matchmaking.ticket_ttl_ms + 1000)
+
+    await matchmaking.match_waiting()
+    assert await matchmaking.get_status("idle") == {"status": "not_queued"}
+
+
+async def test_one_worker_holds_the_matcher_lease(redis):
+    first, second = MatchmakingService(), MatchmakingService()
+    assert await first.hold_lease()
+    assert await first.hold_lease()
+    assert not await second.hold_lease()
+
+    # The lease is renewed while held, and moves on once it lapses
+    assert 0 < await redis.pttl(first.lease_key) <= first.lease_ms
+    await redis.delete(first.lease_key)
+    assert await second.hold_lease()
+
+    first._swept[0] = ((), time.time() * 1000)
+    assert not await first.hold_lease()
+    assert first._swept == {}
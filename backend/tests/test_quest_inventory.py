@@ -0,0 +1,37 @@
+import pytest
+
+from services.gemini_service import gemini_service
+from services.quest_inventory_service import QuestInventoryService
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Gemini calls made, with a stub quest per call and a full quota"""
+    calls = []
+
+    async def generate_quest(player_team, player_level):
+        calls.append(player_level)
+        return {"title": f"Quest {len(calls)}"}
+
+    monkeypatch.setattr(gemini_service, "generate_quest", generate_quest)
+    monkeypatch.setattr(gemini_service.rate_limiter, "available", lambda: 60)
+    return calls
+
+
+async def test_only_the_lease_holder_refills(redis, generated):
+    first, second = QuestInventoryService(), QuestInventoryService()
+    first.pool_size = second.pool_size = 3
+    assert await first.take("0:fire") is None
+
+    assert await first.hold_lease()
+    assert not await second.hold_lease()
+    assert await second.refill_once() == 0
+    assert generated == []
+
+    assert await first.refill_once() == 3
+    assert await redis.llen("quest_inventory:pool:0:fire") == 3
+
+    # The lease passes on once the holder stops renewing it
+    await redis.delete(first.lease_key)
+    assert await second.hold_lease()
+    assert not await first.hold_lease()
@@ -0,0 +1,27 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from config import settings
+from routes import quest
+
+
+@pytest.fixture
+async def client(redis):
+    app = FastAPI()
+    app.include_router(quest.router, prefix="/api/quest")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.parametrize("url,params", [
+    ("/api/quest/update-progress", {"action_type": "battle", "player_id": "player-1"}),
+    ("/api/quest/challenge/update-progress", {"action_type": "battle", "player_id": "player-1"}),
+])
+async def test_progress_increments_are_bounded(client, url, params):
+    for increment in (0, -5, settings.QUEST_MAX_PROGRESS_INCREMENT + 1):
+        response = await client.post(url, params={**params, "increment": increment})
+        assert response.status_code == 422
+
+    response = await client.post(url, params={**params, "increment": settings.QUEST_MAX_PROGRESS_INCREMENT})
+    assert response.status_code == 200
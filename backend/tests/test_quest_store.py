@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models.quest import DailyChallenge, ObjectiveType, Quest, QuestObjective, QuestReward, RewardType
+from services.game_events import game_event_service
+from services.quest_progress_worker import QuestProgressWorker
+from services.quest_store import quest_store
+
+PLAYER = "player-1"
+
+
+def quest(quest_id: str, target: int = 3, hours: int = 24) -> Quest:
+    return Quest(
+        id=quest_id,
+        title="Battle practice",
+        description="Win battles",
+        objectives=[QuestObjective(type=ObjectiveType.BATTLE, target=target, description="Win battles")],
+        rewards=QuestReward(type=RewardType.TOKENS, amount=100),
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=hours),
+    )
+
+
+def entry_id(seq: int) -> str:
+    return f"{int(time.time() * 1000)}-{seq}"
+
+
+@pytest.fixture
+async def store(redis):
+    await quest_store.add_quest(PLAYER, quest("q1"))
+    await quest_store.set_daily_challenges(
+        PLAYER,
+        [DailyChallenge(id="c1", description="Win 2 battles", type=ObjectiveType.BATTLE, target=2,
+                        reward=QuestReward(type=RewardType.TOKENS, amount=50))],
+        datetime.now(timezone.utc) + timedelta(hours=24)
+    )
+    return quest_store
+
+
+async def test_progress_is_capped_and_returns_changed_items(store):
+    result = await store.apply_progress(PLAYER, ObjectiveType.BATTLE, increment=2)
+    assert result["quests"][0]["objectives"][0]["current"] == 2 and not result["quests"][0]["completed"]
+    assert result["challenges"][0]["progress"] == 2 and result["challenges"][0]["completed"]
+
+    result = await store.apply_progress(PLAYER, ObjectiveType.BATTLE, increment=5)
+    assert result["quests"][0]["objectives"][0]["current"] == 3 and result["quests"][0]["completed"]
+    # The finished challenge did not change
+    assert result["challenges"] == []
+
+    assert await store.apply_progress(PLAYER, ObjectiveType.CAPTURE) == {"quests": [], "challenges": []}
+
+
+async def test_stream_entries_count_once(store):
+    first, second, third = entry_id(0), entry_id(1), entry_id(2)
+    await store.apply_progress(PLAYER, ObjectiveType.BATTLE, entries=[(first, 1), (second, 1)])
+
+    # Redelivered entries are skipped, new ones in the same call still count
+    result = await store.apply_progress(PLAYER, ObjectiveType.BATTLE, entries=[(second, 1), (third, 1)])
+    assert result["quests"][0]["objectives"][0]["current"] == 3
+    assert await store.apply_progress(PLAYER, ObjectiveType.BATTLE, entries=[(first, 1)]) == {
+        "quests": [], "challenges": []
+    }
+
+
+async def test_complete_quest(store):
+    assert (await store.complete_quest(PLAYER, "q1"))["status"] == "incomplete"
+    await store.apply_progress(PLAYER, ObjectiveType.BATTLE, increment=3)
+    assert (await store.complete_quest(PLAYER, "q1"))["status"] == "completed"
+    assert (await store.complete_quest(PLAYER, "q1"))["status"] == "already_completed"
+    assert (await store.complete_quest(PLAYER, "missing"))["status"] == "not_found"
+    assert await store.get_active_quests(PLAYER) == []
+
+
+async def test_reaper_removes_expired_quests(redis, store):
+    await store.add_quest(PLAYER, quest("old", hours=-1))
+    assert await store.reap_expired() == 1
+    assert [q["id"] for q in await store.get_active_quests(PLAYER)] == ["q1"]
+
+
+async def test_worker_redelivery_is_not_counted_twice(redis, store):
+    worker = QuestProgressWorker()
+    await worker.ensure_group()
+    for _ in range(2):
+        await game_event_service.publish(PLAYER, ObjectiveType.BATTLE)
+    await redis.xadd(game_event_service.stream_key, {"player_id": PLAYER, "action": "dance"})
+
+    # Progress stored, then the worker died before acknowledging
+    entries = await worker._read(">")
+    await worker.handle_batch(entries)
+    # On restart the pending entries are replayed and acknowledged
+    await worker.recover_pending()
+
+    quests = await store.get_active_quests(PLAYER)
+    assert quests[0]["objectives"][0]["current"] == 2
+    pending = await redis.xpending(game_event_service.stream_key, worker.group)
+    assert pending["pending"] == 0
@@ -0,0 +1,79 @@
+from typing import Dict, List, Tuple
+
+import pytest
+
+from services.game_events import game_event_service
+from services.stream_consumer import StreamConsumer
+
+
+class Recorder(StreamConsumer):
+    """Acknowledges every entry except those whose player is in failing"""
+
+    group = "test-recorder"
+
+    def __init__(self, consumer: str):
+        super().__init__()
+        self.consumer = consumer
+        self.claim_idle_ms = 0
+        self.failing = set()
+        self.handled: List[str] = []
+
+    async def handle_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        self.handled.extend(entry_id for entry_id, _ in entries)
+        return [entry_id for entry_id, fields in entries if fields["player_id"] not in self.failing]
+
+
+async def publish(redis, *players: str) -> List[str]:
+    return [await redis.xadd(game_event_service.stream_key, {"player_id": p, "action": "battle"}) for p in players]
+
+
+async def pending(redis, group: str = Recorder.group) -> int:
+    return (await redis.xpending(game_event_service.stream_key, group))["pending"]
+
+
+def test_handle_batch_is_abstract():
+    with pytest.raises(TypeError):
+        StreamConsumer()
+
+
+async def test_only_returned_ids_are_acknowledged(redis):
+    consumer = Recorder("a")
+    await consumer.ensure_group()
+    # Creating the group twice is fine
+    await consumer.ensure_group()
+    ids = await publish(redis, "ok", "broken", "ok")
+    consumer.failing.add("broken")
+
+    assert await consumer.process_batch(await consumer._read(">")) == 2
+    assert await pending(redis) == 1
+
+    # Replayed on the next start; once it succeeds it is acknowledged
+    consumer.failing.clear()
+    consumer.handled.clear()
+    await consumer.recover_pending()
+    assert consumer.handled == [ids[1]]
+    assert await pending(redis) == 0
+
+
+async def test_entries_of_a_dead_consumer_are_claimed(redis):
+    dead, alive = Recorder("dead"), Recorder("alive")
+    await dead.ensure_group()
+    ids = await publish(redis, "p1", "p2")
+    await dead._read(">")  # Delivered, then the consumer died
+
+    await alive.recover_pending()
+    assert alive.handled == ids
+    assert await pending(redis) == 0
+
+
+async def test_groups_read_independently(redis):
+    first = Recorder("a")
+    other = Recorder("b")
+    other.group = "test-other"
+    for consumer in (first, other):
+        await consumer.ensure_group()
+    ids = await publish(redis, "p1")
+
+    for consumer in (first, other):
+        await consumer.process_batch(await consumer._read(">"))
+        assert consumer.handled == ids
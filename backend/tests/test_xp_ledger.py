@@ -0,0 +1,205 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.pokemon_service import pokemon_service
+from services.settlement_batches import NftOwnershipError, UnknownNftError
+from services.xp_ledger import xp_ledger
+from tests.conftest import PACKAGE
+
+TRAINER = "0x" + "7" * 64
+OTHER = "0x" + "8" * 64
+
+
+@pytest.fixture(autouse=True)
+def base_stats(monkeypatch):
+    """Charmander's base stats for level-up growth, without PokéAPI"""
+    async def get_pokemon(species_id):
+        return SimpleNamespace(stats=SimpleNamespace(hp=39, attack=52, defense=43, speed=65))
+    monkeypatch.setattr(pokemon_service, "get_pokemon", get_pokemon)
+
+
+@pytest.fixture
+def ledger(redis, rpc, store):
+    return xp_ledger
+
+
+async def settle_on_chain(chain, ledger, batch, sender=None):
+    """Execute the batch's transaction like the wallet would and report the digest"""
+    tx = chain.execute({"sender": sender or batch["owner"], "calls": batch["transaction"]["calls"]})
+    await ledger.mark_submitted(batch["batch_id"], tx["digest"])
+    await ledger.settle_once()
+    return await ledger.get_batch(batch["batch_id"])
+
+
+async def test_award_seeds_from_chain_state(ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+
+    result = await ledger.award(pokemon, TRAINER, loser_level=1)
+
+    assert result["species_id"] == 4
+    assert result["experience"] == result["experience_gained"] == result["pending_xp"] == 50
+    assert result["level"] == 4 and result["levels_gained"] == 3
+    assert result["stats"]["attack"] == 18
+
+
+async def test_award_requires_a_known_nft_held_by_the_player(chain, ledger, mint_starter):
+    with pytest.raises(UnknownNftError):
+        await ledger.award("0x" + "0" * 64, TRAINER, 1)
+
+    pokemon = mint_starter(TRAINER)
+    with pytest.raises(NftOwnershipError):
+        await ledger.award(pokemon, OTHER, 1)
+
+    chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::marketplace::list_pokemon", "arguments": [chain.marketplace_id, pokemon, 100]},
+    ]})
+    with pytest.raises(UnknownNftError):
+        await ledger.award(pokemon, TRAINER, 1)
+
+
+async def test_listed_nft_in_the_index_is_not_owned(chain, indexer, ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::marketplace::list_pokemon", "arguments": [chain.marketplace_id, pokemon, 100]},
+    ]})
+    await indexer.sync_once()
+
+    with pytest.raises(NftOwnershipError):
+        await ledger.award(pokemon, TRAINER, 1)
+
+
+async def test_confirmed_batch_settles_pending_xp(chain, ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+
+    assert await ledger.settle_once() == {"built": 1, "checked": 0}
+    batch = (await ledger.get_batches(TRAINER))[0]
+    assert batch["status"] == "pending" and batch["pending"] == {pokemon: 50}
+    # One open batch per owner
+    await ledger.award(pokemon, TRAINER, 1)
+    assert await ledger.build_batch(TRAINER) is None
+
+    batch = await settle_on_chain(chain, ledger, batch)
+
+    assert batch["status"] == "confirmed"
+    # Only the settled XP is deducted; the second award (at level 4) is still pending
+    assert (await ledger.get_states([pokemon]))[pokemon]["pending_xp"] == 35
+    fields = chain.objects[pokemon]["fields"]
+    assert fields["experience"] == 50 and fields["level"] == 4
+
+
+async def test_batch_sent_by_someone_else_is_rejected(chain, ledger, mint_starter, breed_egg):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    batch = await ledger.build_batch(TRAINER)
+
+    other = chain.execute({"sender": OTHER, "calls": [
+        {"target": f"{PACKAGE}::egg::breed_pokemon", "arguments": [1, 4, [], "0x6"]},
+    ]})
+    await ledger.mark_submitted(batch["batch_id"], other["digest"])
+    await ledger.settle_once()
+
+    rejected = await ledger.get_batch(batch["batch_id"])
+    assert rejected["status"] == "rejected" and "not " + TRAINER in rejected["error"]
+    assert (await ledger.get_states([pokemon]))[pokemon]["pending_xp"] == 50
+    # Its Pokémon were marked dirty again and go into the next batch
+    assert (await ledger.get_batches(TRAINER))[0]["pending"] == {pokemon: 50}
+
+
+async def test_batch_with_other_calls_is_rejected(chain, ledger, mint_starter, breed_egg):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    batch = await ledger.build_batch(TRAINER)
+
+    unrelated = chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::egg::breed_pokemon", "arguments": [1, 4, [], "0x6"]},
+    ]})
+    await ledger.mark_submitted(batch["batch_id"], unrelated["digest"])
+    await ledger.settle_once()
+
+    rejected = await ledger.get_batch(batch["batch_id"])
+    assert rejected["status"] == "rejected" and rejected["error"] == "transaction does not execute the batch's calls"
+    assert chain.objects[pokemon]["fields"]["experience"] == 0
+
+
+async def test_failed_batch_is_rebuilt(chain, ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    batch = await ledger.build_batch(TRAINER)
+
+    # Transferred away before the wallet executed the batch: update_stats fails
+    chain.transfer_objects(TRAINER, [pokemon], OTHER)
+    failed = await settle_on_chain(chain, ledger, batch)
+
+    assert failed["status"] == "failed"
+    newest = (await ledger.get_batches(TRAINER))[0]
+    assert newest["batch_id"] != batch["batch_id"] and newest["pending"] == {pokemon: 50}
+
+
+async def test_digest_settles_only_one_batch(chain, ledger, redis, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    first = await settle_on_chain(chain, ledger, await ledger.build_batch(TRAINER))
+    assert first["status"] == "confirmed"
+
+    # Nothing changed since, so the next batch has exactly the same calls
+    async with redis.pipeline(transaction=False) as pipe:
+        ledger.mark_dirty(pipe, TRAINER, pokemon)
+        await pipe.execute()
+    second = await ledger.build_batch(TRAINER)
+    assert second["transaction"]["calls"] == first["transaction"]["calls"]
+
+    await ledger.mark_submitted(second["batch_id"], first["digest"])
+    await ledger.settle_once()
+
+    rejected = await ledger.get_batch(second["batch_id"])
+    assert rejected["status"] == "rejected" and rejected["error"] == "transaction already settled another batch"
+    # Checking the first batch again does not reject it
+    assert await ledger.check_submitted(first) == "confirmed"
+
+
+async def submitted_ago(ledger, batch_id: str, seconds: float):
+    """Pretend a batch was reported seconds ago"""
+    batch = await ledger.get_batch(batch_id)
+    batch["submitted_at"] -= seconds
+    await ledger._save_batch(batch)
+
+
+async def test_unknown_digest_is_rejected_after_the_grace_period(ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    batch = await ledger.build_batch(TRAINER)
+    await ledger.mark_submitted(batch["batch_id"], "no-such-digest")
+
+    # Just reported: the node may not have it yet
+    await ledger.settle_once()
+    assert (await ledger.get_batch(batch["batch_id"]))["status"] == "submitted"
+
+    await submitted_ago(ledger, batch["batch_id"], ledger.not_found_grace + 1)
+    await ledger.settle_once()
+    rejected = await ledger.get_batch(batch["batch_id"])
+    assert rejected["status"] == "rejected" and rejected["error"] == "transaction not found"
+    # The owner is not stuck: a new batch was built
+    newest = (await ledger.get_batches(TRAINER))[0]
+    assert newest["status"] == "pending" and newest["pending"] == {pokemon: 50}
+
+
+async def test_unchecked_submitted_batch_expires(chain, ledger, mint_starter):
+    pokemon = mint_starter(TRAINER)
+    await ledger.award(pokemon, TRAINER, 1)
+    batch = await ledger.build_batch(TRAINER)
+    tx = chain.execute({"sender": TRAINER, "calls": [
+        {"target": f"{PACKAGE}::egg::breed_pokemon", "arguments": [1, 4, [], "0x6"]},
+    ]})
+    await ledger.mark_submitted(batch["batch_id"], tx["digest"])
+
+    # The node keeps failing, so the batch cannot be checked
+    chain.error_rate = 1
+    await ledger.settle_once()
+    assert (await ledger.get_batch(batch["batch_id"]))["status"] == "submitted"
+
+    await submitted_ago(ledger, batch["batch_id"], ledger.batch_ttl + 1)
+    await ledger.settle_once()
+    assert (await ledger.get_batch(batch["batch_id"]))["status"] == "expired"
+    assert (await ledger.get_batches(TRAINER))[0]["pending"] == {pokemon: 50}